@@ -0,0 +1,119 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from background import Worker
+from expression_engine import ExpressionEngine, default_namespace, degree_namespace, estimate_digits, parse
+from number_format import format_number
+
+# Lines whose result would have more digits than this are refused, as in
+# the sandbox and the server.
+MAX_DIGITS = 1000000
+# Seconds a chunk may take before its worker is replaced.
+CHUNK_TIMEOUT = 30.0
+
+engines = {}
+
+
+def get_engine(mode):
+    if mode not in engines:
+        namespace = degree_namespace() if mode == "DEG" else default_namespace()
+        engines[mode] = ExpressionEngine(namespace)
+    return engines[mode]
+
+
+def evaluate_line(engine, line):
+    expr = line.strip()
+    if not expr:
+        return ""
+    try:
+        if estimate_digits(parse(expr)) > MAX_DIGITS:
+            return "Too expensive"
+        return format_number(engine.evaluate(expr))
+    except Exception:
+        return "Error"
+
+
+def evaluate_chunk(lines, mode="RAD"):
+    engine = get_engine(mode)
+    return [evaluate_line(engine, line) for line in lines]
+
+
+def chunks(lines, size):
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def collect(worker, count, deadline):
+    # A chunk still running at its deadline costs its worker: the process
+    # is killed, the next submit starts a fresh one, and every line of the
+    # chunk times out.
+    try:
+        if worker.ready(max(0.0, deadline - time.monotonic())):
+            ok, results = worker.receive()
+            return results if ok else ["Error"] * count
+        results = ["Timeout"] * count
+    except (EOFError, OSError):
+        results = ["Error"] * count
+    worker.kill()
+    return results
+
+
+def stream_results(lines, mode="RAD", workers=None, chunk_size=1000, timeout=CHUNK_TIMEOUT):
+    workers = workers or os.cpu_count() or 1
+    pool = [Worker() for _ in range(workers)]
+
+    # One chunk per worker is in flight, so memory stays constant no
+    # matter how large the input is, and results are yielded in input
+    # order.
+    idle = list(pool)
+    pending = deque()
+    try:
+        for chunk in chunks(lines, chunk_size):
+            if not idle:
+                worker, count, deadline = pending.popleft()
+                yield from collect(worker, count, deadline)
+                idle.append(worker)
+            worker = idle.pop()
+            worker.submit(evaluate_chunk, (chunk, mode))
+            pending.append((worker, len(chunk), time.monotonic() + timeout))
+        while pending:
+            worker, count, deadline = pending.popleft()
+            yield from collect(worker, count, deadline)
+    finally:
+        for worker in pool:
+            worker.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate one expression per line.")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-m", "--mode", choices=["RAD", "DEG"], default="RAD")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("-c", "--chunk-size", type=int, default=1000)
+    parser.add_argument("-t", "--timeout", type=float, default=CHUNK_TIMEOUT,
+                        help="seconds a chunk may take (default: 30)")
+    args = parser.parse_args()
+
+    source = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    target = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in stream_results(source, args.mode, args.workers, args.chunk_size, args.timeout):
+            target.write(result + "\n")
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from calculator_engine import OPERATIONS, SCIENTIFIC_KEYS, CalculatorEngine
+from instrumentation import Histogram
+from sandbox import SandboxPool, evaluate_text
+
+# Percentiles of fewer timings than this are too noisy to compare.
+MIN_SAMPLES = 50
+
+
+def operation_chain(length=20000):
+    keys = ['1']
+    for index in range(length):
+        keys.append('+-*/'[index % 4])
+        keys.extend(str(index % 9 + 1))
+    keys.append('=')
+    return [('key', key) for key in keys]
+
+
+def scientific_storm(length=20000):
+    functions = [key for key in SCIENTIFIC_KEYS if key not in ('π', 'e', '(', ')', 'x!')]
+    events = [('key', 'C')]
+    for index in range(length):
+        events.extend(('key', digit) for digit in str(index % 360))
+        events.append(('key', functions[index % len(functions)]))
+        events.append(('key', 'C'))
+    return events
+
+
+def huge_factorials(count=200):
+    events = []
+    for index in range(count):
+        events.append(('key', 'C'))
+        events.extend(('key', digit) for digit in str(1000 + index * 50))
+        events.append(('key', 'x!'))
+    return events
+
+
+def precise_chain(length=300):
+    events = [('mode', 'precise'), ('key', '2'), ('key', '√')]
+    for index in range(length):
+        events.append(('key', '*/'[index % 2]))
+        events.extend(('key', digit) for digit in str(index % 7 + 2))
+        events.append(('key', '='))
+    return events
+
+
+def nested_kostil(depth=150, count=200):
+    expression = "1"
+    for level in range(depth):
+        expression = f"({expression}{'+-*/'[level % 4]}{level % 9 + 1})"
+    return [('expr', f"sin({expression})+{index}") for index in range(count)]
+
+
+def kostil_mix(count=5000):
+    templates = [
+        "sqrt({0})*sin({0})", "n_sqrt({0}, 3)+log({0})", "factorial({1})",
+        "2**{1}-{0}", "(({0}+1)*({0}-1))/({0}**2+1)", "cos(pi/{0})*tan(pi/{2})",
+    ]
+    return [('expr', templates[index % len(templates)].format(index + 1, index % 300, index % 10 + 3))
+            for index in range(count)]
+
+
+WORKLOADS = {
+    'operation_chain': operation_chain,
+    'scientific_storm': scientific_storm,
+    'huge_factorials': huge_factorials,
+    'precise_chain': precise_chain,
+    'nested_kostil': nested_kostil,
+    'kostil_mix': kostil_mix,
+}
+
+
+def load_recording(path):
+    events = []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('app') == 'calculator' and 'key' in record:
+                events.append(('key', record['key']))
+            elif 'expr' in record:
+                events.append(('expr', record['expr']))
+    return events
+
+
+def play(events, evaluate_expression, latencies=None):
+    engine = CalculatorEngine()
+    clock = time.perf_counter
+    for kind, value in events:
+        if kind == 'mode':
+            engine.toggle_precision()
+            continue
+        before = clock()
+        if kind == 'key':
+            engine.press(value)
+            if value == '=':
+                stage = 'calculate'
+            elif value in OPERATIONS:
+                stage = 'operation'
+            elif value in SCIENTIFIC_KEYS:
+                stage = 'scientific'
+            else:
+                stage = 'input'
+        else:
+            try:
+                evaluate_expression(value)
+            except Exception:
+                pass
+            stage = 'kostil.calculate'
+        if latencies is not None:
+            elapsed = clock() - before
+            histogram = latencies.get(stage)
+            if histogram is None:
+                histogram = latencies[stage] = Histogram()
+            histogram.record(elapsed)
+
+
+def replay(events, evaluate_expression=evaluate_text, memory=True):
+    # Keys go through CalculatorEngine.press and expressions through the
+    # function kostil_calculator's sandbox workers run, one after another
+    # with nothing in between. tracemalloc slows every allocation down, so
+    # peak memory comes from a second pass that is not timed.
+    latencies = {}
+    started = time.perf_counter()
+    play(events, evaluate_expression, latencies)
+    seconds = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        play(events, evaluate_expression)
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+    ops = sum(histogram.count for histogram in latencies.values())
+    return {
+        'ops': ops,
+        'seconds': seconds,
+        'ops_per_sec': ops / seconds if seconds else 0.0,
+        'peak_memory_kib': peak,
+        'latency': {stage: histogram.summary() for stage, histogram in sorted(latencies.items())},
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    # A workload regresses when its throughput drops, or its p95 latency for
+    # any stage with enough samples grows, by more than the threshold.
+    regressions = []
+    for name, current in results['workloads'].items():
+        previous = baseline.get('workloads', {}).get(name)
+        if previous is None:
+            continue
+        ratio = current['ops_per_sec'] / previous['ops_per_sec'] if previous['ops_per_sec'] else 1.0
+        print(f"{name:<20} {previous['ops_per_sec']:>12.0f} -> {current['ops_per_sec']:>12.0f} ops/s "
+              f"({(ratio - 1) * 100:+.1f}%)", file=sys.stderr)
+        if ratio < 1 - threshold:
+            regressions.append(f"{name}: ops/s {(ratio - 1) * 100:+.1f}%")
+        for stage, stats in current['latency'].items():
+            old = previous['latency'].get(stage)
+            if stats['count'] < MIN_SAMPLES or not old or old['count'] < MIN_SAMPLES:
+                continue
+            if old['p95_ms'] and stats['p95_ms'] > old['p95_ms'] * (1 + threshold):
+                regressions.append(f"{name}/{stage}: p95 {old['p95_ms']:.3f} -> {stats['p95_ms']:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay key sequences and expressions against the calculator core.")
+    parser.add_argument("-w", "--workload", action="append", choices=sorted(WORKLOADS),
+                        help="synthetic workload to run (default: all)")
+    parser.add_argument("-r", "--replay", action="append", default=[],
+                        help="JSON-lines recording made with CALC_RECORD=<file>")
+    parser.add_argument("-o", "--output", help="write results as JSON (default: stdout)")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown that counts as a regression (default: 0.10)")
+    parser.add_argument("--sandbox", action="store_true",
+                        help="send kostil expressions through the sandbox workers")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the second, untimed pass that measures peak memory")
+    args = parser.parse_args()
+
+    sandbox = SandboxPool() if args.sandbox else None
+    evaluate_expression = sandbox.evaluate if sandbox is not None else evaluate_text
+    workloads = {}
+    names = args.workload or ([] if args.replay else sorted(WORKLOADS))
+    try:
+        for name in names:
+            workloads[name] = replay(WORKLOADS[name](), evaluate_expression, not args.no_memory)
+            print(f"{name:<20} {workloads[name]['ops_per_sec']:>12.0f} ops/s", file=sys.stderr)
+        for path in args.replay:
+            workloads[f"replay:{path}"] = replay(load_recording(path), evaluate_expression, not args.no_memory)
+    finally:
+        if sandbox is not None:
+            sandbox.close()
+
+    results = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workloads': workloads,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
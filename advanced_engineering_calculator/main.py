@@ -1,11 +1,47 @@
+import os
+import sys
+import time
+import tracemalloc
+
+REPORT_STARTUP = "--startup-report" in sys.argv or bool(os.environ.get("CALC_STARTUP_REPORT"))
+if REPORT_STARTUP:
+    tracemalloc.start()
+STARTED = time.perf_counter()
+
 import tkinter as tk
 from calculator import Calculator
 
+IMPORTED = time.perf_counter()
+
+
+def report_startup(stages):
+    current, peak = tracemalloc.get_traced_memory()
+    previous = STARTED
+    for name, moment in stages:
+        print(f"{name:<12} {(moment - previous) * 1000:8.1f} ms", file=sys.stderr)
+        previous = moment
+    print(f"{'total':<12} {(previous - STARTED) * 1000:8.1f} ms", file=sys.stderr)
+    print(f"{'memory':<12} {current / 1024:8.1f} KiB (peak {peak / 1024:.1f} KiB)", file=sys.stderr)
+
 
 def main():
     root = tk.Tk()
-    app = Calculator(root)
+    root_created = time.perf_counter()
+    app = Calculator(root, canvas_keypad=bool(os.environ.get("CALC_CANVAS_KEYPAD")))
+    built = time.perf_counter()
+
+    if REPORT_STARTUP:
+        def first_frame():
+            root.update_idletasks()
+            report_startup([
+                ("imports", IMPORTED),
+                ("tk root", root_created),
+                ("calculator", built),
+                ("first frame", time.perf_counter()),
+            ])
+        root.after_idle(first_frame)
+
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
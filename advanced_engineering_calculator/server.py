@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from advanced_engineering_calculator.batch import MAX_DIGITS, chunks, get_engine
+from background import Worker
+from calculator_engine import OPERATIONS, SCIENTIFIC_KEYS, CalculatorEngine
+from expression_engine import estimate_digits, parse
+from instrumentation import Histogram
+from matrix import evaluate_matrix_text, is_matrix_expression
+from number_format import format_number
+from sandbox import TooExpensive, limit_memory
+
+MAX_BODY = 16 * 1024 * 1024
+MAX_KEYS = 10000
+MODES = ("RAD", "DEG")
+# Connections with no request for this long are closed.
+IDLE_TIMEOUT = 60.0
+# Longest first, so "asin" is not read as "a" + "sin".
+KEY_NAMES = sorted(set(SCIENTIFIC_KEYS + OPERATIONS + ['=', 'C', '⌫', '.']), key=len, reverse=True)
+
+
+def split_keys(text):
+    # "30sin" -> ['3', '0', 'sin']; spaces between keys are optional. Key
+    # names win over digits, so "1/x" and "10^x" are single keys.
+    keys = []
+    position = 0
+    while position < len(text):
+        for name in KEY_NAMES:
+            if text.startswith(name, position):
+                keys.append(name)
+                position += len(name)
+                break
+        else:
+            if text[position].isdigit():
+                keys.append(text[position])
+            elif not text[position].isspace():
+                raise ValueError(f"Unknown key at {text[position:]!r}")
+            position += 1
+    return keys
+
+
+def evaluate_item(item):
+    # {"expr": "...", "mode": "RAD"} goes through the kostil language,
+    # {"keys": [...], "mode": "DEG", "precise": false} through the same
+    # engine the button calculator uses.
+    if not isinstance(item, dict):
+        raise ValueError("Each request must be a JSON object")
+    mode = item.get('mode', "RAD" if 'expr' in item else "DEG")
+    if mode not in MODES:
+        raise ValueError("'mode' must be RAD or DEG")
+    if 'expr' in item:
+        source = str(item['expr'])
+        if estimate_digits(parse(source)) > MAX_DIGITS:
+            raise TooExpensive(source)
+        if is_matrix_expression(source):
+            return evaluate_matrix_text(source, mode)
+        return format_number(get_engine(mode).evaluate(source))
+    if 'keys' in item:
+        keys = item['keys']
+        if isinstance(keys, str):
+            keys = split_keys(keys)
+        if len(keys) > MAX_KEYS:
+            raise TooExpensive("keys")
+        engine = CalculatorEngine(trig_mode=mode, precise=bool(item.get('precise')))
+        return engine.feed([str(key) for key in keys])
+    raise ValueError("Expected 'expr' or 'keys'")
+
+
+def evaluate_batch(items):
+    results = []
+    for item in items:
+        try:
+            results.append({'result': evaluate_item(item)})
+        except TooExpensive:
+            results.append({'error': "too expensive"})
+        except Exception as exception:
+            results.append({'error': str(exception) or type(exception).__name__})
+    return results
+
+
+def warm_up(memory_limit):
+    limit_memory(memory_limit)
+    evaluate_batch([{'expr': "sin(1)"}, {'expr': "det([[1, 2], [3, 4]])"}, {'keys': "2+2="}])
+
+
+def restart(worker):
+    worker.kill()
+    worker.start()
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.items = 0
+        self.errors = 0
+        self.connections = 0
+        self.open_connections = 0
+        self.latency = Histogram()
+        self.item_latency = Histogram()
+
+    def record(self, seconds, items):
+        self.requests += 1
+        self.items += items
+        self.latency.record(seconds)
+        if items:
+            self.item_latency.record(seconds / items)
+
+    def report(self):
+        uptime = time.monotonic() - self.started
+        return {
+            'uptime_s': uptime,
+            'requests': self.requests,
+            'items': self.items,
+            'errors': self.errors,
+            'connections': self.connections,
+            'open_connections': self.open_connections,
+            'requests_per_sec': self.requests / uptime if uptime else 0.0,
+            'items_per_sec': self.items / uptime if uptime else 0.0,
+            'request_latency': self.latency.summary(),
+            'item_latency': self.item_latency.summary(),
+        }
+
+
+class CalculationServer:
+    # An asyncio front end speaking just enough HTTP/1.1 for persistent
+    # connections; every batch is cut into chunks that run on warm worker
+    # processes, so the event loop only parses and routes. As in
+    # SandboxPool, a worker that runs past the deadline is killed and
+    # replaced instead of being left busy with a request nobody waits for.
+    def __init__(self, workers=None, chunk_size=64, timeout=10.0, memory_limit=1024 * 1024 * 1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.pool = [Worker(functools.partial(warm_up, memory_limit)) for _ in range(self.workers)]
+        # One waiting thread per worker, so a wait never queues behind another.
+        self.threads = ThreadPoolExecutor(self.workers)
+        self.idle = None
+        self.metrics = Metrics()
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        # Starts every worker up front so the first requests do not pay for it.
+        self.idle = asyncio.Queue()
+        for worker in self.pool:
+            worker.start()
+            self.idle.put_nowait(worker)
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def run(self, items, deadline):
+        loop = asyncio.get_running_loop()
+        worker = await asyncio.wait_for(self.idle.get(), max(0.0, deadline - loop.time()))
+        ready = False
+        ok, result = False, RuntimeError("worker died")
+        try:
+            worker.submit(evaluate_batch, (items,))
+            # The wait happens on a thread, so the event loop stays free.
+            ready = await loop.run_in_executor(self.threads, worker.ready, max(0.0, deadline - loop.time()))
+            if ready:
+                ok, result = await loop.run_in_executor(self.threads, worker.receive)
+        except (EOFError, OSError):
+            ready = None
+        finally:
+            # Still busy past the deadline, cancelled, or dead: replace it.
+            # Killing joins the process and starting forks a new one, so
+            # both happen on a thread, and the worker goes back to the idle
+            # queue once they are done rather than blocking the event loop.
+            if ready:
+                self.idle.put_nowait(worker)
+            else:
+                loop.run_in_executor(self.threads, restart, worker).add_done_callback(
+                    lambda _: self.idle.put_nowait(worker))
+        if ready is False:
+            raise asyncio.TimeoutError
+        if not ok:
+            return [{'error': str(result) or type(result).__name__}] * len(items)
+        return result
+
+    async def evaluate(self, items):
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        parts = await asyncio.gather(*[self.run(chunk, deadline) for chunk in chunks(items, self.chunk_size)],
+                                     return_exceptions=True)
+        results = []
+        for part in parts:
+            if isinstance(part, BaseException):
+                raise part
+            results.extend(part)
+        return results
+
+    async def dispatch(self, method, path, body):
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.metrics.report(), 0
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, {'status': "ok"}, 0
+        if path != '/evaluate':
+            return HTTPStatus.NOT_FOUND, {'error': "not found"}, 0
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "use POST"}, 0
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {'error': "body is not JSON"}, 0
+        # A list is a batch and gets a list back; a single object gets one
+        # result object.
+        single = not isinstance(request, list)
+        items = [request] if single else request
+        try:
+            results = await self.evaluate(items)
+        except asyncio.TimeoutError:
+            return HTTPStatus.GATEWAY_TIMEOUT, {'error': "timed out"}, len(items)
+        return HTTPStatus.OK, results[0] if single else results, len(items)
+
+    async def handle(self, reader, writer):
+        self.metrics.connections += 1
+        self.metrics.open_connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    return
+                started = time.perf_counter()
+                lines = head.decode('latin-1').split("\r\n")
+                try:
+                    method, path, version = lines[0].split(" ")
+                except ValueError:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {'error': "bad request line"}, False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', "").lower()
+                keep_alive = connection != 'close' if version == "HTTP/1.1" else connection == 'keep-alive'
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY:
+                    status = HTTPStatus.REQUEST_ENTITY_TOO_LARGE if length > MAX_BODY else HTTPStatus.BAD_REQUEST
+                    await self.respond(writer, status, {'error': "bad Content-Length"}, False)
+                    return
+                try:
+                    body = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                status, payload, items = await self.dispatch(method, path.split("?")[0], body)
+                if status != HTTPStatus.OK:
+                    self.metrics.errors += 1
+                elapsed = time.perf_counter() - started
+                if path.startswith('/evaluate'):
+                    self.metrics.record(elapsed, items)
+                await self.respond(writer, status, payload, keep_alive, elapsed)
+                if not keep_alive:
+                    return
+        finally:
+            self.metrics.open_connections -= 1
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive, elapsed=0.0):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"X-Elapsed-Ms: {elapsed * 1000:.3f}\r\n"
+            f"\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        for worker in self.pool:
+            worker.kill()
+        self.threads.shutdown(wait=False)
+
+
+async def serve(args):
+    server = CalculationServer(args.workers, args.chunk_size, args.timeout)
+    try:
+        listener = await server.start(args.host, args.port, args.unix)
+        where = args.unix or f"http://{args.host}:{args.port}"
+        print(f"serving on {where} with {server.workers} workers", file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    # Run from the repository root: python -m advanced_engineering_calculator.server
+    parser = argparse.ArgumentParser(description="Serve calculations over localhost HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on a Unix socket at this path instead")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("-c", "--chunk-size", type=int, default=64,
+                        help="batch items per worker task (default: 64)")
+    parser.add_argument("-t", "--timeout", type=float, default=10.0,
+                        help="seconds a request may take (default: 10)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
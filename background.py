@@ -0,0 +1,114 @@
+import multiprocessing
+import time
+
+
+def worker_loop(connection, initializer=None):
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            function, args = connection.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            outcome = (True, function(*args))
+        except Exception as exception:
+            outcome = (False, exception)
+        try:
+            connection.send(outcome)
+        except Exception as exception:
+            connection.send((False, RuntimeError(str(exception))))
+
+
+class Worker:
+    def __init__(self, initializer=None):
+        self.initializer = initializer
+        self.process = None
+        self.connection = None
+
+    def start(self):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=worker_loop,
+            args=(child, self.initializer),
+            daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def submit(self, function, args):
+        if not self.alive():
+            self.start()
+        self.connection.send((function, args))
+
+    def ready(self, timeout=0):
+        return self.connection.poll(timeout)
+
+    def receive(self):
+        return self.connection.recv()
+
+    def kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.connection.close()
+        self.process = None
+        self.connection = None
+
+
+class BackgroundExecutor:
+    def __init__(self, root, time_budget=10.0, poll_interval=20):
+        self.root = root
+        self.time_budget = time_budget
+        self.poll_interval = poll_interval
+        self.worker = Worker()
+        self.job = None
+
+    @property
+    def busy(self):
+        return self.job is not None
+
+    def submit(self, function, args, on_done, on_timeout=None):
+        if self.busy:
+            raise RuntimeError("executor is busy")
+        self.worker.submit(function, args)
+        self.job = (time.monotonic(), on_done, on_timeout)
+        self.root.after(self.poll_interval, self.poll)
+
+    def poll(self):
+        if self.job is None:
+            return
+        started, on_done, on_timeout = self.job
+        try:
+            ready = self.worker.ready()
+        except (EOFError, OSError):
+            self.worker.kill()
+            self.job = None
+            on_done(False, RuntimeError("worker died"))
+            return
+        if ready:
+            self.job = None
+            try:
+                ok, result = self.worker.receive()
+            except (EOFError, OSError) as exception:
+                self.worker.kill()
+                ok, result = False, exception
+            on_done(ok, result)
+        elif time.monotonic() - started > self.time_budget:
+            self.cancel()
+            if on_timeout is not None:
+                on_timeout()
+        else:
+            self.root.after(self.poll_interval, self.poll)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job = None
+            self.worker.kill()
+
+    def shutdown(self):
+        self.cancel()
+        self.worker.kill()
@@ -1,10 +1,25 @@
+import sqlite3
+import time
 import tkinter as tk
-from tkinter import font
-import math
+from tkinter import font, simpledialog
+from calculator_engine import CalculatorEngine, compute, job_key, run_job
+from background import BackgroundExecutor
+from number_format import to_text
+from canvas_keypad import CanvasKeypad
+from plotter import open_plot
+from value_table import TableWindow
+from history import History, HistoryWindow
+from result_cache import MISSING, ResultCache
+import instrumentation
+from statistics_stream import StatsPanel
+
+HOVER_TAG = 'HoverButton'
+FRAME_MS = 16
 
 class Calculator:
-    def __init__(self, root):
+    def __init__(self, root, time_budget=10.0, canvas_keypad=False):
         self.root = root
+        self.canvas_keypad = canvas_keypad
         self.root.title("Calculator")
         self.root.geometry("400x650")
         self.root.configure(bg='#121212')
@@ -31,13 +46,32 @@ class Calculator:
             'shadow': '#000000'
         }
         
-        self.current_input = ""
-        self.result_var = tk.StringVar(value="0")
-        self.operation = None
-        self.first_number = None
-        self.second_number = False
-        self.trig_mode = "DEG"
+        try:
+            self.history = History()
+        except OSError:
+            self.history = None
+        self.engine = CalculatorEngine(history=self.history)
+        try:
+            self.cache = ResultCache()
+            self.cache.warm_up()
+        except (OSError, sqlite3.Error):
+            self.cache = None
+        self.result_var = tk.StringVar(value=self.engine.display)
+        self.executor = BackgroundExecutor(self.root, time_budget=time_budget)
+        self.pending_keys = []
+        self.input_queue = []
+        self.flush_id = None
+        self.display_text = self.engine.display
+        self.refresh_id = None
+        self.last_refresh = 0.0
+        self.highlight_timers = {}
+        self.highlight_original = {}
         self.panel_visible = False
+        self.panel_built = False
+        self.stats_visible = False
+        self.stats = None
+        self.hover_colors = {}
+        self.plot_source = 'sin(x)'
         
         try:
             self.display_font = font.Font(family="Segoe UI", size=34, weight="normal")
@@ -50,8 +84,39 @@ class Calculator:
             self.mode_font = font.Font(size=12, weight="normal")
             self.sci_font = font.Font(size=14, weight="normal")
         
+        self.root.bind_class(HOVER_TAG, '<Enter>', self.on_enter)
+        self.root.bind_class(HOVER_TAG, '<Leave>', self.on_leave)
+        
         self.build()
         self.bind_keys()
+        self.profiler = instrumentation.from_env(
+            self.root,
+            [
+                (self, ['key_press', 'button_click', 'flush_input', 'press', 'run_jobs', 'refresh_display'], 'ui'),
+                (self.engine, ['prepare', 'handle_operation', 'calculate', 'complete', 'update'], 'engine'),
+            ],
+            keys=[(self, 'key_press'), (self, 'button_click')],
+            display=(self, 'refresh_display')
+        )
+        recorder = instrumentation.recorder_from_env('calculator')
+        if recorder is not None:
+            recorder.watch(self, 'key_press', 'key')
+            recorder.watch(self, 'button_click', 'key')
+    
+    def add_hover(self, btn, bg, hover_bg):
+        self.hover_colors[btn] = (bg, hover_bg)
+        tags = btn.bindtags()
+        btn.bindtags((tags[0], HOVER_TAG) + tags[1:])
+    
+    def on_enter(self, event):
+        colors = self.hover_colors.get(event.widget)
+        if colors is not None:
+            event.widget['bg'] = colors[1]
+    
+    def on_leave(self, event):
+        colors = self.hover_colors.get(event.widget)
+        if colors is not None:
+            event.widget['bg'] = colors[0]
     
     def create_button(self, parent, text, command, bg, fg, hover_bg, row, col, colspan=1, btn_font=None, width=8, height=2):
         if btn_font is None:
@@ -75,14 +140,7 @@ class Calculator:
             height=height
         )
         
-        def on_enter(e):
-            btn['bg'] = hover_bg
-        
-        def on_leave(e):
-            btn['bg'] = bg
-        
-        btn.bind("<Enter>", on_enter)
-        btn.bind("<Leave>", on_leave)
+        self.add_hover(btn, bg, hover_bg)
         
         btn.grid(
             row=row,
@@ -105,7 +163,7 @@ class Calculator:
         
         self.mode_label = tk.Label(
             mode_frame,
-            text=f"Mode: {self.trig_mode}",
+            text=self.mode_text(),
             font=self.mode_font,
             bg=self.colors['bg'],
             fg='#888888'
@@ -129,6 +187,23 @@ class Calculator:
         )
         mode_btn.pack(side='right')
         
+        precision_btn = tk.Button(
+            mode_frame,
+            text="PREC",
+            font=self.mode_font,
+            command=self.toggle_precision,
+            bg=self.colors['toggle_btn'],
+            fg='white',
+            activebackground=self.colors['toggle_btn_hover'],
+            activeforeground='white',
+            borderwidth=0,
+            relief='flat',
+            cursor='hand2',
+            padx=15,
+            pady=5
+        )
+        precision_btn.pack(side='right', padx=(0, 5))
+        
         display = tk.Frame(
             main_container,
             bg=self.colors['display_bg'],
@@ -165,10 +240,30 @@ class Calculator:
             cursor='hand2',
             pady=10
         )
-        self.switch_btn.pack(fill='x')
+        self.switch_btn.pack(side='left', fill='x', expand=True)
+        
+        stats_btn = tk.Button(
+            switch_frame,
+            text="Σ",
+            font=self.sci_font,
+            command=self.switch_stats,
+            bg=self.colors['toggle_btn'],
+            fg='white',
+            activebackground=self.colors['toggle_btn_hover'],
+            activeforeground='white',
+            borderwidth=0,
+            relief='flat',
+            cursor='hand2',
+            padx=15,
+            pady=10
+        )
+        stats_btn.pack(side='left', padx=(5, 0))
         
         self.panel = tk.Frame(main_container, bg=self.colors['bg'], height=250)
         self.panel.pack_propagate(False) 
+        
+        self.stats_frame = tk.Frame(main_container, bg=self.colors['bg'], height=200)
+        self.stats_frame.pack_propagate(False)
 
         self.keyboard = tk.Frame(main_container, bg=self.colors['bg'])
         self.keyboard.pack(fill='both', expand=True)
@@ -188,6 +283,22 @@ class Calculator:
         
         self.buttons_dict = {}
         
+        if self.canvas_keypad:
+            keypad = CanvasKeypad(
+                self.keyboard,
+                buttons,
+                # Looked up per click, so the profiler and recorder
+                # wrappers installed after build() see these keys too.
+                lambda text: self.button_click(text),
+                self.key_colors,
+                font=self.button_font,
+                bg=self.colors['bg'],
+                spans={'=': 2}
+            )
+            keypad.grid(row=0, column=0, rowspan=5, columnspan=4, sticky="nsew")
+            self.buttons_dict.update(keypad.keys)
+            return
+        
         for row_index, row in enumerate(buttons):
             for column_index, text in enumerate(row):
                 if text == '':  
@@ -196,18 +307,7 @@ class Calculator:
                 colspan = 2 if text == '=' else 1
                 col = column_index if text != '=' else 2  
                 
-                if text in ['C', '⌫', '%']:
-                    bg = self.colors['special_btn']
-                    fg = self.colors['special_text']
-                    hover_bg = self.colors['special_btn_hover']
-                elif text in ['/', '*', '-', '+', '=']:
-                    bg = self.colors['op_btn']
-                    fg = self.colors['op_text']
-                    hover_bg = self.colors['op_btn_hover']
-                else:
-                    bg = self.colors['num_btn']
-                    fg = self.colors['num_text']
-                    hover_bg = self.colors['num_btn_hover']
+                bg, fg, hover_bg = self.key_colors(text)
                 
                 btn = self.create_button(
                     self.keyboard,
@@ -223,10 +323,18 @@ class Calculator:
                 )
                 
                 self.buttons_dict[text] = btn
-        
-        self.build_panel()
+    
+    def key_colors(self, text):
+        if text in ['C', '⌫', '%']:
+            return self.colors['special_btn'], self.colors['special_text'], self.colors['special_btn_hover']
+        elif text in ['/', '*', '-', '+', '=']:
+            return self.colors['op_btn'], self.colors['op_text'], self.colors['op_btn_hover']
+        elif text in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'π', 'e', 'log', 'ln', '√', 'x²', 'x³', '10^x', '1/x', 'x!', '(', ')', '|x|', '^']:
+            return self.colors['sci_btn'], self.colors['sci_text'], self.colors['sci_btn_hover']
+        return self.colors['num_btn'], self.colors['num_text'], self.colors['num_btn_hover']
     
     def build_panel(self):
+        self.panel_built = True
         container = tk.Frame(self.panel, bg=self.colors['bg'])
         container.pack(fill='both', expand=True, padx=5, pady=5)
         
@@ -243,6 +351,20 @@ class Calculator:
             ['(', ')', '|x|', '^']
         ]
         
+        if self.canvas_keypad:
+            keypad = CanvasKeypad(
+                container,
+                sci_buttons,
+                lambda text: self.button_click(text),
+                self.key_colors,
+                font=self.sci_font,
+                bg=self.colors['bg'],
+                gap=4
+            )
+            keypad.grid(row=0, column=0, rowspan=5, columnspan=4, sticky="nsew")
+            self.buttons_dict.update(keypad.keys)
+            return
+        
         for row_idx, row in enumerate(sci_buttons):
             for col_idx, text in enumerate(row):
                 btn = tk.Button(
@@ -261,14 +383,7 @@ class Calculator:
                     pady=10
                 )
                 
-                def on_enter(e, b=btn, h=self.colors['sci_btn_hover']):
-                    b['bg'] = h
-                
-                def on_leave(e, b=btn, bg=self.colors['sci_btn']):
-                    b['bg'] = bg
-                
-                btn.bind("<Enter>", on_enter)
-                btn.bind("<Leave>", on_leave)
+                self.add_hover(btn, self.colors['sci_btn'], self.colors['sci_btn_hover'])
                 
                 btn.grid(
                     row=row_idx,
@@ -282,236 +397,242 @@ class Calculator:
     
     def switch_panel(self):
         if not self.panel_visible:
+            if not self.panel_built:
+                self.build_panel()
             self.panel.pack(fill='x', pady=(0, 10), before=self.keyboard)
             self.switch_btn.config(text="▲ Engineer Functions")
-            self.root.geometry("400x900")
         else:
             self.panel.pack_forget()
             self.switch_btn.config(text="▼ Engineer Functions")
-            self.root.geometry("400x650")
         
         self.panel_visible = not self.panel_visible
+        self.resize()
     
-    def toggle_mode(self):
-        self.trig_mode = "RAD" if self.trig_mode == "DEG" else "DEG"
-        self.mode_label.config(text=f"Mode: {self.trig_mode}")
+    def switch_stats(self):
+        if not self.stats_visible:
+            if self.stats is None:
+                self.stats = StatsPanel(self.stats_frame, self.colors, self.mode_font, self.show_stats)
+                self.stats.pack(fill='both', expand=True)
+            self.stats_frame.pack(fill='x', pady=(0, 10), before=self.keyboard)
+        else:
+            self.stats_frame.pack_forget()
+        
+        self.stats_visible = not self.stats_visible
+        self.resize()
     
-    def button_click(self, text):
+    def show_stats(self, summary):
+        self.show(f"x̄ {summary['mean']:.8g}")
+    
+    def resize(self):
+        height = 650
+        if self.panel_visible:
+            height += 250
+        if self.stats_visible:
+            height += 210
+        self.root.geometry(f"400x{height}")
+    
+    def plot(self):
+        source = simpledialog.askstring("Plot", "y(x) =", initialvalue=self.plot_source, parent=self.root)
+        if not source:
+            return
         try:
-            if self.current_input:
-                value = float(self.current_input)
-            else:
-                value = 0
-            
-            result = None
-            
-            if self.trig_mode == "DEG" and text in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan']:
-                geometry_value = math.radians(value)
-            else:
-                geometry_value = value
-            
-            if text == 'sin':
-                result = math.sin(geometry_value)
-            elif text == 'cos':
-                result = math.cos(geometry_value)
-            elif text == 'tan':
-                result = math.tan(geometry_value)
-            elif text == 'asin':
-                result = math.asin(value) if -1 <= value <= 1 else None
-                if result is not None and self.trig_mode == "DEG":
-                    result = math.degrees(result)
-            elif text == 'acos':
-                result = math.acos(value) if -1 <= value <= 1 else None
-                if result is not None and self.trig_mode == "DEG":
-                    result = math.degrees(result)
-            elif text == 'atan':
-                result = math.atan(value)
-                if self.trig_mode == "DEG":
-                    result = math.degrees(result)
-            
-            elif text == 'π':
-                self.current_input = str(math.pi)
-                self.update()
-                return
-            elif text == 'e':
-                self.current_input = str(math.e)
-                self.update()
-                return
-            
-            elif text == 'log':
-                result = math.log10(value) if value > 0 else None
-            elif text == 'ln':
-                result = math.log(value) if value > 0 else None
-            elif text == '√':
-                result = math.sqrt(value) if value >= 0 else None
-            elif text == 'x²':
-                result = value ** 2
-            elif text == 'x³':
-                result = value ** 3
-            elif text == '10^x':
-                result = 10 ** value
-            elif text == '1/x':
-                result = 1 / value if value != 0 else None
-            elif text == 'x!':
-                if value >= 0 and value.is_integer():
-                    result = math.factorial(int(value))
-                else:
-                    result = math.gamma(value + 1)
-            elif text == '|x|':
-                result = abs(value)
-            elif text == '(':
-                self.current_input += '('
-                self.update()
-                return
-            elif text == ')':
-                self.current_input += ')'
-                self.update()
-                return
-            elif text == '^':
-                self.handle_operation('^')
-                return
-            
-            if result is None:
-                self.result_var.set("Error")
-                return
-            
-            if abs(result) < 1e-10:
-                result = 0
-            
-            if abs(result - round(result, 10)) < 1e-10:
-                result = round(result, 10)
-            
-            if isinstance(result, float) and result.is_integer():
-                result = int(result)
-            
-            self.current_input = str(result)
+            open_plot(
+                self.root,
+                source,
+                bg=self.colors['display_bg'],
+                fg='#888888',
+                grid=self.colors['num_btn'],
+                curve=self.colors['op_btn'],
+                font=self.mode_font
+            )
+        except Exception:
+            self.show("Error")
+            return
+        self.plot_source = source
+    
+    def open_table(self):
+        TableWindow(
+            self.root,
+            self.plot_source,
+            colors={'bg': self.colors['bg'], 'fg': self.colors['display_fg'], 'alt_bg': self.colors['display_bg']},
+            font=self.mode_font
+        )
+    
+    def open_history(self):
+        if self.history is None:
+            return
+        HistoryWindow(
+            self.root,
+            self.history,
+            self.recall,
+            bg=self.colors['display_bg'],
+            fg=self.colors['display_fg'],
+            select_bg=self.colors['op_btn'],
+            font=self.mode_font
+        )
+    
+    def recall(self, timestamp, mode, expression, result):
+        self.flush_input()
+        if self.executor.busy:
+            return
+        self.engine.recall(result)
+        self.update()
+    
+    def undo(self):
+        self.flush_input()
+        if not self.executor.busy and self.engine.undo():
+            self.mode_label.config(text=self.mode_text())
+            self.update()
+    
+    def redo(self):
+        self.flush_input()
+        if not self.executor.busy and self.engine.redo():
+            self.mode_label.config(text=self.mode_text())
+            self.update()
+    
+    def mode_text(self):
+        if self.engine.precise:
+            return f"Mode: {self.engine.trig_mode} PREC"
+        return f"Mode: {self.engine.trig_mode}"
+    
+    def toggle_mode(self):
+        self.engine.toggle_mode()
+        self.mode_label.config(text=self.mode_text())
+    
+    def toggle_precision(self):
+        self.engine.toggle_precision()
+        self.mode_label.config(text=self.mode_text())
+    
+    def scroll_digits(self, step):
+        self.flush_input()
+        if not self.executor.busy:
+            self.engine.scroll(step)
             self.update()
-            
-        except Exception as exception:
-            self.result_var.set("Error")
-            self.current_input = ""
     
     def button_click(self, text):
         self.highlight_button(text)
-        
-        if text.isdigit() or text == '.':
-            self.handle_input(text)
-        elif text in ['+', '-', '*', '/', '%', '^']:
-            self.handle_operation(text)
-        elif text == '=':
-            self.calculate()
-        elif text == 'C':
-            self.clear()
-        elif text == '⌫':
-            self.backspace()
-    
-    def handle_input(self, num):
-        if self.second_number:
-            self.current_input = ""
-            self.second_number = False
-        
-        if num == '.':
-            if '.' not in self.current_input:
-                if self.current_input == "":
-                    self.current_input = "0."
-                else:
-                    self.current_input += "."
-        else:
-            if self.current_input == "0":
-                self.current_input = num
-            else:
-                self.current_input += num
-        
+        self.enqueue(text)
+    
+    def enqueue(self, key):
+        self.input_queue.append(key)
+        if self.flush_id is None:
+            self.flush_id = self.root.after_idle(self.flush_input)
+    
+    # Keys are queued as they arrive and applied together once the event
+    # loop has caught up, so a paste or key auto-repeat costs one pass and
+    # at most one display update instead of one per key.
+    def flush_input(self):
+        self.flush_id = None
+        keys = self.input_queue
+        self.input_queue = []
+        for key in keys:
+            self.press(key)
+    
+    def press(self, key):
+        if self.executor.busy:
+            self.pending_keys.append(key)
+            return
+        self.run_jobs(self.engine.prepare(key))
+    
+    def run_jobs(self, job):
+        while job is not None:
+            key = job_key(job)
+            cached = self.lookup(key)
+            if cached is not MISSING:
+                job = self.engine.complete(job, True, cached)
+                continue
+            started = time.perf_counter()
+            if job.heavy:
+                self.executor.submit(
+                    compute,
+                    (job.function, job.args),
+                    lambda ok, result, job=job, key=key: self.finish_job(job, key, ok, result, started),
+                    self.job_timed_out
+                )
+                self.show("Calculating...")
+                return
+            ok, result = run_job(job)
+            next_job = self.engine.complete(job, ok, result)
+            self.remember(key, ok, result, started)
+            job = next_job
         self.update()
+        self.replay_pending_keys()
     
-    def handle_operation(self, operation):
-        if self.current_input:
-            if self.first_number is not None and not self.second_number:
-                self.calculate()
-            
-            self.first_number = float(self.current_input)
-            self.operation = operation
-            self.second_number = True
-            
-            display_operation = operation
-            if operation == '*':
-                display_operation = '×'
-            elif operation == '/':
-                display_operation = '÷'
-            elif operation == '^':
-                display_operation = '^'
-            
-            self.result_var.set(f"{self.current_input} {display_operation}")
+    def finish_job(self, job, key, ok, result, started):
+        next_job = self.engine.complete(job, ok, result)
+        self.remember(key, ok, result, started)
+        self.run_jobs(next_job)
     
-    def calculate(self):
-        if self.first_number is not None and self.operation and self.current_input:
+    def lookup(self, key):
+        if self.cache is None:
+            return MISSING
+        try:
+            return self.cache.get(*key)
+        except sqlite3.Error:
+            return MISSING
+    
+    # Timed after complete(), since that is where a precise result
+    # produces its digits.
+    def remember(self, key, ok, result, started):
+        if ok and self.cache is not None:
             try:
-                second_number = float(self.current_input)
-                
-                if self.operation == '+':
-                    result = self.first_number + second_number
-                elif self.operation == '-':
-                    result = self.first_number - second_number
-                elif self.operation == '*':
-                    result = self.first_number * second_number
-                elif self.operation == '/':
-                    if second_number == 0:
-                        self.result_var.set("Error")
-                        self.clear()
-                        return
-                    result = self.first_number / second_number
-                elif self.operation == '%':
-                    result = self.first_number % second_number
-                elif self.operation == '^':
-                    result = self.first_number ** second_number
-                
-                if abs(result) < 1e-10:
-                    result = 0
-                
-                if isinstance(result, float) and result.is_integer():
-                    result = int(result)
-                else:
-                    result = round(result, 10)
-                
-                self.result_var.set(str(result))
-                self.current_input = str(result)
-                self.first_number = None
-                self.operation = None
-                self.second_number = False
-                
-            except Exception as e:
-                self.result_var.set("Error")
-                self.clear()
-    
-    def clear(self):
-        self.current_input = ""
-        self.result_var.set("0")
-        self.first_number = None
-        self.operation = None
-        self.second_number = False
-    
-    def backspace(self):
-        if self.current_input:
-            self.current_input = self.current_input[:-1]
-            if not self.current_input:
-                self.current_input = "0"
+                self.cache.put(*key, result, time.perf_counter() - started)
+            except sqlite3.Error:
+                pass
+    
+    def job_timed_out(self):
+        self.pending_keys = []
+        self.show("Timeout")
+    
+    def replay_pending_keys(self):
+        keys = self.pending_keys
+        self.pending_keys = []
+        for key in keys:
+            self.press(key)
+    
+    def escape(self):
+        if self.executor.busy:
+            self.executor.cancel()
+            self.pending_keys = []
+            self.input_queue = []
             self.update()
+        else:
+            self.key_press('C')
+    
+    def copy_result(self):
+        self.flush_input()
+        if self.executor.busy:
+            return
+        exact = self.engine.exact_value()
+        if exact is None:
+            self.set_clipboard(self.engine.current_input or self.engine.display)
+            return
+        self.show("Copying...")
+        self.executor.submit(to_text, (exact,), self.copied, self.job_timed_out)
+    
+    def copied(self, ok, text):
+        if ok:
+            self.set_clipboard(text)
+        self.update()
+        self.replay_pending_keys()
+    
+    def set_clipboard(self, text):
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
     
     def update(self):
-        if self.current_input == "":
-            self.result_var.set("0")
-        else:
-            if len(self.current_input) > 15:
-                try:
-                    num = float(self.current_input)
-                    if abs(num) > 1e12 or (abs(num) < 1e-4 and num != 0):
-                        self.result_var.set(f"{num:.4e}")
-                    else:
-                        self.result_var.set(f"{num:.8g}")
-                except:
-                    self.result_var.set(self.current_input[:15] + "...")
-            else:
-                self.result_var.set(self.current_input)
+        self.show(self.engine.display)
+    
+    def show(self, text):
+        self.display_text = text
+        if self.refresh_id is None:
+            wait = self.last_refresh + FRAME_MS / 1000 - time.perf_counter()
+            self.refresh_id = self.root.after(max(0, int(wait * 1000)), self.refresh_display)
+    
+    def refresh_display(self):
+        self.refresh_id = None
+        self.last_refresh = time.perf_counter()
+        self.result_var.set(self.display_text)
     
     def bind_keys(self):
         for key in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']:
@@ -526,46 +647,47 @@ class Calculator:
         self.root.bind('<Return>', lambda event: self.key_press('='))
         self.root.bind('<BackSpace>', lambda event: self.key_press('⌫'))
         self.root.bind('<Delete>', lambda event: self.key_press('C'))
-        self.root.bind('<Escape>', lambda event: self.key_press('C'))
+        self.root.bind('<Escape>', lambda event: self.escape())
         self.root.bind('c', lambda event: self.key_press('C'))
         self.root.bind('C', lambda event: self.key_press('C'))
         self.root.bind('%', lambda event: self.key_press('%'))
         
         self.root.bind('<F2>', lambda event: self.switch_panel())
+        self.root.bind('<F7>', lambda event: self.switch_stats())
+        self.root.bind('<F12>', lambda event: self.profiler.toggle())
+        self.root.bind('<F3>', lambda event: self.plot())
+        self.root.bind('<F4>', lambda event: self.open_table())
+        self.root.bind('<Control-h>', lambda event: self.open_history())
+        self.root.bind('<Control-c>', lambda event: self.copy_result())
+        self.root.bind('<Control-z>', lambda event: self.undo())
+        self.root.bind('<Control-y>', lambda event: self.redo())
+        self.root.bind('<Right>', lambda event: self.scroll_digits(15))
+        self.root.bind('<Left>', lambda event: self.scroll_digits(-15))
     
     def key_press(self, key):
         if key in self.buttons_dict:
             self.highlight_button(key)
         
-        if key.isdigit() or key == '.':
-            self.handle_input(key)
-        elif key in ['+', '-', '*', '/', '%']:
-            self.handle_operation(key)
-        elif key == '=':
-            self.calculate()
-        elif key == 'C':
-            self.clear()
-        elif key == '⌫':
-            self.backspace()
+        self.enqueue(key)
     
     def highlight_button(self, key):
         if key in self.buttons_dict:
             btn = self.buttons_dict[key]
-            original_bg = btn.cget('bg')
+            highlight_color = self.key_colors(key)[2]
             
-            if key in ['C', '⌫', '%']:
-                highlight_color = self.colors['special_btn_hover']
-            elif key in ['+', '-', '*', '/', '=']:
-                highlight_color = self.colors['op_btn_hover']
-            elif key.isdigit() or key == '.':
-                highlight_color = self.colors['num_btn_hover']
-            elif key in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'π', 'e', 'log', 'ln', '√', 'x²', 'x³', '10^x', '1/x', 'x!', '(', ')', '|x|', '^']:
-                highlight_color = self.colors['sci_btn_hover']
+            # A held-down key keeps one timer that is pushed back, instead
+            # of stacking a new one per repeat.
+            if key in self.highlight_timers:
+                self.root.after_cancel(self.highlight_timers[key])
             else:
-                return
+                self.highlight_original[key] = btn.cget('bg')
             
             btn.config(bg=highlight_color)
-            self.root.after(100, lambda: btn.config(bg=original_bg))
+            self.highlight_timers[key] = self.root.after(100, lambda: self.end_highlight(key))
+    
+    def end_highlight(self, key):
+        del self.highlight_timers[key]
+        self.buttons_dict[key].config(bg=self.highlight_original.pop(key))
 
 def main():
     root = tk.Tk()
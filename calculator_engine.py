@@ -0,0 +1,509 @@
+import math
+from collections import deque, namedtuple
+
+import precision
+from number_format import EXACT_DIGITS, HugeInt, factorial_log10, int_digits
+from precision import DISPLAY_DIGITS, LazyReal
+from scientific import EXACT_DEGREES, MemoCache, exact_value
+
+OPERATIONS = ['+', '-', '*', '/', '%', '^']
+SCIENTIFIC_KEYS = [
+    'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'π', 'e', 'log', 'ln',
+    '√', 'x²', 'x³', '10^x', '1/x', 'x!', '(', ')', '|x|'
+]
+DISPLAY_OPERATIONS = {'*': '×', '/': '÷'}
+
+# Keys whose job can run long in float mode: exact factorials and powers.
+# In precise mode every job can, since producing the digits is the work.
+HEAVY_KEYS = ('x!', '^', '10^x')
+
+# Snapshots kept for undo (and as many for redo).
+UNDO_DEPTH = 1000
+
+
+MEMOIZED = ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'log', 'ln', 'x!']
+memo = MemoCache()
+
+
+def apply_scientific(text, value, trig_mode):
+    if isinstance(value, LazyReal):
+        return precision.scientific(text, value, trig_mode)
+
+    if trig_mode == "DEG" and text in EXACT_DEGREES:
+        result = exact_value(text, value)
+        if result is not None:
+            return result
+
+    # Integer x! is an exact factorial, not a gamma value worth keeping.
+    if text in MEMOIZED and not (text == 'x!' and value.is_integer()):
+        return memo.get((text, trig_mode, value), lambda: compute_scientific(text, value, trig_mode))
+    return compute_scientific(text, value, trig_mode)
+
+
+def compute_scientific(text, value, trig_mode):
+    if trig_mode == "DEG" and text in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan']:
+        geometry_value = math.radians(value)
+    else:
+        geometry_value = value
+
+    if text == 'sin':
+        return math.sin(geometry_value)
+    elif text == 'cos':
+        return math.cos(geometry_value)
+    elif text == 'tan':
+        return math.tan(geometry_value)
+    elif text == 'asin':
+        result = math.asin(value) if -1 <= value <= 1 else None
+        if result is not None and trig_mode == "DEG":
+            result = math.degrees(result)
+        return result
+    elif text == 'acos':
+        result = math.acos(value) if -1 <= value <= 1 else None
+        if result is not None and trig_mode == "DEG":
+            result = math.degrees(result)
+        return result
+    elif text == 'atan':
+        result = math.atan(value)
+        if trig_mode == "DEG":
+            result = math.degrees(result)
+        return result
+    elif text == 'log':
+        return math.log10(value) if value > 0 else None
+    elif text == 'ln':
+        return math.log(value) if value > 0 else None
+    elif text == '√':
+        return math.sqrt(value) if value >= 0 else None
+    elif text == 'x²':
+        return value ** 2
+    elif text == 'x³':
+        return value ** 3
+    elif text == '10^x':
+        return 10 ** value
+    elif text == '1/x':
+        return 1 / value if value != 0 else None
+    elif text == 'x!':
+        if value >= 0 and value.is_integer():
+            if factorial_log10(value) > EXACT_DIGITS:
+                return HugeInt(factorial_of=int(value))
+            return math.factorial(int(value))
+        return math.gamma(value + 1)
+    elif text == '|x|':
+        return abs(value)
+
+
+def apply_operation(operation, first_number, second_number):
+    if isinstance(first_number, LazyReal):
+        return precision.operation(operation, first_number, second_number)
+
+    if operation == '+':
+        return first_number + second_number
+    elif operation == '-':
+        return first_number - second_number
+    elif operation == '*':
+        return first_number * second_number
+    elif operation == '/':
+        return first_number / second_number
+    elif operation == '%':
+        return first_number % second_number
+    elif operation == '^':
+        return first_number ** second_number
+
+
+# What a worker runs for a heavy job: the job itself and, for a precise
+# result, the digits complete() is about to show.
+def compute(function, args):
+    result = function(*args)
+    if isinstance(result, LazyReal):
+        result.digits()
+    return result
+
+
+def run_job(job):
+    try:
+        return True, job.function(*job.args)
+    except Exception as exception:
+        return False, exception
+
+
+def value_key(value):
+    if isinstance(value, LazyReal):
+        return value.key
+    return repr(value)
+
+
+# (expression, trig mode, precision) naming what a job computes, for
+# caches that outlive the process.
+def job_key(job):
+    if job.function is apply_scientific:
+        text, value, trig_mode = job.args
+        expression = f"{text}({value_key(value)})"
+    else:
+        operation, first_number, second_number = job.args
+        trig_mode = ""
+        expression = f"{value_key(first_number)} {operation} {value_key(second_number)}"
+    precise = any(isinstance(arg, LazyReal) for arg in job.args)
+    return expression, trig_mode, "PREC" if precise else "float"
+
+
+class Job:
+    __slots__ = ('function', 'args', 'follow', 'heavy')
+
+    def __init__(self, function, args, follow=None):
+        self.function = function
+        self.args = args
+        self.follow = follow
+        self.heavy = args[0] in HEAVY_KEYS or any(isinstance(arg, LazyReal) for arg in args)
+
+
+# An immutable snapshot of everything the engine shows and remembers.
+# Snapshots hold references to the same strings and numbers, so taking one
+# costs a single small tuple however large the values are.
+CalcState = namedtuple('CalcState', [
+    'current_input', 'display', 'exact', 'digit_offset', 'first_number',
+    'first_text', 'operation', 'second_number', 'trig_mode', 'precise', 'expression'
+], defaults=["", "0", None, 0, None, "", None, False, "DEG", False, None])
+
+
+def state_field(name):
+    # The engine works on a list of the same fields and marks it changed,
+    # so checkpoint() knows whether there is anything new to save.
+    index = CalcState._fields.index(name)
+
+    def set_field(engine, value):
+        engine.fields[index] = value
+        engine.changed = True
+    return property(lambda engine: engine.fields[index], set_field)
+
+
+class CalculatorEngine:
+    current_input = state_field('current_input')
+    display = state_field('display')
+    exact = state_field('exact')
+    digit_offset = state_field('digit_offset')
+    first_number = state_field('first_number')
+    first_text = state_field('first_text')
+    operation = state_field('operation')
+    second_number = state_field('second_number')
+    trig_mode = state_field('trig_mode')
+    precise = state_field('precise')
+    expression = state_field('expression')
+
+    def __init__(self, trig_mode="DEG", precise=False, history=None, undo_depth=UNDO_DEPTH):
+        self.state = CalcState(trig_mode=trig_mode, precise=precise)
+        self.history = history
+        self.undo_stack = deque(maxlen=undo_depth)
+        self.redo_stack = deque(maxlen=undo_depth)
+
+    def press(self, key):
+        job = self.prepare(key)
+        while job is not None:
+            job = self.complete(job, *run_job(job))
+        return self.display
+
+    # prepare() applies everything a key does up to the point where a
+    # computation is needed and returns that computation as a Job.
+    # complete() takes the job's outcome and finishes the key, so callers
+    # are free to run the job somewhere else in between.
+    def prepare(self, key):
+        self.checkpoint()
+        if key.isdigit() or key == '.':
+            self.handle_input(key)
+        elif key in OPERATIONS:
+            return self.handle_operation(key)
+        elif key == '=':
+            return self.calculate()
+        elif key == 'C':
+            self.clear()
+        elif key == '⌫':
+            self.backspace()
+        elif key in SCIENTIFIC_KEYS:
+            return self.scientific(key)
+
+    def complete(self, job, ok, result):
+        if job.function is apply_scientific:
+            self.finish_scientific(ok, result)
+        else:
+            self.finish_calculate(ok, result)
+        if job.follow is not None:
+            return self.prepare(job.follow)
+
+    def feed(self, keys):
+        for key in keys:
+            self.press(key)
+        return self.display
+
+    def run_batch(self, sequences):
+        results = []
+        for keys in sequences:
+            self.clear()
+            results.append(self.feed(keys))
+        return results
+
+    def toggle_mode(self):
+        self.checkpoint()
+        self.trig_mode = "RAD" if self.trig_mode == "DEG" else "DEG"
+
+    def toggle_precision(self):
+        self.checkpoint()
+        self.precise = not self.precise
+
+    @property
+    def state(self):
+        return CalcState._make(self.fields)
+
+    @state.setter
+    def state(self, state):
+        self.fields = list(state)
+        self.changed = True
+
+    # Saves the state before a key changes it. Keys that change nothing
+    # leave the last snapshot current, so no copy of it is saved.
+    def checkpoint(self):
+        if self.changed or not self.undo_stack:
+            self.undo_stack.append(self.state)
+            self.changed = False
+        self.redo_stack.clear()
+
+    def undo(self):
+        current = self.state
+        while self.undo_stack and self.undo_stack[-1] == current:
+            self.undo_stack.pop()
+        if not self.undo_stack:
+            return False
+        self.redo_stack.append(current)
+        self.state = self.undo_stack.pop()
+        return True
+
+    def redo(self):
+        if not self.redo_stack:
+            return False
+        self.undo_stack.append(self.state)
+        self.state = self.redo_stack.pop()
+        return True
+
+    def restore(self, state):
+        self.checkpoint()
+        self.state = state
+
+    def exact_value(self):
+        if self.exact is not None and self.exact[0] == self.current_input:
+            return self.exact[1]
+        return None
+
+    def record(self):
+        if self.history is not None and self.expression is not None:
+            mode = f"{self.trig_mode} PREC" if self.precise else self.trig_mode
+            try:
+                self.history.add(self.expression, self.current_input, mode)
+            except OSError:
+                pass
+        self.expression = None
+
+    def recall(self, text):
+        self.checkpoint()
+        self.clear()
+        self.current_input = text
+        self.update()
+        return self.display
+
+    def operand(self):
+        if not self.precise:
+            return float(self.current_input) if self.current_input else 0.0
+        exact = self.exact_value()
+        if isinstance(exact, LazyReal):
+            return exact
+        try:
+            return LazyReal.literal(self.current_input or "0")
+        except ArithmeticError:
+            raise ValueError(self.current_input) from None
+
+    def show_precise(self, result):
+        text = result.digits()
+        self.current_input = text
+        self.exact = (text, result)
+        self.digit_offset = 0
+        self.display = text
+
+    def scroll(self, step):
+        exact = self.exact_value()
+        if isinstance(exact, LazyReal):
+            # A collapsed operand only holds so many digits.
+            self.digit_offset = max(0, min(self.digit_offset + step, exact.limit - DISPLAY_DIGITS))
+            if self.digit_offset:
+                self.display = exact.window(self.digit_offset)
+            else:
+                self.display = exact.digits()
+        return self.display
+
+    def scientific(self, text):
+        if self.precise and text in ('π', 'e'):
+            self.show_precise(LazyReal('pi' if text == 'π' else 'e'))
+            return
+        elif text == 'π':
+            self.current_input = str(math.pi)
+            self.update()
+            return
+        elif text == 'e':
+            self.current_input = str(math.e)
+            self.update()
+            return
+        elif text == '(':
+            self.current_input += '('
+            self.update()
+            return
+        elif text == ')':
+            self.current_input += ')'
+            self.update()
+            return
+
+        try:
+            value = self.operand()
+        except ValueError:
+            self.display = "Error"
+            self.current_input = ""
+            return
+        self.expression = f"{text}({self.current_input or 0})"
+        return Job(apply_scientific, (text, value, self.trig_mode))
+
+    def finish_scientific(self, ok, result):
+        try:
+            if not ok or result is None:
+                raise ValueError(result)
+
+            if isinstance(result, LazyReal):
+                self.show_precise(result)
+                self.record()
+                return
+
+            if isinstance(result, int) and int_digits(result) > EXACT_DIGITS:
+                result = HugeInt(result)
+            if isinstance(result, HugeInt):
+                self.current_input = result.display()
+                self.exact = (self.current_input, result)
+                self.update()
+                self.record()
+                return
+
+            if abs(result) < 1e-10:
+                result = 0
+
+            if abs(result - round(result, 10)) < 1e-10:
+                result = round(result, 10)
+
+            if isinstance(result, float) and result.is_integer():
+                result = int(result)
+
+            self.current_input = str(result)
+            self.update()
+            self.record()
+
+        except Exception:
+            self.display = "Error"
+            self.current_input = ""
+            self.expression = None
+
+    def handle_input(self, num):
+        if self.second_number:
+            self.current_input = ""
+            self.second_number = False
+
+        if num == '.':
+            if '.' not in self.current_input:
+                if self.current_input == "":
+                    self.current_input = "0."
+                else:
+                    self.current_input += "."
+        else:
+            if self.current_input == "0":
+                self.current_input = num
+            else:
+                self.current_input += num
+
+        self.update()
+
+    def handle_operation(self, operation):
+        if self.current_input:
+            if self.first_number is not None and not self.second_number:
+                job = self.calculate()
+                if job is not None:
+                    job.follow = operation
+                    return job
+
+            try:
+                self.first_number = self.operand()
+            except ValueError:
+                self.clear()
+                self.display = "Error"
+                return
+            self.operation = operation
+            self.first_text = self.current_input
+            self.second_number = True
+
+            display_operation = DISPLAY_OPERATIONS.get(operation, operation)
+            self.display = f"{self.current_input} {display_operation}"
+
+    def calculate(self):
+        if self.first_number is not None and self.operation and self.current_input:
+            try:
+                second_number = self.operand()
+            except ValueError:
+                self.clear()
+                self.display = "Error"
+                return
+            display_operation = DISPLAY_OPERATIONS.get(self.operation, self.operation)
+            self.expression = f"{self.first_text} {display_operation} {self.current_input}"
+            return Job(apply_operation, (self.operation, self.first_number, second_number))
+
+    def finish_calculate(self, ok, result):
+        try:
+            if not ok:
+                raise result
+
+            if isinstance(result, LazyReal):
+                self.show_precise(result)
+            else:
+                if abs(result) < 1e-10:
+                    result = 0
+
+                if isinstance(result, float) and result.is_integer():
+                    result = int(result)
+                else:
+                    result = round(result, 10)
+
+                self.display = str(result)
+                self.current_input = str(result)
+            self.first_number = None
+            self.operation = None
+            self.second_number = False
+            self.record()
+
+        except Exception:
+            self.clear()
+            self.display = "Error"
+            self.expression = None
+
+    def clear(self):
+        self.state = CalcState(trig_mode=self.trig_mode, precise=self.precise, expression=self.expression)
+
+    def backspace(self):
+        if self.current_input:
+            self.current_input = self.current_input[:-1]
+            if not self.current_input:
+                self.current_input = "0"
+            self.update()
+
+    def update(self):
+        if self.current_input == "":
+            self.display = "0"
+        else:
+            if len(self.current_input) > 15:
+                try:
+                    num = float(self.current_input)
+                    if abs(num) > 1e12 or (abs(num) < 1e-4 and num != 0):
+                        self.display = f"{num:.4e}"
+                    else:
+                        self.display = f"{num:.8g}"
+                except Exception:
+                    self.display = self.current_input[:15] + "..."
+            else:
+                self.display = self.current_input
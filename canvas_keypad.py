@@ -0,0 +1,165 @@
+import tkinter as tk
+
+
+def rounded_rectangle(canvas, x1, y1, x2, y2, radius, **options):
+    if radius <= 0:
+        return canvas.create_rectangle(x1, y1, x2, y2, **options)
+    points = [
+        x1 + radius, y1, x2 - radius, y1, x2, y1, x2, y1 + radius,
+        x2, y2 - radius, x2, y2, x2 - radius, y2, x1 + radius, y2,
+        x1, y2, x1, y2 - radius, x1, y1 + radius, x1, y1,
+    ]
+    return canvas.create_polygon(points, smooth=True, **options)
+
+
+class CanvasKey:
+    # Stands in for a tk.Button where the calculators only touch 'bg',
+    # so hover and highlight code works unchanged on canvas keys.
+    def __init__(self, keypad, text, row, col, colspan, bg, fg, hover_bg):
+        self.keypad = keypad
+        self.text = text
+        self.row = row
+        self.col = col
+        self.colspan = colspan
+        self.bg = bg
+        self.fg = fg
+        self.hover_bg = hover_bg
+        self.fill = bg
+        self.shape = None
+        self.label = None
+
+    def cget(self, option):
+        if option == 'bg':
+            return self.fill
+        raise tk.TclError(f"unknown option {option!r}")
+
+    def config(self, bg=None, **options):
+        if bg is not None and bg != self.fill:
+            self.fill = bg
+            self.keypad.redraw(self)
+
+    configure = config
+
+    def __getitem__(self, option):
+        return self.cget(option)
+
+    def __setitem__(self, option, value):
+        self.config(**{option: value})
+
+
+class CanvasKeypad:
+    def __init__(self, parent, layout, command, style, font=None, bg='#000000',
+                 cell_width=80, cell_height=70, gap=6, radius=0, spans=None):
+        self.command = command
+        self.font = font
+        self.gap = gap
+        self.radius = radius
+        self.rows = len(layout)
+        self.columns = max(len(row) for row in layout)
+        self.keys = {}
+        self.cells = {}
+        spans = spans or {}
+
+        for row_index, row in enumerate(layout):
+            for column_index, text in enumerate(row):
+                if text == '':
+                    continue
+                colspan = spans.get(text, 1)
+                bg_color, fg_color, hover_color = style(text)
+                key = CanvasKey(self, text, row_index, column_index, colspan, bg_color, fg_color, hover_color)
+                self.keys[text] = key
+                for offset in range(colspan):
+                    self.cells[(row_index, column_index + offset)] = key
+
+        self.canvas = tk.Canvas(
+            parent,
+            width=self.columns * cell_width,
+            height=self.rows * cell_height,
+            bg=bg,
+            highlightthickness=0,
+            borderwidth=0,
+            cursor='hand2'
+        )
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.hovered = None
+        self.pressed = None
+
+        self.canvas.bind('<Configure>', self.on_resize)
+        self.canvas.bind('<Motion>', self.on_motion)
+        self.canvas.bind('<Leave>', self.on_leave)
+        self.canvas.bind('<ButtonPress-1>', self.on_press)
+        self.canvas.bind('<ButtonRelease-1>', self.on_release)
+        self.draw()
+
+    def pack(self, **options):
+        self.canvas.pack(**options)
+
+    def grid(self, **options):
+        self.canvas.grid(**options)
+
+    def draw(self):
+        self.canvas.delete('all')
+        for key in self.keys.values():
+            x1 = key.col * self.cell_width + self.gap / 2
+            y1 = key.row * self.cell_height + self.gap / 2
+            x2 = (key.col + key.colspan) * self.cell_width - self.gap / 2
+            y2 = (key.row + 1) * self.cell_height - self.gap / 2
+            key.shape = rounded_rectangle(self.canvas, x1, y1, x2, y2, self.radius, fill=key.fill, outline='')
+            key.label = self.canvas.create_text(
+                (x1 + x2) / 2, (y1 + y2) / 2, text=key.text, fill=key.fg, font=self.font
+            )
+
+    def redraw(self, key):
+        if key.shape is not None:
+            self.canvas.itemconfigure(key.shape, fill=key.fill)
+
+    def key_at(self, x, y):
+        col = int(x // self.cell_width)
+        row = int(y // self.cell_height)
+        key = self.cells.get((row, col))
+        if key is None:
+            return None
+        # Clicks in the gap between keys belong to no key.
+        inner_x = x - key.col * self.cell_width
+        inner_y = y - row * self.cell_height
+        half_gap = self.gap / 2
+        if inner_y < half_gap or inner_y > self.cell_height - half_gap:
+            return None
+        if inner_x < half_gap or inner_x > key.colspan * self.cell_width - half_gap:
+            return None
+        return key
+
+    def set_hovered(self, key):
+        if key is self.hovered:
+            return
+        previous = self.hovered
+        self.hovered = key
+        if previous is not None:
+            previous.config(bg=previous.bg)
+        if key is not None:
+            key.config(bg=key.hover_bg)
+
+    def on_resize(self, event):
+        cell_width = event.width / self.columns
+        cell_height = event.height / self.rows
+        if (cell_width, cell_height) != (self.cell_width, self.cell_height):
+            self.cell_width = cell_width
+            self.cell_height = cell_height
+            self.draw()
+
+    def on_motion(self, event):
+        self.set_hovered(self.key_at(event.x, event.y))
+
+    def on_leave(self, event):
+        self.set_hovered(None)
+        self.pressed = None
+
+    def on_press(self, event):
+        self.pressed = self.key_at(event.x, event.y)
+
+    def on_release(self, event):
+        key = self.key_at(event.x, event.y)
+        if key is not None and key is self.pressed:
+            self.command(key.text)
+        self.pressed = None
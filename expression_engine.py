@@ -0,0 +1,531 @@
+import math
+import operator
+import re
+from collections import OrderedDict
+
+from scientific import EXACT_DEGREES
+
+
+def n_sqrt(x, n):
+    return math.pow(x, 1/n)
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class FunctionOfX:
+    # solve(f, a, b) and integrate(f, a, b) take an expression in x rather
+    # than a value, so the compiler hands the whole call to compile() and
+    # numeric builds the body once as a function of an array of x.
+    special = True
+
+    def __init__(self, method, fallback=None):
+        self.method = method
+        self.fallback = fallback
+
+    def compile(self, compiler, node):
+        if self.fallback is not None and len(node.args) != 3:
+            return compiler.compile_call(self.fallback, node.args)
+        import numeric
+        return numeric.compile_form(compiler, node, getattr(numeric, self.method))
+
+
+class Number:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Name:
+    __slots__ = ('id',)
+
+    def __init__(self, id):
+        self.id = id
+
+
+class UnaryOp:
+    __slots__ = ('op', 'operand')
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+
+class BinOp:
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Call:
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+
+class Array:
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+
+TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<op>\*\*|//|[-+*/%(),@\[\]])
+""", re.VERBOSE)
+
+
+def tokenize(source):
+    tokens = []
+    position = 0
+    while position < len(source):
+        match = TOKEN_RE.match(source, position)
+        if match is None:
+            raise ExpressionError(f"Unexpected character {source[position]!r} at {position}")
+        kind = match.lastgroup
+        if kind != 'space':
+            tokens.append((kind, match.group(), match.start()))
+        position = match.end()
+    return tokens
+
+
+def normalize(tokens):
+    return " ".join(text for kind, text, start in tokens)
+
+
+def parse_number(text):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+class Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self):
+        if self.index < len(self.tokens):
+            return self.tokens[self.index][1]
+        return None
+
+    def next(self):
+        if self.index >= len(self.tokens):
+            raise ExpressionError("Unexpected end of expression")
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, text):
+        kind, token_text, start = self.next()
+        if token_text != text:
+            raise ExpressionError(f"Expected {text!r} at {start}, got {token_text!r}")
+
+    # Called with every node the parser builds and the index of its first
+    # token; subclasses use it to remember where each node came from.
+    def finish(self, node, start):
+        return node
+
+    def parse(self):
+        node = self.expression()
+        if self.index != len(self.tokens):
+            kind, text, start = self.tokens[self.index]
+            raise ExpressionError(f"Unexpected {text!r} at {start}")
+        return node
+
+    def expression(self):
+        start = self.index
+        node = self.term()
+        while self.peek() in ('+', '-'):
+            op = self.next()[1]
+            node = self.finish(BinOp(op, node, self.term()), start)
+        return node
+
+    def term(self):
+        start = self.index
+        node = self.unary()
+        while self.peek() in ('*', '/', '//', '%', '@'):
+            op = self.next()[1]
+            node = self.finish(BinOp(op, node, self.unary()), start)
+        return node
+
+    def unary(self):
+        start = self.index
+        if self.peek() in ('+', '-'):
+            op = self.next()[1]
+            return self.finish(UnaryOp(op, self.unary()), start)
+        return self.power()
+
+    def power(self):
+        start = self.index
+        node = self.atom()
+        if self.peek() == '**':
+            self.next()
+            node = self.finish(BinOp('**', node, self.unary()), start)
+        return node
+
+    def atom(self):
+        index = self.index
+        kind, text, start = self.next()
+        if kind == 'number':
+            return self.finish(Number(parse_number(text)), index)
+        if kind == 'name':
+            if self.peek() == '(':
+                self.next()
+                args = []
+                if self.peek() != ')':
+                    args.append(self.expression())
+                    while self.peek() == ',':
+                        self.next()
+                        args.append(self.expression())
+                self.expect(')')
+                return self.finish(Call(text, args), index)
+            return self.finish(Name(text), index)
+        if text == '(':
+            node = self.expression()
+            self.expect(')')
+            return node
+        if text == '[':
+            items = [self.expression()]
+            while self.peek() == ',':
+                self.next()
+                items.append(self.expression())
+            self.expect(']')
+            return self.finish(Array(items), index)
+        raise ExpressionError(f"Unexpected {text!r} at {start}")
+
+
+def parse(source):
+    return Parser(tokenize(source)).parse()
+
+
+def names_in(node, found=None):
+    if found is None:
+        found = set()
+    if isinstance(node, Name):
+        found.add(node.id)
+    elif isinstance(node, UnaryOp):
+        names_in(node.operand, found)
+    elif isinstance(node, BinOp):
+        names_in(node.left, found)
+        names_in(node.right, found)
+    elif isinstance(node, Call):
+        found.add(node.func)
+        for arg in node.args:
+            names_in(arg, found)
+    elif isinstance(node, Array):
+        for item in node.items:
+            names_in(item, found)
+    return found
+
+
+# User function calls estimate_digits follows before giving up.
+MAX_CALLS = 10000
+
+
+# Rough upper bound, in decimal digits, of the largest integer an
+# expression builds along the way.  Used to refuse things like 9**9**9
+# before any work is spent on them.  values gives the numbers that names
+# stand for, where they are known; functions maps user functions to their
+# (params, body tree), so a call is sized by its body.
+def estimate_digits(node, values=None, functions=None):
+    largest = 0.0
+    calls = 0
+
+    def magnitude(node, bound):
+        nonlocal largest, calls
+        if isinstance(node, Number):
+            result = math.log10(abs(node.value)) if node.value else 0.0
+        elif isinstance(node, Name) and node.id in bound:
+            result = bound[node.id]
+        elif isinstance(node, Name):
+            value = values.get(node.id) if values is not None else None
+            # math.log10 takes ints of any size; isfinite() would overflow.
+            if isinstance(value, float) and not math.isfinite(value):
+                result = 0.0
+            elif isinstance(value, (int, float)) and value:
+                result = math.log10(abs(value))
+            else:
+                result = 0.0
+        elif isinstance(node, UnaryOp):
+            result = magnitude(node.operand, bound)
+        elif isinstance(node, BinOp):
+            left = magnitude(node.left, bound)
+            right = magnitude(node.right, bound)
+            if node.op in ('+', '-'):
+                result = max(left, right) + math.log10(2)
+            elif node.op == '*':
+                result = left + right
+            elif node.op == '**':
+                exponent = 10 ** right if right < 300 else math.inf
+                result = left * exponent if left > 0 else 0.0
+            elif node.op == '%':
+                result = right
+            else:
+                result = left
+        elif isinstance(node, Call):
+            args = [magnitude(arg, bound) for arg in node.args]
+            function = functions.get(node.func) if functions is not None else None
+            if function is not None:
+                # Every call is walked, as it would be run; a call tree too
+                # big to walk is too big to run.
+                calls += 1
+                if calls > MAX_CALLS:
+                    result = math.inf
+                else:
+                    params, body = function
+                    result = magnitude(body, dict(zip(params, args)))
+            elif node.func in ('factorial', 'comb', 'perm') and args:
+                n = 10 ** args[0] if args[0] < 300 else math.inf
+                result = n * math.log10(n) if n > 1 else 0.0
+            else:
+                result = max(args, default=0.0)
+        elif isinstance(node, Array):
+            result = max(magnitude(item, bound) for item in node.items)
+        else:
+            result = 0.0
+        largest = max(largest, result)
+        return result
+
+    magnitude(node, {})
+    return largest
+
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '//': operator.floordiv,
+    '%': operator.mod,
+    '**': operator.pow,
+    '@': operator.matmul,
+}
+
+# Constant subtrees are folded at compile time, in whatever process
+# compiles them; ones that would build a bigger number than this are left
+# to evaluation, where the sandbox limits apply.
+FOLD_DIGITS = 10000
+
+UNARY_OPERATORS = {
+    '+': operator.pos,
+    '-': operator.neg,
+}
+
+
+def default_namespace():
+    namespace = {name: value for name, value in math.__dict__.items() if not name.startswith('_')}
+    for builtin in (abs, round, min, max, int, float):
+        namespace[builtin.__name__] = builtin
+    namespace['n_sqrt'] = n_sqrt
+    namespace['solve'] = FunctionOfX('find_root')
+    namespace['integrate'] = FunctionOfX('integrate')
+    return namespace
+
+
+def degree_function(name, function):
+    # Angles with a closed form (multiples of 15° and 18°) come from the
+    # same tables the button calculator uses, so sin(30) is exactly 0.5.
+    exact = EXACT_DEGREES[name]
+
+    def degrees(x):
+        value = exact(x)
+        return function(x) if value is None else value
+    return degrees
+
+
+def degree_namespace():
+    namespace = default_namespace()
+    for name in ('sin', 'cos', 'tan'):
+        function = getattr(math, name)
+        namespace[name] = degree_function(name, lambda x, function=function: function(math.radians(x)))
+    for name in ('asin', 'acos', 'atan'):
+        function = getattr(math, name)
+        namespace[name] = degree_function(name, lambda x, function=function: math.degrees(function(x)))
+    namespace['atan2'] = lambda y, x: math.degrees(math.atan2(y, x))
+    return namespace
+
+
+class CompiledExpression:
+    __slots__ = ('source', 'tree', 'variables', 'function')
+
+    def __init__(self, source, tree, variables, function):
+        self.source = source
+        self.tree = tree
+        self.variables = variables
+        self.function = function
+
+    def __call__(self, **variables):
+        return self.function(variables)
+
+    def evaluate(self, env=None):
+        return self.function(env if env is not None else {})
+
+
+class Compiler:
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.variables = set()
+
+    # Every compile step returns (function, is_constant, value) so that
+    # parents can fold whole constant subtrees into a single value.
+    def compile(self, node):
+        method = getattr(self, 'compile_' + type(node).__name__)
+        return method(node)
+
+    def constant(self, value):
+        return (lambda env: value), True, value
+
+    def foldable(self, node):
+        try:
+            return estimate_digits(node) <= FOLD_DIGITS
+        except (TypeError, ValueError, OverflowError):
+            return True
+
+    def compile_Number(self, node):
+        return self.constant(node.value)
+
+    def compile_Name(self, node):
+        name = node.id
+        value = self.namespace.get(name)
+        if value is not None and not callable(value):
+            return self.constant(value)
+        self.variables.add(name)
+
+        def load(env):
+            try:
+                return env[name]
+            except KeyError:
+                raise NameError(f"name {name!r} is not defined") from None
+        return load, False, None
+
+    def compile_UnaryOp(self, node):
+        op = UNARY_OPERATORS[node.op]
+        operand, is_constant, value = self.compile(node.operand)
+        if is_constant:
+            try:
+                return self.constant(op(value))
+            except Exception:
+                pass
+        return (lambda env: op(operand(env))), False, None
+
+    def compile_BinOp(self, node):
+        op = BINARY_OPERATORS[node.op]
+        left, left_constant, left_value = self.compile(node.left)
+        right, right_constant, right_value = self.compile(node.right)
+        if left_constant and right_constant and self.foldable(
+                BinOp(node.op, Number(left_value), Number(right_value))):
+            try:
+                return self.constant(op(left_value, right_value))
+            except Exception:
+                pass
+        if left_constant:
+            return (lambda env: op(left_value, right(env))), False, None
+        if right_constant:
+            return (lambda env: op(left(env), right_value)), False, None
+        return (lambda env: op(left(env), right(env))), False, None
+
+    def compile_Call(self, node):
+        function = self.namespace.get(node.func)
+        if getattr(function, 'special', False):
+            return function.compile(self, node)
+        if not callable(function):
+            raise ExpressionError(f"Unknown function {node.func!r}")
+        return self.compile_call(function, node.args, node.func)
+
+    def compile_call(self, function, nodes, name=None):
+        compiled = [self.compile(arg) for arg in nodes]
+        # Functions whose result can change between calls opt out of folding.
+        if (getattr(function, 'pure', True) and all(is_constant for _, is_constant, _ in compiled)
+                and self.foldable(Call(name, [Number(value) for _, _, value in compiled]))):
+            try:
+                return self.constant(function(*[value for _, _, value in compiled]))
+            except Exception:
+                pass
+        args = [arg for arg, _, _ in compiled]
+        if len(args) == 1:
+            arg = args[0]
+            return (lambda env: function(arg(env))), False, None
+        if len(args) == 2:
+            first, second = args
+            return (lambda env: function(first(env), second(env))), False, None
+        return (lambda env: function(*[arg(env) for arg in args])), False, None
+
+
+    # Bracket literals are built by the namespace's '__array__' entry, so
+    # only namespaces that know about matrices accept them.
+    def compile_Array(self, node):
+        build = self.namespace.get('__array__')
+        if build is None:
+            raise ExpressionError("Matrix literals are only available in matrix mode")
+        compiled = [self.compile(item) for item in node.items]
+        if all(is_constant for _, is_constant, _ in compiled):
+            return self.constant(build([value for _, _, value in compiled]))
+        items = [item for item, _, _ in compiled]
+        return (lambda env: build([item(env) for item in items])), False, None
+
+
+class ExpressionEngine:
+    def __init__(self, namespace=None, cache_size=512):
+        self.namespace = namespace if namespace is not None else default_namespace()
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def remember(self, key, compiled):
+        self.cache[key] = compiled
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def compile(self, source):
+        compiled = self.cache.get(source)
+        if compiled is not None:
+            self.cache.move_to_end(source)
+            self.hits += 1
+            return compiled
+
+        tokens = tokenize(source)
+        key = normalize(tokens)
+        compiled = self.cache.get(key)
+        if compiled is None:
+            self.misses += 1
+            tree = Parser(tokens).parse()
+            compiler = Compiler(self.namespace)
+            function, is_constant, value = compiler.compile(tree)
+            compiled = CompiledExpression(key, tree, frozenset(compiler.variables), function)
+            self.remember(key, compiled)
+        else:
+            self.hits += 1
+        self.remember(source, compiled)
+        return compiled
+
+    def evaluate(self, source, env=None):
+        return self.compile(source).evaluate(env)
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+default_engine = ExpressionEngine()
+
+
+def compile_expression(source):
+    return default_engine.compile(source)
+
+
+def evaluate(source, **variables):
+    return default_engine.compile(source).evaluate(variables)
@@ -0,0 +1,250 @@
+import mmap
+import os
+import struct
+import time
+import tkinter as tk
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# timestamp, then the byte lengths of mode, expression and result; the
+# three strings follow as UTF-8.
+HEADER = struct.Struct('<dBII')
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.calculator_history')
+
+
+@contextmanager
+def locked(handle):
+    # Both calculators write the same log, so appending (and indexing what
+    # the other one appended) happens under an exclusive file lock.
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        yield
+
+
+class History:
+    # An append-only log of evaluations. Reads go through a memory map and
+    # a sidecar file of record offsets, so opening a long history reads
+    # neither the log nor its records up front.
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.offsets = array('Q')
+        self.map = None
+        self.mapped = 0
+
+        self.log = open(path, 'ab+')
+        self.size = 0
+        with locked(self.log):
+            size = os.fstat(self.log.fileno()).st_size
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'rb') as handle:
+                    data = handle.read()
+                self.offsets.frombytes(data[:len(data) - len(data) % self.offsets.itemsize])
+            # An index that is not strictly increasing or points past the
+            # log is rebuilt from the log.
+            if self.offsets and (self.offsets[-1] >= size
+                                 or any(a >= b for a, b in zip(self.offsets, self.offsets[1:]))):
+                self.offsets = array('Q')
+            indexed = len(self.offsets)
+            self.recover()
+            if len(self.offsets) == indexed:
+                self.index = open(self.index_path, 'ab')
+            else:
+                self.index = open(self.index_path, 'wb')
+                self.offsets.tofile(self.index)
+                self.index.flush()
+
+    def recover(self):
+        self.scan(self.offsets.pop() if self.offsets else 0)
+
+    def scan(self, position):
+        # Indexes the records from position to the real end of the log and
+        # cuts off a record that was only partly written. Called with the
+        # lock held.
+        self.size = os.fstat(self.log.fileno()).st_size
+        view = self.view()
+        while position + HEADER.size <= self.size:
+            _, mode_length, expression_length, result_length = HEADER.unpack_from(view, position)
+            end = position + HEADER.size + mode_length + expression_length + result_length
+            if end > self.size:
+                break
+            self.offsets.append(position)
+            position = end
+        if position < self.size:
+            self.close_map()
+            self.log.truncate(position)
+            self.size = position
+
+    def sync(self):
+        # Picks up records another process appended since we last looked.
+        size = os.fstat(self.log.fileno()).st_size
+        if size > self.size:
+            self.scan(self.size)
+        elif size < self.size:
+            self.offsets = array('Q')
+            self.scan(0)
+
+    def refresh(self):
+        with locked(self.log):
+            self.sync()
+
+    def view(self):
+        if self.mapped != self.size:
+            self.close_map()
+            if self.size:
+                self.log.flush()
+                self.map = mmap.mmap(self.log.fileno(), self.size, access=mmap.ACCESS_READ)
+            self.mapped = self.size
+        return self.map
+
+    def close_map(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.mapped = 0
+
+    def add(self, expression, result, mode='', timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        mode = mode.encode('utf-8')[:255]
+        expression = expression.encode('utf-8')
+        result = result.encode('utf-8')
+        record = HEADER.pack(timestamp, len(mode), len(expression), len(result)) + mode + expression + result
+        with locked(self.log):
+            self.sync()
+            self.log.write(record)
+            self.log.flush()
+            self.offsets.append(self.size)
+            self.index.write(struct.pack('<Q', self.size))
+            self.index.flush()
+            self.size += len(record)
+        return len(self.offsets) - 1
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def header(self, number):
+        return HEADER.unpack_from(self.view(), self.offsets[number])
+
+    def expression_span(self, number):
+        _, mode_length, expression_length, _ = self.header(number)
+        start = self.offsets[number] + HEADER.size + mode_length
+        return start, start + expression_length
+
+    def entry(self, number):
+        view = self.view()
+        timestamp, mode_length, expression_length, result_length = self.header(number)
+        position = self.offsets[number] + HEADER.size
+        fields = []
+        for length in (mode_length, expression_length, result_length):
+            fields.append(view[position:position + length].decode('utf-8'))
+            position += length
+        mode, expression, result = fields
+        return timestamp, mode, expression, result
+
+    def search(self, text, prefix=False, limit=200):
+        # Newest first. Matches are found with mmap.rfind over the whole
+        # log and mapped back to records through the offset index, and a
+        # hit only counts if it lies inside the expression.
+        self.refresh()
+        if not text:
+            return list(range(len(self) - 1, max(len(self) - limit, 0) - 1, -1))
+        needle = text.encode('utf-8')
+        view = self.view()
+        found = []
+        end = self.size
+        while len(found) < limit and end > 0:
+            position = view.rfind(needle, 0, end)
+            if position < 0:
+                break
+            number = bisect_right(self.offsets, position) - 1
+            start, stop = self.expression_span(number)
+            if position >= start and position + len(needle) <= stop and (not prefix or position == start):
+                found.append(number)
+                end = self.offsets[number]
+            else:
+                end = position + len(needle) - 1
+        return found
+
+    def close(self):
+        self.close_map()
+        self.log.close()
+        self.index.close()
+
+
+class HistoryWindow:
+    def __init__(self, parent, history, on_recall, bg='#000000', fg='#ffffff',
+                 select_bg='#00d2be', font=None):
+        self.history = history
+        self.on_recall = on_recall
+        self.found = []
+        self.search_id = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("History")
+        self.window.configure(bg=bg)
+        self.window.geometry("420x400")
+
+        self.query = tk.StringVar()
+        self.query.trace_add('write', lambda *args: self.schedule())
+        search = tk.Entry(self.window, textvariable=self.query, font=font)
+        search.pack(fill='x', padx=10, pady=(10, 5))
+        search.focus_set()
+
+        self.list = tk.Listbox(self.window, bg=bg, fg=fg, font=font, borderwidth=0,
+                               highlightthickness=0, selectbackground=select_bg, activestyle='none')
+        self.list.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        self.list.bind('<Double-Button-1>', lambda event: self.recall())
+        self.list.bind('<Return>', lambda event: self.recall())
+        search.bind('<Return>', lambda event: self.recall())
+        search.bind('<Down>', lambda event: self.list.focus_set())
+        self.window.bind('<Escape>', lambda event: self.window.destroy())
+        self.refresh()
+
+    def schedule(self):
+        if self.search_id is not None:
+            self.window.after_cancel(self.search_id)
+        self.search_id = self.window.after(100, self.refresh)
+
+    def refresh(self):
+        self.search_id = None
+        query = self.query.get()
+        prefix = query.startswith('^')
+        self.found = self.history.search(query[1:] if prefix else query, prefix=prefix)
+        self.list.delete(0, 'end')
+        for number in self.found:
+            timestamp, mode, expression, result = self.history.entry(number)
+            stamp = time.strftime('%d.%m %H:%M', time.localtime(timestamp))
+            self.list.insert('end', f"{stamp}  {expression} = {result}")
+        if self.found:
+            self.list.selection_set(0)
+
+    def recall(self):
+        selection = self.list.curselection()
+        if not selection:
+            return
+        self.on_recall(*self.history.entry(self.found[selection[0]]))
+        self.window.destroy()
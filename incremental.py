@@ -0,0 +1,137 @@
+from collections import OrderedDict
+
+from expression_engine import (
+    BINARY_OPERATORS, UNARY_OPERATORS, BinOp, Call, ExpressionError, Name,
+    Number, Parser, TOKEN_RE, UnaryOp, default_namespace, estimate_digits,
+    normalize,
+)
+
+# How far past the end of a token the tokenizer may look before deciding
+# where the token stops ("1.e+5" vs "1.e+x").
+LOOKAHEAD = 3
+PREVIEW_DIGITS = 10000
+
+
+class SpanParser(Parser):
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.spans = {}
+
+    def finish(self, node, start):
+        self.spans[node] = (start, self.index)
+        return node
+
+
+def shift(tokens, delta):
+    return [(kind, text, start + delta) for kind, text, start in tokens]
+
+
+class IncrementalParser:
+    def __init__(self, namespace=None, cache_size=1024, max_digits=PREVIEW_DIGITS):
+        self.namespace = namespace if namespace is not None else default_namespace()
+        self.cache_size = cache_size
+        self.max_digits = max_digits
+        self.text = ""
+        self.tokens = []
+        self.key = ""
+        self.result = None
+        self.values = OrderedDict()
+        self.retokenized = 0
+        self.evaluated = 0
+
+    def retokenize(self, text):
+        old = self.text
+        prefix = 0
+        limit = min(len(old), len(text))
+        while prefix < limit and old[prefix] == text[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == text[-1 - suffix]:
+            suffix += 1
+
+        delta = len(text) - len(old)
+        head = [token for token in self.tokens if token[2] + len(token[1]) + LOOKAHEAD <= prefix]
+        # Old tokens that start inside the unchanged suffix, keyed by where
+        # they start in the new text.
+        tail = shift([token for token in self.tokens if token[2] >= len(old) - suffix], delta)
+        resume = {token[2]: index for index, token in enumerate(tail)}
+
+        # The tokenizer keeps no state between tokens, so once it reaches a
+        # position where an old token started, the rest reads as before.
+        middle = []
+        position = head[-1][2] + len(head[-1][1]) if head else 0
+        scanned = position
+        while position < len(text):
+            if position in resume:
+                self.retokenized += position - scanned
+                return head + middle + tail[resume[position]:]
+            match = TOKEN_RE.match(text, position)
+            if match is None:
+                raise ExpressionError(f"Unexpected character {text[position]!r} at {position}")
+            if match.lastgroup != 'space':
+                middle.append((match.lastgroup, match.group(), position))
+            position = match.end()
+        self.retokenized += position - scanned
+        return head + middle
+
+    def update(self, text):
+        try:
+            tokens = self.retokenize(text)
+        except ExpressionError:
+            tokens = None
+        self.text = text
+        if tokens is None:
+            self.tokens = []
+            self.key = ""
+            self.result = None
+            return None
+        self.tokens = tokens
+
+        key = normalize(tokens)
+        if key == self.key:
+            return self.result
+        self.key = key
+        self.result = None
+        try:
+            parser = SpanParser(tokens)
+            tree = parser.parse()
+            if estimate_digits(tree) > self.max_digits:
+                return None
+            self.spans = parser.spans
+            self.result = self.value(tree)
+        except Exception:
+            self.result = None
+        return self.result
+
+    # Values are remembered per subtree, keyed by the subtree's own tokens,
+    # so after an edit only the nodes whose text changed are recomputed.
+    def value(self, node):
+        start, end = self.spans[node]
+        key = normalize(self.tokens[start:end])
+        if key in self.values:
+            self.values.move_to_end(key)
+            return self.values[key]
+
+        self.evaluated += 1
+        if isinstance(node, Number):
+            result = node.value
+        elif isinstance(node, Name):
+            result = self.namespace.get(node.id)
+            if result is None or callable(result):
+                raise NameError(node.id)
+        elif isinstance(node, UnaryOp):
+            result = UNARY_OPERATORS[node.op](self.value(node.operand))
+        elif isinstance(node, BinOp):
+            result = BINARY_OPERATORS[node.op](self.value(node.left), self.value(node.right))
+        elif isinstance(node, Call):
+            function = self.namespace.get(node.func)
+            if not callable(function):
+                raise NameError(node.func)
+            result = function(*[self.value(arg) for arg in node.args])
+        else:
+            raise ExpressionError("No preview for matrices")
+
+        self.values[key] = result
+        if len(self.values) > self.cache_size:
+            self.values.popitem(last=False)
+        return result
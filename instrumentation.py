@@ -0,0 +1,232 @@
+import atexit
+import json
+import os
+import tkinter as tk
+from bisect import bisect_left
+from time import perf_counter
+
+# Bucket edges from 1 µs to about 16 s, eight per doubling, so a recorded
+# time costs one bisect and percentiles are within ~9% of the real value.
+BOUNDS = [1e-6 * 2 ** (i / 8) for i in range(8 * 24)]
+OVERLAY_MS = 500
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(BOUNDS[index] if index < len(BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+def timed(function, histogram):
+    def wrapper(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.record(perf_counter() - started)
+    return wrapper
+
+
+class Profiler:
+    # Timing wrappers are installed as instance (or module) attributes over
+    # the methods being measured and removed again when profiling stops,
+    # so with it off every call goes straight to the original code.
+    def __init__(self, root, targets, keys=(), display=None, always=False, dump_path=None):
+        self.root = root
+        self.targets = targets
+        self.keys = keys
+        self.display = display
+        self.dump_path = dump_path
+        self.histograms = {}
+        self.installed = []
+        self.label = None
+        self.overlay_id = None
+        self.key_started = None
+        self.dump_registered = False
+        self.always = always
+        if always:
+            self.install()
+
+    @property
+    def active(self):
+        return bool(self.installed)
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def install(self):
+        if self.active:
+            return
+        for target, names, prefix in self.targets:
+            for name in names:
+                self.wrap(target, name, lambda original, name=name, prefix=prefix:
+                          timed(original, self.histogram(f"{prefix}.{name}")))
+        for target, name in self.keys:
+            self.wrap(target, name, self.watch_key)
+        if self.display is not None:
+            self.wrap(*self.display, self.watch_display)
+        if not self.dump_registered and self.dump_path:
+            atexit.register(self.dump)
+            self.dump_registered = True
+
+    def wrap(self, target, name, make):
+        original = getattr(target, name)
+        self.installed.append((target, name, original, name in vars(target)))
+        setattr(target, name, make(original))
+
+    def uninstall(self):
+        for target, name, original, own in reversed(self.installed):
+            if own:
+                setattr(target, name, original)
+            else:
+                delattr(target, name)
+        self.installed = []
+
+    # Marks where a keystroke entered; the next call to displayed() records
+    # the whole way to the screen.
+    def key_entered(self):
+        if self.key_started is None:
+            self.key_started = perf_counter()
+
+    def displayed(self, started):
+        # Tk repaints from idle callbacks queued by the change, which run
+        # before this one.
+        def painted():
+            now = perf_counter()
+            self.histogram('tk.redraw').record(now - started)
+            if self.key_started is not None:
+                self.histogram('key_to_display').record(now - self.key_started)
+                self.key_started = None
+        self.root.after_idle(painted)
+
+    def watch_key(self, original):
+        def wrapper(*args, **kwargs):
+            self.key_entered()
+            return original(*args, **kwargs)
+        return wrapper
+
+    def watch_display(self, original):
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            result = original(*args, **kwargs)
+            self.displayed(started)
+            return result
+        return wrapper
+
+    def toggle(self):
+        if self.label is None:
+            self.show()
+        else:
+            self.hide()
+
+    def show(self):
+        self.install()
+        self.label = tk.Label(self.root, justify='left', anchor='nw', font=('Courier', 9),
+                              bg='#202020', fg='#e0e0e0')
+        self.label.place(relx=0, rely=1, anchor='sw')
+        self.refresh_overlay()
+
+    def hide(self):
+        if self.overlay_id is not None:
+            self.root.after_cancel(self.overlay_id)
+            self.overlay_id = None
+        self.label.destroy()
+        self.label = None
+        if not self.always:
+            self.uninstall()
+
+    def refresh_overlay(self):
+        lines = [f"{'stage':<28}{'n':>6}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+        for name, histogram in sorted(self.histograms.items()):
+            if histogram.count:
+                stats = histogram.summary()
+                lines.append(f"{name:<28}{stats['count']:>6}{stats['p50_ms']:>8.2f}"
+                             f"{stats['p95_ms']:>8.2f}{stats['p99_ms']:>8.2f}")
+        self.label.config(text="\n".join(lines))
+        self.label.lift()
+        self.overlay_id = self.root.after(OVERLAY_MS, self.refresh_overlay)
+
+    def report(self):
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())
+                if histogram.count}
+
+    def dump(self):
+        with open(self.dump_path, 'w', encoding='utf-8') as handle:
+            json.dump(self.report(), handle, indent=2)
+
+
+def from_env(root, targets, keys=(), display=None):
+    # CALC_PROFILE records from the start; otherwise F12 turns recording on
+    # together with the overlay. Either way the numbers are written to
+    # CALC_PROFILE_FILE at exit.
+    return Profiler(
+        root,
+        targets,
+        keys,
+        display,
+        always=bool(os.environ.get("CALC_PROFILE")),
+        dump_path=os.environ.get("CALC_PROFILE_FILE", "calculator_profile.json")
+    )
+
+
+class KeyRecorder:
+    # Appends what reaches an app's entry points to a JSON-lines file that
+    # the benchmark can replay.
+    def __init__(self, path, app):
+        self.app = app
+        self.started = perf_counter()
+        self.file = open(path, 'a', encoding='utf-8')
+        atexit.register(self.file.close)
+
+    def record(self, kind, value):
+        line = {'app': self.app, 't': round(perf_counter() - self.started, 6), kind: value}
+        self.file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def watch(self, target, name, kind, value=None):
+        original = getattr(target, name)
+
+        def wrapper(*args, **kwargs):
+            self.record(kind, value() if value is not None else args[0])
+            return original(*args, **kwargs)
+        setattr(target, name, wrapper)
+
+
+def recorder_from_env(app):
+    path = os.environ.get("CALC_RECORD")
+    return KeyRecorder(path, app) if path else None
@@ -1,15 +1,25 @@
+import multiprocessing
+import os
+import re
+import sys
+import sqlite3
+import time
 import customtkinter as ctk
-import math
+from sandbox import SandboxPool, TooExpensive, evaluate_full_text
+from canvas_keypad import CanvasKeypad
+from incremental import IncrementalParser
+from number_format import format_number
+from plotter import open_plot
+from history import History, HistoryWindow
+from result_cache import MISSING, ResultCache
+from expression_engine import normalize, tokenize
+from workspace import Workspace
+from matrix import evaluate_matrix_text, format_matrix, is_matrix_expression, matrix_namespace, parse_matrix
+import instrumentation
 
-ctk.set_appearance_mode("system") 
-ctk.set_default_color_theme("theme.json") # Style Mercedes Formula 1 Team
-
-app = ctk.CTk()
-app.title("Калькулятор")
-app.geometry("465x465")
-
-entry = ctk.CTkEntry(app, width=380, height=50, font=("Arial", 20))
-entry.pack(pady=10)
+PREVIEW_DELAY = 120
+# How format_number shows an integer too long to print in full.
+MAGNITUDE_RE = re.compile(r"-?\d\.\d{4}e\+\d+")
 
 def open_popup():
     second_window = ctk.CTkToplevel(app)
@@ -21,19 +31,149 @@ def open_popup():
     close_button.pack(pady=5)
     second_window.after(3000, second_window.destroy)
 
-def n_sqrt(x, n):
-    return math.pow(x, 1/n)
-
 def calculate():
     try:
-        expr = entry.get()
-        result = eval(expr, {**math.__dict__, "n_sqrt": n_sqrt})
+        expr = expand_exact(entry.get())
+        if Workspace.is_definition(expr):
+            define(expr)
+            return
+        if workspace.uses(expr):
+            # Expressions over our own names run here, next to their values;
+            # the workspace passes them through sandbox.check first.
+            result = format_matrix(workspace.evaluate(expr))
+        elif is_matrix_expression(expr):
+            result = sandbox.evaluate(expr, evaluate_matrix_text)
+        else:
+            result = cached_evaluate(expr)
+        if MAGNITUDE_RE.fullmatch(result):
+            exact_sources[result] = expr
         entry.delete(0, "end")
-        entry.insert(0, str(result))
+        entry.insert(0, result)
+        remember(expr, result)
+    except TooExpensive:
+        entry.delete(0, "end")
+        entry.insert(0, "Слишком сложно")
     except:
         entry.delete(0, "end")
         entry.insert(0, "Ошибка")
 
+# A result shown by its magnitude is only a display: when it is used again
+# the expression that produced it is put back in its place.
+def expand_exact(expr):
+    for text, source in exact_sources.items():
+        if text in expr:
+            expr = expr.replace(text, f"({source})")
+    return expr
+
+def copy_exact(event=None):
+    text = entry.get().strip()
+    source = exact_sources.get(text)
+    try:
+        if source is not None:
+            text = sandbox.evaluate(source, evaluate_full_text)
+    except Exception:
+        entry.delete(0, "end")
+        entry.insert(0, "Слишком сложно")
+        return
+    app.clipboard_clear()
+    app.clipboard_append(text)
+
+def schedule_preview(event=None):
+    global preview_job
+    if preview_job is not None:
+        app.after_cancel(preview_job)
+    preview_job = app.after(PREVIEW_DELAY, update_preview)
+
+def update_preview():
+    global preview_job
+    preview_job = None
+    value = preview_parser.update(entry.get())
+    # The preview is never reused, so it stays one short line.
+    preview.configure(text="" if value is None else "= " + format_number(value, max_digits=15))
+
+def plot(event=None):
+    try:
+        open_plot(app, entry.get(),
+                  bg=theme_color("CTkFrame", "fg_color"),
+                  fg=theme_color("CTkLabel", "text_color"),
+                  curve=theme_color("CTkButton", "fg_color"))
+    except Exception:
+        entry.delete(0, "end")
+        entry.insert(0, "Ошибка")
+
+def define(expr):
+    name = workspace.define(expr)[0]
+    if name in workspace.errors:
+        raise workspace.errors[name]
+    entry.delete(0, "end")
+    if name in workspace.values:
+        entry.insert(0, f"{name} = {format_matrix(workspace.values[name])}")
+    else:
+        entry.insert(0, workspace.sources[name])
+    remember(expr, entry.get())
+
+def paste_matrix(event=None):
+    try:
+        value = parse_matrix(app.clipboard_get())
+    except Exception:
+        entry.delete(0, "end")
+        entry.insert(0, "Ошибка")
+        return
+    number = 1
+    while f"M{number}" in workspace.sources:
+        number += 1
+    name = f"M{number}"
+    shape = "×".join(map(str, value.shape))
+    workspace.assign(name, value, f"<матрица {shape}>")
+    entry.delete(0, "end")
+    entry.insert(0, name)
+    schedule_preview()
+
+def cached_evaluate(expr):
+    if cache is None:
+        return sandbox.evaluate(expr)
+    try:
+        key = normalize(tokenize(expr))
+        result = cache.get(key, "RAD", "float")
+    except Exception:
+        return sandbox.evaluate(expr)
+    if result is MISSING:
+        started = time.perf_counter()
+        result = sandbox.evaluate(expr)
+        try:
+            cache.put(key, "RAD", "float", result, time.perf_counter() - started)
+        except sqlite3.Error:
+            pass
+    return result
+
+def remember(expr, result):
+    if history is not None:
+        try:
+            history.add(expr, result, "RAD")
+        except OSError:
+            pass
+
+def open_history(event=None):
+    if history is not None:
+        HistoryWindow(app, history, recall,
+                      bg=theme_color("CTkFrame", "fg_color"),
+                      fg=theme_color("CTkLabel", "text_color"),
+                      select_bg=theme_color("CTkButton", "fg_color"))
+
+def recall(timestamp, mode, expression, result):
+    entry.delete(0, "end")
+    entry.insert(0, expression)
+    schedule_preview()
+
+def theme_color(widget, name):
+    colors = ctk.ThemeManager.theme[widget][name]
+    return colors[1] if ctk.get_appearance_mode() == "Dark" else colors[0]
+
+def key_colors(key):
+    return (theme_color("CTkButton", "fg_color"),
+            theme_color("CTkButton", "text_color"),
+            theme_color("CTkButton", "hover_color"))
+
 def press(key):
     if key == "=":
         calculate()
@@ -48,9 +188,7 @@ def press(key):
         entry.insert("end", "n_sqrt(")
     else:
         entry.insert("end", key)
-
-frame = ctk.CTkFrame(app)
-frame.pack(pady=20)
+    schedule_preview()
 
 buttons = [
     "sin","cos","tan","log","√","ⁿ√",
@@ -61,14 +199,92 @@ buttons = [
     "0",".",",","="
 ]
 
-row, col = 0, 0
-for b in buttons:
-    btn = ctk.CTkButton(frame, text=b, width=70, height=50,
-                        command=lambda x=b: press(x))
-    btn.grid(row=row, column=col, padx=5, pady=5)
-    col += 1
-    if col > 4:
-        col = 0
-        row += 1
-
-app.mainloop()
+# Sandbox workers re-import this file on Windows, so the window is only
+# built when it is run as the main program.
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    ctk.set_appearance_mode("system")
+    ctk.set_default_color_theme("theme.json") # Style Mercedes Formula 1 Team
+
+    sandbox = SandboxPool()
+    # a = 3.2 and f(x) = ... entered in the entry; changing one recomputes
+    # only the definitions that depend on it.
+    workspace = Workspace(matrix_namespace(), check=sandbox.check)
+    exact_sources = {}
+    try:
+        history = History()
+    except OSError:
+        history = None
+    try:
+        cache = ResultCache()
+        cache.warm_up()
+    except (OSError, sqlite3.Error):
+        cache = None
+
+    app = ctk.CTk()
+    app.title("Калькулятор")
+    app.geometry("465x465")
+
+    entry = ctk.CTkEntry(app, width=380, height=50, font=("Arial", 20))
+    entry.pack(pady=(10, 0))
+    entry.bind("<KeyRelease>", schedule_preview)
+    # F3 plots the entry as a function of x.
+    app.bind("<F3>", plot)
+    # F6 stores a matrix from the clipboard as M1, M2, ...
+    app.bind("<F6>", paste_matrix)
+    # Ctrl+H searches past calculations and puts one back into the entry.
+    app.bind("<Control-h>", open_history)
+    # Ctrl+Shift+C copies every digit of a result shown by its magnitude.
+    app.bind("<Control-C>", copy_exact)
+
+    # Only the tokens around an edit are re-read and only the subtrees
+    # whose text changed are re-evaluated.
+    preview_parser = IncrementalParser()
+    preview_job = None
+    preview = ctk.CTkLabel(app, text="", height=20, font=("Arial", 14), anchor="e", width=380)
+    preview.pack()
+
+    frame = ctk.CTkFrame(app)
+    frame.pack(pady=10)
+
+    if os.environ.get("KOSTIL_CANVAS_KEYPAD"):
+        # One canvas for the whole keypad instead of a canvas per CTkButton.
+        # press is looked up on every click, so the profiler's wrapper
+        # installed later still sees the keys.
+        keypad = CanvasKeypad(frame, [buttons[i:i + 5] for i in range(0, len(buttons), 5)],
+                              lambda key: press(key), key_colors, font=("Arial", 14),
+                              bg=theme_color("CTkFrame", "fg_color"),
+                              cell_width=80, cell_height=60, gap=10,
+                              radius=ctk.ThemeManager.theme["CTkButton"]["corner_radius"])
+        keypad.pack()
+    else:
+        row, col = 0, 0
+        for b in buttons:
+            btn = ctk.CTkButton(frame, text=b, width=70, height=50,
+                                command=lambda x=b: press(x))
+            btn.grid(row=row, column=col, padx=5, pady=5)
+            col += 1
+            if col > 4:
+                col = 0
+                row += 1
+
+    profiler = instrumentation.from_env(
+        app,
+        [
+            (sys.modules[__name__], ['press', 'calculate', 'cached_evaluate', 'tokenize', 'update_preview'], 'kostil'),
+            (sandbox, ['check', 'evaluate'], 'sandbox'),
+            (workspace, ['define', 'evaluate'], 'workspace'),
+            (workspace.engine, ['compile'], 'workspace.engine'),
+        ],
+        keys=[(sys.modules[__name__], 'press')],
+        # Every key changes the entry inside press itself (the result of
+        # "=" included), so the repaint after it ends the keystroke.
+        display=(sys.modules[__name__], 'press')
+    )
+    app.bind("<F12>", lambda event: profiler.toggle())
+    recorder = instrumentation.recorder_from_env('kostil')
+    if recorder is not None:
+        recorder.watch(sys.modules[__name__], 'calculate', 'expr', entry.get)
+
+    app.mainloop()
@@ -0,0 +1,140 @@
+import re
+import warnings
+
+import numpy as np
+
+from expression_engine import ExpressionEngine, ExpressionError, FunctionOfX, default_namespace, degree_namespace, tokenize
+from number_format import format_number
+from vectorized import UFUNCS, scalar_ufunc
+
+
+def build_array(items):
+    # One contiguous float (or complex) block per literal; everything after
+    # it works on that block without going back through Python lists.
+    array = np.asarray(items)
+    if array.dtype.kind not in 'fc':
+        array = array.astype(float)
+    return np.ascontiguousarray(array)
+
+
+def identity(n):
+    return np.eye(int(n))
+
+
+def zeros(rows, columns=None):
+    return np.zeros((int(rows), int(columns if columns is not None else rows)))
+
+
+def ones(rows, columns=None):
+    return np.ones((int(rows), int(columns if columns is not None else rows)))
+
+
+MATRIX_FUNCTIONS = {
+    'inv': np.linalg.inv,
+    'pinv': np.linalg.pinv,
+    'det': np.linalg.det,
+    'solve': np.linalg.solve,
+    'eig': np.linalg.eigvals,
+    'rank': np.linalg.matrix_rank,
+    'norm': np.linalg.norm,
+    'trace': np.trace,
+    'transpose': np.transpose,
+    'dot': np.dot,
+    'eye': identity,
+    'zeros': zeros,
+    'ones': ones,
+}
+
+
+def elementwise(scalar, vector):
+    # Plain numbers keep the exact math/builtin behaviour; arrays go to the
+    # NumPy ufunc element by element.
+    def function(*args):
+        for arg in args:
+            if isinstance(arg, np.ndarray):
+                return vector(*args)
+        return scalar(*args)
+    function.__name__ = getattr(scalar, '__name__', 'function')
+    return function
+
+
+DEGREE_FUNCTIONS = ('sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2')
+
+
+def matrix_namespace(mode="RAD"):
+    namespace = degree_namespace() if mode == "DEG" else default_namespace()
+    for name, vector in UFUNCS.items():
+        if name in namespace:
+            if mode == "DEG" and name in DEGREE_FUNCTIONS:
+                # Element by element through the exact degree tables, so a
+                # matrix gives the same sin(30) as a plain number.
+                vector = scalar_ufunc(namespace[name])
+            namespace[name] = elementwise(namespace[name], vector)
+    namespace.update(MATRIX_FUNCTIONS)
+    # solve(A, b) is the linear system, solve(f, a, b) still finds a root.
+    namespace['solve'] = FunctionOfX('find_root', fallback=np.linalg.solve)
+    namespace['__array__'] = build_array
+    return namespace
+
+
+matrix_engine = ExpressionEngine(matrix_namespace())
+matrix_engines = {"RAD": matrix_engine}
+
+
+def get_matrix_engine(mode):
+    if mode not in matrix_engines:
+        matrix_engines[mode] = ExpressionEngine(matrix_namespace(mode))
+    return matrix_engines[mode]
+
+
+def is_matrix_expression(source):
+    for kind, text, start in tokenize(source):
+        if text in ('[', ']', '@') or (kind == 'name' and text in MATRIX_FUNCTIONS):
+            return True
+    return False
+
+
+def format_matrix(value):
+    if isinstance(value, np.ndarray):
+        if value.ndim == 0:
+            return format_number(value.item())
+        text = np.array2string(value, precision=8, separator=', ', threshold=64, suppress_small=True)
+        return re.sub(r"\s*\n\s*", " ", text)
+    if isinstance(value, np.generic):
+        return format_number(value.item())
+    return format_number(value)
+
+
+def evaluate_matrix_text(source, mode="RAD"):
+    return format_matrix(get_matrix_engine(mode).evaluate(source))
+
+
+def parse_matrix(text):
+    # Accepts a bracket literal, or rows on separate lines (or split by ';')
+    # as pasted from a spreadsheet. With tabs between cells a comma is
+    # taken as the decimal separator.
+    text = text.strip()
+    if text.startswith('['):
+        value = matrix_engine.evaluate(text)
+        if not isinstance(value, np.ndarray):
+            raise ExpressionError("Not a matrix")
+        return value
+    if '\t' in text:
+        text = text.replace(',', '.').replace('\t', ' ')
+    else:
+        text = text.replace(',', ' ')
+    rows = [line for line in re.split(r"[\r\n;]+", text) if line.strip()]
+    widths = {len(line.split()) for line in rows}
+    if not rows or len(widths) != 1:
+        raise ExpressionError("Rows of a matrix must all have the same length")
+    # NumPy's own text parser. Depending on the version it either raises at
+    # a cell that is not a number or stops there with a short result.
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(" ".join(rows), dtype=float, sep=" ")
+    except ValueError:
+        raise ExpressionError("Matrix cells must be numbers") from None
+    if values.size != len(rows) * widths.pop():
+        raise ExpressionError("Matrix cells must be numbers")
+    return values.reshape(len(rows), -1)
@@ -0,0 +1,102 @@
+import math
+import sys
+from contextlib import contextmanager
+
+LOG10_2 = math.log10(2)
+LN_10 = math.log(10)
+
+# Integer results longer than this are kept as a HugeInt: the display
+# shows the magnitude and the exact digits are produced only on copy.
+EXACT_DIGITS = 300
+
+
+@contextmanager
+def unlimited_str_digits():
+    if not hasattr(sys, 'set_int_max_str_digits'):
+        yield
+        return
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        yield
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+
+def int_log10(n):
+    n = abs(n)
+    bits = n.bit_length()
+    if bits <= 1000:
+        return math.log10(n)
+    # Only the top 64 bits matter for the leading digits.
+    shift = bits - 64
+    return math.log10(n >> shift) + shift * LOG10_2
+
+
+def factorial_log10(n):
+    return math.lgamma(n + 1) / LN_10
+
+
+def format_magnitude(log10_abs, negative=False, digits=5):
+    exponent = math.floor(log10_abs)
+    mantissa = round(10 ** (log10_abs - exponent), digits - 1)
+    if mantissa >= 10:
+        mantissa /= 10
+        exponent += 1
+    sign = "-" if negative else ""
+    return f"{sign}{mantissa:.{digits - 1}f}e+{exponent}"
+
+
+def int_digits(n):
+    return int(abs(n).bit_length() * LOG10_2) + 1
+
+
+def format_number(value, max_digits=EXACT_DIGITS):
+    if isinstance(value, HugeInt):
+        return value.display()
+    if isinstance(value, int) and not isinstance(value, bool) and int_digits(value) > max_digits:
+        return format_magnitude(int_log10(value), value < 0)
+    return str(value)
+
+
+def to_text(value):
+    if hasattr(value, 'full_text'):
+        return value.full_text()
+    with unlimited_str_digits():
+        return str(value)
+
+
+class HugeInt:
+    __slots__ = ('_value', 'factorial_of', 'negative', 'log10')
+
+    def __init__(self, value=None, factorial_of=None):
+        self._value = value
+        self.factorial_of = factorial_of
+        if factorial_of is not None:
+            self.negative = False
+            self.log10 = factorial_log10(factorial_of)
+        else:
+            self.negative = value < 0
+            self.log10 = int_log10(value)
+
+    @property
+    def value(self):
+        if self._value is None:
+            self._value = math.factorial(self.factorial_of)
+        return self._value
+
+    def display(self, digits=5):
+        return format_magnitude(self.log10, self.negative, digits)
+
+    def full_text(self):
+        with unlimited_str_digits():
+            return str(self.value)
+
+    def __float__(self):
+        return -math.inf if self.negative else math.inf
+
+    def __getstate__(self):
+        return (self._value, self.factorial_of, self.negative, self.log10)
+
+    def __setstate__(self, state):
+        self._value, self.factorial_of, self.negative, self.log10 = state
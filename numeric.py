@@ -0,0 +1,213 @@
+import math
+
+import numpy as np
+
+from expression_engine import Compiler, ExpressionError, default_namespace, names_in
+from vectorized import UFUNCS, vector_engine
+
+VARIABLE = 'x'
+# Points the interval of solve() is sampled at to find a sign change.
+ROOT_SAMPLES = 1025
+MAX_ITERATIONS = 100
+EPSILON = 2.220446049250313e-16
+TOLERANCE = 1e-10
+MAX_INTERVALS = 2000
+
+# Gauss–Kronrod 7/15 nodes on [-1, 1]: the Kronrod rule uses all fifteen,
+# the Gauss rule every second one, so one batch of values gives both the
+# integral and an estimate of its error.
+KRONROD_NODES = np.array([
+    -0.991455371120812639206854697526329, -0.949107912342758524526189684047851,
+    -0.864864423359769072789712788640926, -0.741531185599394439863864773280788,
+    -0.586087235467691130294144845693013, -0.405845151377397166906606412076961,
+    -0.207784955007898467600689403773245, 0.0,
+    0.207784955007898467600689403773245, 0.405845151377397166906606412076961,
+    0.586087235467691130294144845693013, 0.741531185599394439863864773280788,
+    0.864864423359769072789712788640926, 0.949107912342758524526189684047851,
+    0.991455371120812639206854697526329,
+])
+KRONROD_WEIGHTS = np.array([
+    0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+    0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+    0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+    0.204432940075298892414161999234649, 0.209482141084727828012999174891714,
+    0.204432940075298892414161999234649, 0.190350578064785409913256402421014,
+    0.169004726639267902826583426598550, 0.140653259715525918745189590510238,
+    0.104790010322250183839876322541518, 0.063092092629978553290700663189204,
+    0.022935322010529224963732008058970,
+])
+GAUSS_INDEX = np.arange(1, 15, 2)
+GAUSS_WEIGHTS = np.array([
+    0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+    0.381830050505118944950369775488975, 0.417959183673469387755102040816327,
+    0.381830050505118944950369775488975, 0.279705391489276667901467771423780,
+    0.129484966168869693270611432679082,
+])
+
+SCALARS = default_namespace()
+
+
+def vector_namespace(namespace, names):
+    # The body of solve()/integrate() runs on whole arrays of x. Built-ins
+    # become their NumPy ufuncs; anything the namespace has changed (degree
+    # mode trigonometry, user functions) is applied element by element.
+    vectors = dict(namespace)
+    for name in names:
+        value = namespace.get(name)
+        if not callable(value):
+            continue
+        if value is SCALARS.get(name):
+            vectors[name] = UFUNCS.get(name, vector_engine.namespace[name])
+        else:
+            vectors[name] = np.vectorize(value, otypes=[float])
+            vectors[name].pure = getattr(value, 'pure', True)
+    return vectors
+
+
+def compile_form(compiler, node, method):
+    if len(node.args) != 3:
+        raise ExpressionError(f"{node.func}(f, a, b) takes an expression in x and two bounds")
+    body = node.args[0]
+    names = names_in(body)
+    inner = Compiler(vector_namespace(compiler.namespace, names))
+    function, _, _ = inner.compile(body)
+    free = inner.variables - {VARIABLE}
+    compiler.variables |= free
+
+    def f(xs, env):
+        local = dict(env)
+        local[VARIABLE] = xs
+        with np.errstate(all='ignore'):
+            return np.broadcast_to(np.asarray(function(local), dtype=float), xs.shape)
+
+    low, low_constant, low_value = compiler.compile(node.args[1])
+    high, high_constant, high_value = compiler.compile(node.args[2])
+
+    def run(env):
+        return method(lambda xs: f(xs, env), float(low(env)), float(high(env)))
+
+    pure = all(getattr(compiler.namespace.get(name), 'pure', True) for name in names)
+    if low_constant and high_constant and not free and pure:
+        try:
+            return compiler.constant(method(lambda xs: f(xs, {}), float(low_value), float(high_value)))
+        except Exception:
+            pass
+    return run, False, None
+
+
+def brent(f, a, b, fa, fb, tolerance=EPSILON):
+    # Brent's method: inverse quadratic or secant steps while they keep
+    # shrinking the bracket fast enough, bisection otherwise.
+    c, fc = b, fb
+    d = e = b - a
+    for _ in range(MAX_ITERATIONS):
+        if (fb > 0 and fc > 0) or (fb < 0 and fc < 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        step = 2 * EPSILON * abs(b) + 0.5 * tolerance
+        middle = 0.5 * (c - b)
+        if abs(middle) <= step or fb == 0:
+            return b
+        if abs(e) >= step and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                p = 2 * middle * s
+                q = 1 - s
+            else:
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * middle * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * middle * q - abs(step * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = middle
+        else:
+            d = e = middle
+        a, fa = b, fb
+        b += d if abs(d) > step else math.copysign(step, middle)
+        fb = f(b)
+    return b
+
+
+def find_root(f, a, b):
+    # One vectorized call over the grid finds the brackets; Brent then
+    # refines the leftmost one that holds a root rather than a pole.
+    if not (math.isfinite(a) and math.isfinite(b)) or a == b:
+        raise ValueError("solve() needs a finite interval")
+    xs = np.linspace(a, b, ROOT_SAMPLES)
+    ys = f(xs)
+    signs = np.sign(ys)
+    finite = np.isfinite(ys)
+    zeros = (ys == 0)[:-1]
+    changes = (signs[:-1] * signs[1:] < 0) & finite[:-1] & finite[1:]
+    scalar = lambda x: float(f(np.array([x]))[0])
+    for index in np.flatnonzero(zeros | changes).tolist():
+        if ys[index] == 0:
+            return float(xs[index])
+        root = brent(scalar, float(xs[index]), float(xs[index + 1]), float(ys[index]), float(ys[index + 1]))
+        if abs(scalar(root)) <= max(abs(ys[index]), abs(ys[index + 1])):
+            return root
+    if ys[-1] == 0:
+        return float(xs[-1])
+    raise ValueError(f"No root between {a:g} and {b:g}")
+
+
+def infinite_bounds(f, a, b):
+    # Maps an infinite interval onto a finite one. Gauss–Kronrod nodes are
+    # all inside the interval, so the ends where the map blows up are never
+    # evaluated.
+    if math.isinf(a) and math.isinf(b):
+        def g(t):
+            return f(t / (1 - t * t)) * (1 + t * t) / (1 - t * t) ** 2
+        return g, -1.0, 1.0
+    if math.isinf(b):
+        def g(t):
+            return f(a + t / (1 - t)) / (1 - t) ** 2
+        return g, 0.0, 1.0
+
+    def g(t):
+        return f(b - (1 - t) / t) / (t * t)
+    return g, 0.0, 1.0
+
+
+def integrate(f, a, b, tolerance=TOLERANCE):
+    # Adaptive Gauss–Kronrod: every round evaluates the fifteen nodes of
+    # all unfinished intervals in one call, keeps those whose error
+    # estimate is small enough and halves the rest.
+    if math.isnan(a) or math.isnan(b):
+        raise ValueError("integrate() bounds must be numbers")
+    if a == b:
+        return 0.0
+    if a > b:
+        return -integrate(f, b, a, tolerance)
+    if math.isinf(a) or math.isinf(b):
+        f, a, b = infinite_bounds(f, a, b)
+    lows = np.array([a])
+    highs = np.array([b])
+    total = 0.0
+    while True:
+        centers = (lows + highs) / 2
+        halves = (highs - lows) / 2
+        ys = f((centers[:, None] + halves[:, None] * KRONROD_NODES).ravel()).reshape(len(lows), 15)
+        if not np.all(np.isfinite(ys)):
+            raise ValueError("integrate() met a value that is not finite")
+        kronrod = halves * (ys @ KRONROD_WEIGHTS)
+        errors = np.abs(kronrod - halves * (ys[:, GAUSS_INDEX] @ GAUSS_WEIGHTS))
+        estimate = total + kronrod.sum()
+        allowed = max(tolerance * abs(estimate), tolerance) * (highs - lows) / (b - a)
+        done = errors <= allowed
+        total += kronrod[done].sum()
+        if done.all():
+            return float(total)
+        if 2 * np.count_nonzero(~done) > MAX_INTERVALS:
+            raise ValueError(f"integrate() did not converge within {MAX_INTERVALS} intervals")
+        lows, highs, centers = lows[~done], highs[~done], centers[~done]
+        lows = np.concatenate((lows, centers))
+        highs = np.concatenate((centers, highs))
@@ -0,0 +1,324 @@
+import math
+import time
+import tkinter as tk
+from collections import OrderedDict
+
+import numpy as np
+
+from vectorized import evaluate_array
+
+FRAME_MS = 16
+# Base samples per pixel column; refinement adds more only where needed.
+SAMPLES_PER_COLUMN = 1
+MAX_DEPTH = 6
+# A sample further than this many pixels from the chord of its neighbours
+# marks the curve as bent there.
+TOLERANCE = 0.5
+# Each level keeps this many view widths of samples on either side of the
+# view; panning further drops the far end instead of growing the arrays.
+KEEP_VIEWS = 1
+
+
+class Sampler:
+    # Samples are kept per grid step (a power of two), so panning at one
+    # zoom level only evaluates the newly exposed ends, and zooming back
+    # finds the earlier level still cached.
+    def __init__(self, source, variable='x', cache_levels=8):
+        self.source = source
+        self.variable = variable
+        self.cache_levels = cache_levels
+        self.levels = OrderedDict()
+        self.evaluated = 0
+        self.evaluate(np.zeros(1))
+
+    def evaluate(self, xs):
+        self.evaluated += len(xs)
+        ys = evaluate_array(self.source, **{self.variable: xs})
+        ys = np.asarray(ys)
+        if np.iscomplexobj(ys):
+            ys = np.where(ys.imag == 0, ys.real, np.nan)
+        return np.array(np.broadcast_to(ys, xs.shape), dtype=float)
+
+    def step_for(self, lo, hi, columns):
+        step = (hi - lo) / (columns * SAMPLES_PER_COLUMN)
+        return 2.0 ** math.floor(math.log2(step))
+
+    def grid(self, lo, hi, step):
+        level = math.log2(step)
+        first = math.floor(lo / step) - 1
+        last = math.ceil(hi / step) + 1
+
+        cached = self.levels.get(level)
+        if cached is None or last < cached['first'] or first > cached['last']:
+            xs = np.arange(first, last + 1) * step
+            cached = {'first': first, 'last': last, 'xs': xs, 'ys': self.evaluate(xs)}
+        else:
+            parts_x = [cached['xs']]
+            parts_y = [cached['ys']]
+            if first < cached['first']:
+                xs = np.arange(first, cached['first']) * step
+                parts_x.insert(0, xs)
+                parts_y.insert(0, self.evaluate(xs))
+                cached['first'] = first
+            if last > cached['last']:
+                xs = np.arange(cached['last'] + 1, last + 1) * step
+                parts_x.append(xs)
+                parts_y.append(self.evaluate(xs))
+                cached['last'] = last
+            if len(parts_x) > 1:
+                cached['xs'] = np.concatenate(parts_x)
+                cached['ys'] = np.concatenate(parts_y)
+            self.trim(cached, first, last, step)
+
+        self.levels[level] = cached
+        self.levels.move_to_end(level)
+        if len(self.levels) > self.cache_levels:
+            self.levels.popitem(last=False)
+        return cached
+
+    def trim(self, cached, first, last, step):
+        margin = (last - first) * KEEP_VIEWS
+        keep_first = max(cached['first'], first - margin)
+        keep_last = min(cached['last'], last + margin)
+        if keep_first == cached['first'] and keep_last == cached['last']:
+            return
+        start = np.searchsorted(cached['xs'], keep_first * step, side='left')
+        stop = np.searchsorted(cached['xs'], keep_last * step, side='right')
+        cached['xs'] = cached['xs'][start:stop].copy()
+        cached['ys'] = cached['ys'][start:stop].copy()
+        cached['first'] = keep_first
+        cached['last'] = keep_last
+
+    def sample(self, lo, hi, columns, y_scale, height):
+        step = self.step_for(lo, hi, columns)
+        cached = self.grid(lo, hi, step)
+        min_width = step / 2 ** MAX_DEPTH
+
+        for _ in range(MAX_DEPTH):
+            xs = cached['xs']
+            ys = cached['ys']
+            start, stop = np.searchsorted(xs, [lo, hi])
+            start = max(start - 2, 0)
+            stop = min(stop + 2, len(xs))
+            vx = xs[start:stop]
+            vy = ys[start:stop]
+            refine = self.bent(vx, vy, y_scale, height) & (np.diff(vx) > min_width)
+            if not refine.any():
+                break
+            middle = (vx[:-1][refine] + vx[1:][refine]) / 2
+            cached['xs'] = np.insert(xs, start + 1 + np.flatnonzero(refine), middle)
+            cached['ys'] = np.insert(ys, start + 1 + np.flatnonzero(refine), self.evaluate(middle))
+
+        start, stop = np.searchsorted(cached['xs'], [lo, hi])
+        start = max(start - 1, 0)
+        stop = min(stop + 1, len(cached['xs']))
+        return cached['xs'][start:stop], cached['ys'][start:stop], min_width
+
+    def bent(self, xs, ys, y_scale, height):
+        # One flag per segment between neighbouring samples.
+        refine = np.zeros(max(len(xs) - 1, 0), dtype=bool)
+        if len(xs) < 2:
+            return refine
+        finite = np.isfinite(ys)
+        with np.errstate(all='ignore'):
+            refine |= finite[:-1] != finite[1:]
+            refine |= np.abs(np.diff(ys)) * y_scale > height
+            if len(xs) > 2:
+                weight = (xs[1:-1] - xs[:-2]) / (xs[2:] - xs[:-2])
+                chord = ys[:-2] + (ys[2:] - ys[:-2]) * weight
+                off = np.abs(ys[1:-1] - chord) * y_scale > TOLERANCE
+                off &= finite[:-2] & finite[1:-1] & finite[2:]
+                refine[:-1] |= off
+                refine[1:] |= off
+        return refine
+
+    def clear(self):
+        self.levels.clear()
+
+
+def decimate(xs, ys, lo, x_scale, top, y_scale, height, min_width):
+    # Reduce the samples to one min/max pair per pixel column and split the
+    # curve where it leaves the real numbers or jumps across the view.
+    if len(xs) == 0:
+        return []
+    with np.errstate(all='ignore'):
+        finite = np.isfinite(ys)
+        jump = np.abs(np.diff(ys)) * y_scale > height
+        jump &= np.diff(xs) <= 2 * min_width
+    breaks = ~finite[:-1] | ~finite[1:] | jump
+    bounds = np.concatenate(([0], np.flatnonzero(breaks) + 1, [len(xs)]))
+
+    runs = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        run_x = xs[start:stop]
+        run_y = ys[start:stop]
+        keep = np.isfinite(run_y)
+        run_x = run_x[keep]
+        run_y = run_y[keep]
+        if len(run_x) == 0:
+            continue
+        columns = np.floor((run_x - lo) * x_scale).astype(np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(columns)) + 1))
+        low = np.minimum.reduceat(run_y, starts)
+        high = np.maximum.reduceat(run_y, starts)
+        entering = run_y[starts]
+        rising = entering - low <= high - entering
+        first = np.where(rising, low, high)
+        second = np.where(rising, high, low)
+
+        px = np.repeat(columns[starts] + 0.5, 2)
+        py = np.empty(len(px))
+        py[0::2] = first
+        py[1::2] = second
+        py = np.clip((top - py) * y_scale, -10 * height, 11 * height)
+        points = np.empty(2 * len(px))
+        points[0::2] = px
+        points[1::2] = py
+        runs.append(points.tolist())
+    return runs
+
+
+def nice_step(span, count=8):
+    raw = span / count
+    power = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * power:
+            return factor * power
+    return 10 * power
+
+
+class PlotView:
+    def __init__(self, parent, source, x_range=(-10.0, 10.0), y_range=None,
+                 width=600, height=400, bg='#000000', fg='#ffffff', grid='#333333',
+                 curve='#00d2be', font=None):
+        self.sampler = Sampler(source)
+        self.source = source
+        self.x_lo, self.x_hi = x_range
+        self.width = width
+        self.height = height
+        self.fg = fg
+        self.grid_color = grid
+        self.curve_color = curve
+        self.font = font
+        self.drag = None
+        self.redraw_id = None
+        self.last_redraw = 0.0
+
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg=bg,
+                                highlightthickness=0, borderwidth=0, cursor='fleur')
+        if y_range is None:
+            y_range = self.fit_y()
+        self.y_lo, self.y_hi = y_range
+
+        self.canvas.bind('<Configure>', self.on_resize)
+        self.canvas.bind('<ButtonPress-1>', self.on_press)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_release)
+        self.canvas.bind('<MouseWheel>', self.on_wheel)
+        self.canvas.bind('<Button-4>', lambda event: self.zoom_at(event.x, event.y, 0.8))
+        self.canvas.bind('<Button-5>', lambda event: self.zoom_at(event.x, event.y, 1.25))
+        self.schedule()
+
+    def pack(self, **options):
+        self.canvas.pack(**options)
+
+    def grid(self, **options):
+        self.canvas.grid(**options)
+
+    def fit_y(self):
+        xs = np.linspace(self.x_lo, self.x_hi, self.width)
+        ys = self.sampler.evaluate(xs)
+        ys = ys[np.isfinite(ys)]
+        if len(ys) == 0:
+            return -1.0, 1.0
+        low, high = np.percentile(ys, [2, 98])
+        if high - low < 1e-12:
+            low, high = low - 1, high + 1
+        margin = (high - low) * 0.1
+        return float(low - margin), float(high + margin)
+
+    def schedule(self):
+        if self.redraw_id is None:
+            wait = self.last_redraw + FRAME_MS / 1000 - time.perf_counter()
+            self.redraw_id = self.canvas.after(max(0, int(wait * 1000)), self.redraw)
+
+    def redraw(self):
+        self.redraw_id = None
+        self.last_redraw = time.perf_counter()
+        x_scale = self.width / (self.x_hi - self.x_lo)
+        y_scale = self.height / (self.y_hi - self.y_lo)
+
+        self.canvas.delete('all')
+        self.draw_axes(x_scale, y_scale)
+        xs, ys, min_width = self.sampler.sample(self.x_lo, self.x_hi, self.width, y_scale, self.height)
+        for points in decimate(xs, ys, self.x_lo, x_scale, self.y_hi, y_scale, self.height, min_width):
+            if len(points) >= 4:
+                self.canvas.create_line(points, fill=self.curve_color, width=2)
+
+    def draw_axes(self, x_scale, y_scale):
+        step = nice_step(self.x_hi - self.x_lo)
+        value = math.ceil(self.x_lo / step) * step
+        while value <= self.x_hi:
+            x = (value - self.x_lo) * x_scale
+            self.canvas.create_line(x, 0, x, self.height, fill=self.grid_color)
+            self.canvas.create_text(x + 3, self.height - 3, text=f"{value:g}", anchor='sw',
+                                    fill=self.fg, font=self.font)
+            value += step
+
+        step = nice_step(self.y_hi - self.y_lo)
+        value = math.ceil(self.y_lo / step) * step
+        while value <= self.y_hi:
+            y = (self.y_hi - value) * y_scale
+            self.canvas.create_line(0, y, self.width, y, fill=self.grid_color)
+            self.canvas.create_text(3, y - 2, text=f"{value:g}", anchor='sw',
+                                    fill=self.fg, font=self.font)
+            value += step
+
+        if self.x_lo < 0 < self.x_hi:
+            x = -self.x_lo * x_scale
+            self.canvas.create_line(x, 0, x, self.height, fill=self.fg)
+        if self.y_lo < 0 < self.y_hi:
+            y = self.y_hi * y_scale
+            self.canvas.create_line(0, y, self.width, y, fill=self.fg)
+
+    def on_resize(self, event):
+        if (event.width, event.height) != (self.width, self.height):
+            self.width = event.width
+            self.height = event.height
+            self.schedule()
+
+    def on_press(self, event):
+        self.drag = (event.x, event.y, self.x_lo, self.x_hi, self.y_lo, self.y_hi)
+
+    def on_drag(self, event):
+        if self.drag is None:
+            return
+        x, y, x_lo, x_hi, y_lo, y_hi = self.drag
+        dx = (event.x - x) * (x_hi - x_lo) / self.width
+        dy = (event.y - y) * (y_hi - y_lo) / self.height
+        self.x_lo, self.x_hi = x_lo - dx, x_hi - dx
+        self.y_lo, self.y_hi = y_lo + dy, y_hi + dy
+        self.schedule()
+
+    def on_release(self, event):
+        self.drag = None
+
+    def on_wheel(self, event):
+        self.zoom_at(event.x, event.y, 0.8 if event.delta > 0 else 1.25)
+
+    def zoom_at(self, px, py, factor):
+        x = self.x_lo + px / self.width * (self.x_hi - self.x_lo)
+        y = self.y_hi - py / self.height * (self.y_hi - self.y_lo)
+        self.x_lo = x - (x - self.x_lo) * factor
+        self.x_hi = x + (self.x_hi - x) * factor
+        self.y_lo = y - (y - self.y_lo) * factor
+        self.y_hi = y + (self.y_hi - y) * factor
+        self.schedule()
+
+
+def open_plot(parent, source, **options):
+    window = tk.Toplevel(parent)
+    window.title(f"y = {source}")
+    view = PlotView(window, source, **options)
+    view.pack(fill='both', expand=True)
+    return window
@@ -0,0 +1,296 @@
+import hashlib
+import math
+from decimal import Decimal, getcontext, localcontext
+
+GUARD_DIGITS = 10
+DISPLAY_DIGITS = 15
+COPY_DIGITS = 1000
+MAX_FACTORIAL = 10 ** 6
+# Every result is an operand of the next one, so a long session builds a
+# chain of nodes. Past this depth an operand is replaced by a literal
+# holding COPY_DIGITS of its value.
+MAX_DEPTH = 64
+# Keys longer than this are replaced by a digest.
+MAX_KEY_LENGTH = 64
+
+
+def precision():
+    return getcontext().prec
+
+
+def atan_inv(x, scale):
+    # atan(1/x) as a fixed-point integer with `scale` decimal places.
+    total = term = 10 ** scale // x
+    x2 = x * x
+    n = 1
+    sign = 1
+    while term:
+        term //= x2
+        n += 2
+        sign = -sign
+        total += sign * (term // n)
+    return total
+
+
+pi_cache = [0, None]
+
+
+def pi():
+    prec = precision()
+    if pi_cache[0] < prec:
+        scale = prec + GUARD_DIGITS
+        value = 4 * (4 * atan_inv(5, scale) - atan_inv(239, scale))
+        pi_cache[0] = prec
+        pi_cache[1] = Decimal(value).scaleb(-scale)
+    return +pi_cache[1]
+
+
+def e():
+    return Decimal(1).exp()
+
+
+def sin_series(x):
+    getcontext().prec += 2
+    i, lasts, s, fact, num, sign = 1, 0, x, 1, x, 1
+    while s != lasts:
+        lasts = s
+        i += 2
+        fact *= i * (i - 1)
+        num *= x * x
+        sign *= -1
+        s += num / fact * sign
+    getcontext().prec -= 2
+    return +s
+
+
+def cos_series(x):
+    getcontext().prec += 2
+    i, lasts, s, fact, num, sign = 0, 0, 1, 1, 1, 1
+    while s != lasts:
+        lasts = s
+        i += 2
+        fact *= i * (i - 1)
+        num *= x * x
+        sign *= -1
+        s += num / fact * sign
+    getcontext().prec -= 2
+    return +s
+
+
+def reduce_angle(x):
+    # Reducing a large argument needs as many extra digits as it has
+    # integer digits, otherwise the remainder is noise.
+    extra = max(0, x.adjusted()) + 2
+    getcontext().prec += extra
+    two_pi = 2 * pi()
+    x = x % two_pi
+    getcontext().prec -= extra
+    return +x
+
+
+def sin(x):
+    return sin_series(reduce_angle(x))
+
+
+def cos(x):
+    return cos_series(reduce_angle(x))
+
+
+def tan(x):
+    x = reduce_angle(x)
+    return sin_series(x) / cos_series(x)
+
+
+def atan(x):
+    if x < 0:
+        return -atan(-x)
+    if x > 1:
+        return pi() / 2 - atan(1 / x)
+    getcontext().prec += 2
+    halvings = 0
+    while x > Decimal("0.1"):
+        x = x / (1 + (1 + x * x).sqrt())
+        halvings += 1
+    x2 = x * x
+    s, lasts, term, n = x, 0, x, 1
+    while s != lasts:
+        lasts = s
+        term *= -x2
+        n += 2
+        s += term / n
+    s *= 2 ** halvings
+    getcontext().prec -= 2
+    return +s
+
+
+def asin(x):
+    if abs(x) > 1:
+        raise ValueError("math domain error")
+    if abs(x) == 1:
+        return pi() / 2 * x
+    return atan(x / (1 - x * x).sqrt())
+
+
+def acos(x):
+    return pi() / 2 - asin(x)
+
+
+def radians(x):
+    return x * pi() / 180
+
+
+def degrees(x):
+    return x * 180 / pi()
+
+
+def factorial(x):
+    if x < 0 or x != x.to_integral_value() or x > MAX_FACTORIAL:
+        raise ValueError("factorial needs an integer between 0 and 10**6")
+    n = int(x)
+    # Every multiplication rounds, so keep enough extra digits to absorb
+    # n rounding errors.
+    getcontext().prec += len(str(n)) + 2
+    result = Decimal(1)
+    for i in range(2, n + 1):
+        result *= i
+    getcontext().prec -= len(str(n)) + 2
+    return +result
+
+
+FUNCTIONS = {
+    'pi': pi,
+    'e': e,
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'div': lambda a, b: a / b,
+    'mod': lambda a, b: a % b,
+    'pow': lambda a, b: a ** b,
+    'abs': abs,
+    'sqrt': lambda a: a.sqrt(),
+    'ln': lambda a: a.ln(),
+    'log10': lambda a: a.log10(),
+    'exp10': lambda a: Decimal(10) ** a,
+    'inv': lambda a: 1 / a,
+    'sin': sin,
+    'cos': cos,
+    'tan': tan,
+    'asin': asin,
+    'acos': acos,
+    'atan': atan,
+    'radians': radians,
+    'degrees': degrees,
+    'factorial': factorial,
+}
+
+
+class LazyReal:
+    def __init__(self, function, *operands, value=None):
+        self.function = function
+        self.operands = operands
+        self.value = value
+        self.prec = math.inf if value is not None else 0
+        self.depth = 1 + max((operand.depth for operand in operands), default=0)
+        # Digits beyond this are not known; only a collapsed operand sets it.
+        self.limit = min((operand.limit for operand in operands), default=math.inf)
+        if function is None:
+            self.key = str(value)
+        else:
+            key = f"{function}({', '.join(operand.key for operand in operands)})"
+            if len(key) > MAX_KEY_LENGTH:
+                key = "#" + hashlib.sha1(key.encode('utf-8')).hexdigest()
+            self.key = key
+
+    @classmethod
+    def literal(cls, text):
+        return cls(None, value=Decimal(text))
+
+    def collapse(self):
+        if self.depth < MAX_DEPTH:
+            return self
+        node = LazyReal(None, value=self.evaluate(COPY_DIGITS + GUARD_DIGITS))
+        node.limit = min(self.limit, COPY_DIGITS)
+        node.key = self.key
+        return node
+
+    # A node remembers the most precise value it has produced, worked out
+    # with GUARD_DIGITS more than were asked for; asking for fewer digits
+    # later is just a rounding of that value. The whole tree is worked out
+    # at one precision, children first on an explicit stack, so a chain of
+    # operations neither recurses nor asks for more digits at every level.
+    def evaluate(self, prec):
+        working = prec + GUARD_DIGITS
+        if self.prec < working:
+            stack = [self]
+            while stack:
+                node = stack[-1]
+                pending = [operand for operand in node.operands if operand.prec < working]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                stack.pop()
+                if node.prec < working:
+                    with localcontext() as context:
+                        context.prec = working
+                        node.value = FUNCTIONS[node.function](*[operand.value for operand in node.operands])
+                    node.prec = working
+        with localcontext() as context:
+            context.prec = prec
+            return +self.value
+
+    def significand(self, prec):
+        return ''.join(map(str, self.evaluate(prec).as_tuple().digits))
+
+    def digits(self, prec=DISPLAY_DIGITS):
+        return format_decimal(self.evaluate(prec))
+
+    def full_text(self):
+        return self.digits(COPY_DIGITS)
+
+    def window(self, offset, width=DISPLAY_DIGITS):
+        digits = self.significand(offset + width)
+        return "…" + digits[offset:offset + width]
+
+    def __float__(self):
+        return float(self.evaluate(DISPLAY_DIGITS + 2))
+
+
+def format_decimal(value):
+    if not value.is_finite():
+        raise ValueError(f"{value} is not a number")
+    if value.is_zero():
+        return "0"
+    with localcontext() as context:
+        context.prec = len(value.as_tuple().digits)
+        value = value.normalize()
+    if -7 < value.adjusted() < DISPLAY_DIGITS:
+        return format(value, 'f')
+    return format(value, 'e')
+
+
+SCIENTIFIC = {
+    'sin': 'sin', 'cos': 'cos', 'tan': 'tan',
+    'asin': 'asin', 'acos': 'acos', 'atan': 'atan',
+    'log': 'log10', 'ln': 'ln', '√': 'sqrt',
+    '10^x': 'exp10', '1/x': 'inv', 'x!': 'factorial', '|x|': 'abs',
+}
+
+OPERATIONS = {'+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '%': 'mod', '^': 'pow'}
+
+
+def scientific(text, value, trig_mode):
+    value = value.collapse()
+    if text == 'x²':
+        return LazyReal('mul', value, value)
+    if text == 'x³':
+        return LazyReal('mul', LazyReal('mul', value, value), value)
+    function = SCIENTIFIC[text]
+    if trig_mode == "DEG" and function in ('sin', 'cos', 'tan'):
+        return LazyReal(function, LazyReal('radians', value))
+    if trig_mode == "DEG" and function in ('asin', 'acos', 'atan'):
+        return LazyReal('degrees', LazyReal(function, value))
+    return LazyReal(function, value)
+
+
+def operation(operation, first_number, second_number):
+    return LazyReal(OPERATIONS[operation], first_number.collapse(), second_number.collapse())
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from expression_engine import default_namespace
+from precision import FUNCTIONS
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.calculator_cache.sqlite')
+FORMAT = 2
+MISSING = object()
+# Hits are written back to disk in batches of this many.
+HIT_BATCH = 64
+
+
+def function_set_version():
+    # Cached values are only valid for the functions that produced them, so
+    # adding or renaming one starts a fresh cache.
+    names = sorted(default_namespace()) + sorted(FUNCTIONS)
+    text = f"{FORMAT}:" + ",".join(names)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path=DEFAULT_PATH, max_entries=10000, min_cost=0.05,
+                 max_value_bytes=1 << 20, max_memory_bytes=32 << 20, version=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.min_cost = min_cost
+        self.max_value_bytes = max_value_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.version = version or function_set_version()
+        # Unpickled values by key, least recently used first, with the size
+        # of their pickles so the whole dict stays under max_memory_bytes.
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.used = {}
+        self.pending_hits = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.db = self.connect()
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB, cost REAL, hits INTEGER, used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            self.db.execute("DELETE FROM entries")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+        self.db.commit()
+        # Every lookup runs on the UI thread and most of them miss, so the
+        # keys on disk are kept in memory and a miss never touches SQLite.
+        self.keys = {row[0] for row in self.db.execute("SELECT key FROM entries")}
+        self.count = len(self.keys)
+
+    def connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @staticmethod
+    def key(expression, mode, precision):
+        return f"{mode}|{precision}|{expression}"
+
+    def get(self, expression, mode='', precision=''):
+        key = self.key(expression, mode, precision)
+        if key not in self.keys:
+            self.misses += 1
+            return MISSING
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+        if entry is None:
+            row = self.db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.keys.discard(key)
+                self.misses += 1
+                return MISSING
+            entry = (pickle.loads(row[0]), len(row[0]))
+            self.remember(key, *entry)
+        self.hits += 1
+        hits, _ = self.used.get(key, (0, 0))
+        self.used[key] = (hits + 1, time.time())
+        self.pending_hits += 1
+        if self.pending_hits >= HIT_BATCH:
+            self.flush()
+            self.db.commit()
+        return entry[0]
+
+    def put(self, expression, mode, precision, value, cost):
+        # Only results that took a while are worth a row on disk.
+        if cost < self.min_cost:
+            return False
+        try:
+            data = pickle.dumps(value)
+        except Exception:
+            return False
+        if len(data) > self.max_value_bytes:
+            return False
+        key = self.key(expression, mode, precision)
+        self.flush()
+        inserted = self.db.execute(
+            "INSERT OR IGNORE INTO entries VALUES (?, ?, ?, 0, ?)", (key, data, cost, time.time())
+        ).rowcount
+        self.count += inserted
+        self.keys.add(key)
+        if self.count > self.max_entries:
+            self.evict(self.count - self.max_entries)
+        self.db.commit()
+        self.remember(key, value, len(data))
+        return True
+
+    def remember(self, key, value, size):
+        with self.lock:
+            old = self.memory.pop(key, None)
+            if old is not None:
+                self.memory_bytes -= old[1]
+            self.memory[key] = (value, size)
+            self.memory_bytes += size
+            while self.memory_bytes > self.max_memory_bytes:
+                _, (_, dropped) = self.memory.popitem(last=False)
+                self.memory_bytes -= dropped
+
+    def flush(self):
+        # Writes the hits counted since the last flush; the caller commits.
+        if self.used:
+            self.db.executemany(
+                "UPDATE entries SET hits = hits + ?, used = ? WHERE key = ?",
+                [(hits, used, key) for key, (hits, used) in self.used.items()]
+            )
+            self.used.clear()
+            self.pending_hits = 0
+
+    def evict(self, count):
+        keys = [row[0] for row in self.db.execute(
+            "SELECT key FROM entries ORDER BY used LIMIT ?", (count,)
+        )]
+        self.db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+        self.count -= len(keys)
+        self.keys.difference_update(keys)
+        with self.lock:
+            for key in keys:
+                entry = self.memory.pop(key, None)
+                if entry is not None:
+                    self.memory_bytes -= entry[1]
+
+    # The most used entries are unpickled on a background thread at
+    # startup, so the first lookups after a restart don't wait for disk.
+    def warm_up(self, limit=200):
+        thread = threading.Thread(target=self.load_hottest, args=(limit,), daemon=True)
+        thread.start()
+        return thread
+
+    def load_hottest(self, limit):
+        db = sqlite3.connect(self.path)
+        try:
+            rows = db.execute(
+                "SELECT key, value FROM entries ORDER BY hits DESC, used DESC LIMIT ?", (limit,)
+            ).fetchall()
+        finally:
+            db.close()
+        for key, data in rows:
+            try:
+                value = pickle.loads(data)
+            except Exception:
+                continue
+            with self.lock:
+                if key in self.memory:
+                    continue
+            self.remember(key, value, len(data))
+
+    def clear(self):
+        self.db.execute("DELETE FROM entries")
+        self.db.commit()
+        self.count = 0
+        self.keys.clear()
+        self.used.clear()
+        self.pending_hits = 0
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+
+    def close(self):
+        self.flush()
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,75 @@
+import functools
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from background import Worker
+from expression_engine import default_engine, estimate_digits, parse
+from number_format import format_number, to_text
+
+
+class TooExpensive(Exception):
+    pass
+
+
+def limit_memory(limit):
+    if resource is not None and limit:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+
+def evaluate_text(source):
+    # Formatting happens here too, so the UI process never touches the
+    # full value of a huge result.
+    return format_number(default_engine.evaluate(source))
+
+
+# All the digits, for copying a result that was shown by its magnitude.
+def evaluate_full_text(source):
+    return to_text(default_engine.evaluate(source))
+
+
+class SandboxPool:
+    def __init__(self, size=2, timeout=2.0, memory_limit=1024 * 1024 * 1024, max_digits=1000000):
+        self.timeout = timeout
+        self.max_digits = max_digits
+        self.workers = [Worker(functools.partial(limit_memory, memory_limit)) for _ in range(size)]
+        for worker in self.workers:
+            worker.start()
+        self.next_worker = 0
+
+    def check(self, source, values=None, functions=None):
+        if estimate_digits(parse(source), values, functions) > self.max_digits:
+            raise TooExpensive(source)
+
+    def evaluate(self, source, function=evaluate_text):
+        self.check(source)
+
+        worker = self.workers[self.next_worker]
+        self.next_worker = (self.next_worker + 1) % len(self.workers)
+        try:
+            worker.submit(function, (source,))
+            if worker.ready(self.timeout):
+                ok, result = worker.receive()
+            else:
+                ok, result = False, TooExpensive(source)
+        except (EOFError, OSError):
+            ok, result = False, TooExpensive(source)
+
+        if not ok:
+            if isinstance(result, (TooExpensive, MemoryError)):
+                # The worker is either stuck or was starved of memory;
+                # replace it so the next expression gets a fresh one.
+                worker.kill()
+                worker.start()
+                raise TooExpensive(source)
+            raise result
+        return result
+
+    def close(self):
+        for worker in self.workers:
+            worker.kill()
@@ -0,0 +1,113 @@
+import math
+from collections import OrderedDict
+
+SQRT2 = math.sqrt(2)
+SQRT3 = math.sqrt(3)
+SQRT5 = math.sqrt(5)
+SQRT6 = math.sqrt(6)
+
+# sin of every multiple of 15° and 18° in the first quadrant, from the
+# closed forms rather than from math.sin(math.radians(...)).
+SIN_FIRST_QUADRANT = {
+    0: 0.0,
+    15: (SQRT6 - SQRT2) / 4,
+    18: (SQRT5 - 1) / 4,
+    30: 0.5,
+    36: math.sqrt(10 - 2 * SQRT5) / 4,
+    45: SQRT2 / 2,
+    54: (SQRT5 + 1) / 4,
+    60: SQRT3 / 2,
+    72: math.sqrt(10 + 2 * SQRT5) / 4,
+    75: (SQRT6 + SQRT2) / 4,
+    90: 1.0,
+}
+
+
+def exact_sin(degrees):
+    if not float(degrees).is_integer():
+        return None
+    angle = int(degrees) % 360
+    sign = 1.0
+    if angle >= 180:
+        angle -= 180
+        sign = -1.0
+    if angle > 90:
+        angle = 180 - angle
+    value = SIN_FIRST_QUADRANT.get(angle)
+    if value is None:
+        return None
+    return sign * value if value else 0.0
+
+
+def exact_cos(degrees):
+    if not float(degrees).is_integer():
+        return None
+    return exact_sin(degrees + 90)
+
+
+def exact_tan(degrees):
+    sine = exact_sin(degrees)
+    cosine = exact_cos(degrees)
+    if sine is None or cosine is None:
+        return None
+    if cosine == 0:
+        raise ValueError("tan is undefined at odd multiples of 90°")
+    if abs(sine) == abs(cosine):
+        return math.copysign(1.0, sine * cosine)
+    return sine / cosine
+
+
+INVERSE_SIN = {}
+INVERSE_COS = {}
+INVERSE_TAN = {}
+for angle in range(-90, 91):
+    if exact_sin(angle) is not None:
+        INVERSE_SIN.setdefault(exact_sin(angle), angle)
+        if abs(angle) != 90:
+            INVERSE_TAN.setdefault(exact_tan(angle), angle)
+for angle in range(0, 181):
+    if exact_cos(angle) is not None:
+        INVERSE_COS.setdefault(exact_cos(angle), angle)
+
+EXACT_DEGREES = {
+    'sin': exact_sin,
+    'cos': exact_cos,
+    'tan': exact_tan,
+    'asin': INVERSE_SIN.get,
+    'acos': INVERSE_COS.get,
+    'atan': INVERSE_TAN.get,
+}
+
+
+def exact_value(text, value):
+    return EXACT_DEGREES[text](value)
+
+
+class MemoCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        try:
+            result = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            result = compute()
+            self.entries[key] = result
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            return result
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
@@ -0,0 +1,291 @@
+import math
+import mmap
+import os
+import tkinter as tk
+import warnings
+from tkinter import filedialog
+
+import numpy as np
+
+CHUNK_BYTES = 8 * 1024 * 1024
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+# Relative accuracy of the quantile sketch.
+ACCURACY = 0.01
+# Tried in this order; a file with none of them is split on runs of
+# whitespace.
+DELIMITERS = (b",", b";", b"\t")
+
+
+class QuantileSketch:
+    # Values are counted in logarithmic buckets (as in DDSketch), so any
+    # quantile is within ACCURACY of the true value, memory depends on the
+    # range of magnitudes and not on the count, and a chunk is added with
+    # one np.unique call.
+    def __init__(self, accuracy=ACCURACY):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values):
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(values == 0))
+        for counts, part in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if len(part):
+                keys, numbers = np.unique(np.ceil(np.log(part) / self.log_gamma).astype(np.int64),
+                                          return_counts=True)
+                for key, number in zip(keys.tolist(), numbers.tolist()):
+                    counts[key] = counts.get(key, 0) + number
+
+    def value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, fraction):
+        if not self.count:
+            return math.nan
+        rank = fraction * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self.value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.positive))
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, values):
+        # Welford's update, applied a chunk at a time with Chan's formula
+        # for combining two partial results.
+        values = values[np.isfinite(values)]
+        count = len(values)
+        if not count:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self.sketch.add(values)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def summary(self):
+        result = {
+            'count': self.count,
+            'mean': self.mean if self.count else math.nan,
+            'std': math.sqrt(self.variance),
+            'variance': self.variance,
+            'min': self.minimum if self.count else math.nan,
+            'max': self.maximum if self.count else math.nan,
+            'sum': self.total,
+        }
+        for fraction in QUANTILES:
+            result[f"p{fraction * 100:g}"] = self.sketch.quantile(fraction)
+        return result
+
+
+def detect_delimiter(line):
+    counts = [line.count(delimiter) for delimiter in DELIMITERS]
+    if max(counts):
+        return DELIMITERS[counts.index(max(counts))]
+    return None
+
+
+def split_cells(line, delimiter):
+    # With a real delimiter every cell keeps its place, empty ones included.
+    line = line.strip(b"\r\n")
+    if delimiter is None:
+        return line.split()
+    return [cell.strip() for cell in line.split(delimiter)]
+
+
+def numbers(line, delimiter):
+    try:
+        return [float(cell) if cell else math.nan for cell in split_cells(line, delimiter)]
+    except ValueError:
+        return None
+
+
+def has_empty_cells(data, delimiter):
+    if delimiter is None:
+        return False
+    return (delimiter * 2 in data or data.startswith(delimiter) or data.endswith(delimiter)
+            or b"\n" + delimiter in data or delimiter + b"\n" in data or delimiter + b"\r" in data)
+
+
+def parse_chunk(data, column, width, delimiter=None):
+    # Fast path: the whole chunk is numbers with no empty cells, so NumPy
+    # reads it in one go.
+    values = None
+    if not has_empty_cells(data, delimiter):
+        text = data.replace(delimiter, b" ") if delimiter is not None else data
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                values = np.fromstring(text, dtype=float, sep=" ")
+        except ValueError:
+            values = None
+    lines = data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+    if values is not None and values.size == lines * width:
+        return values.reshape(-1, width)[:, column]
+    # Slow path for chunks with empty cells, text cells or ragged rows;
+    # anything that is not a number counts as missing.
+    picked = []
+    for line in data.splitlines():
+        cells = split_cells(line, delimiter)
+        if len(cells) > column and cells[column]:
+            try:
+                picked.append(float(cells[column]))
+            except ValueError:
+                pass
+    return np.array(picked, dtype=float)
+
+
+def scan(path, column=0, chunk_bytes=CHUNK_BYTES):
+    # Yields (bytes read, file size, stats) after every chunk. The file is
+    # memory-mapped and cut at line ends, so only one chunk is ever held
+    # as a copy.
+    stats = RunningStats()
+    size = os.path.getsize(path)
+    if not size:
+        yield 0, 0, stats
+        return
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        position = 0
+        first = view.readline()
+        delimiter = detect_delimiter(first)
+        cells = numbers(first, delimiter)
+        if cells is None:
+            header = [cell.strip(b'"').decode('utf-8', 'replace') for cell in split_cells(first, delimiter)]
+            if isinstance(column, str):
+                column = header.index(column)
+            position = len(first)
+            width = len(header)
+        else:
+            width = len(cells)
+        if isinstance(column, str):
+            column = int(column)
+        while position < size:
+            end = view.find(b"\n", min(position + chunk_bytes, size) - 1)
+            end = size if end < 0 else end + 1
+            data = view[position:end].strip(b"\r\n")
+            if data:
+                stats.add(parse_chunk(data, column, width, delimiter))
+            position = end
+            yield position, size, stats
+
+
+def format_stat(value):
+    if isinstance(value, int):
+        return f"{value:,}"
+    return f"{value:.10g}"
+
+
+class StatsPanel:
+    def __init__(self, parent, colors, font, on_progress=None):
+        self.colors = colors
+        self.on_progress = on_progress
+        self.job = None
+        self.path = None
+
+        self.frame = tk.Frame(parent, bg=colors['bg'])
+        controls = tk.Frame(self.frame, bg=colors['bg'])
+        controls.pack(fill='x', pady=(0, 5))
+        tk.Button(controls, text="Open…", font=font, command=self.choose,
+                  bg=colors['toggle_btn'], fg='white', borderwidth=0, relief='flat',
+                  activebackground=colors['toggle_btn_hover'], cursor='hand2', padx=10).pack(side='left')
+        tk.Label(controls, text="column", font=font, bg=colors['bg'], fg='#888888').pack(side='left', padx=(10, 2))
+        self.column = tk.Entry(controls, width=8, font=font)
+        self.column.insert(0, "0")
+        self.column.pack(side='left')
+        self.column.bind('<Return>', lambda event: self.start())
+        self.status = tk.Label(controls, text="", font=font, bg=colors['bg'], fg='#888888', anchor='e')
+        self.status.pack(side='right', fill='x', expand=True)
+
+        grid = tk.Frame(self.frame, bg=colors['bg'])
+        grid.pack(fill='both', expand=True)
+        self.values = {}
+        names = list(RunningStats().summary())
+        for index, name in enumerate(names):
+            row, col = index % 6, index // 6 * 2
+            tk.Label(grid, text=name, font=font, bg=colors['bg'], fg='#888888', anchor='w').grid(
+                row=row, column=col, sticky='w', padx=(5, 2))
+            value = tk.Label(grid, text="–", font=font, bg=colors['bg'], fg=colors['display_fg'], anchor='e')
+            value.grid(row=row, column=col + 1, sticky='e', padx=(2, 10))
+            self.values[name] = value
+        for col in range(4):
+            grid.grid_columnconfigure(col, weight=1)
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def pack_forget(self):
+        self.frame.pack_forget()
+
+    def choose(self):
+        path = filedialog.askopenfilename(
+            parent=self.frame,
+            filetypes=[('Data', '*.csv *.txt *.dat *.log'), ('All files', '*')]
+        )
+        if path:
+            self.path = path
+            self.start()
+
+    def start(self):
+        if self.path is None:
+            return
+        self.cancel()
+        column = self.column.get().strip()
+        column = int(column) if column.isdigit() else column
+        self.job = self.frame.after(1, self.step, scan(self.path, column))
+
+    def cancel(self):
+        if self.job is not None:
+            self.frame.after_cancel(self.job)
+            self.job = None
+
+    # One chunk per event-loop turn; the numbers on screen are the running
+    # results so far.
+    def step(self, progress):
+        try:
+            done, size, stats = next(progress)
+        except StopIteration:
+            self.job = None
+            self.status.config(text=f"done · {os.path.basename(self.path)}")
+            return
+        except (OSError, ValueError) as exception:
+            self.job = None
+            self.status.config(text=f"error: {exception}")
+            return
+        summary = stats.summary()
+        for name, value in summary.items():
+            self.values[name].config(text=format_stat(value))
+        self.status.config(text=f"{done * 100 // max(size, 1)}%")
+        if self.on_progress is not None:
+            self.on_progress(summary)
+        self.job = self.frame.after(1, self.step, progress)
@@ -0,0 +1,25 @@
+from advanced_engineering_calculator.batch import evaluate_line, get_engine, stream_results
+
+
+def test_degree_mode_uses_the_exact_tables():
+    engine = get_engine("DEG")
+    assert evaluate_line(engine, "sin(30)") == "0.5"
+    assert evaluate_line(engine, "cos(60)") == "0.5"
+    assert evaluate_line(engine, "atan(1)") == "45"
+    assert evaluate_line(engine, "tan(90)") == "Error"
+
+
+def test_expensive_lines_are_refused():
+    assert evaluate_line(get_engine("RAD"), "9**9**9") == "Too expensive"
+
+
+def test_results_stay_in_order():
+    lines = ["1+1", "9**9**9", "2+2", "", "foo("]
+    results = ["2", "Too expensive", "4", "", "Error"]
+    assert list(stream_results(lines, workers=2, chunk_size=2)) == results
+
+
+def test_a_slow_chunk_times_out():
+    # The middle line passes the digit check but takes seconds to divide.
+    lines = ["1+1", "(3**2000000) // (7**500000) % 11", "2+2"]
+    assert list(stream_results(lines, workers=1, chunk_size=1, timeout=0.5)) == ["2", "Timeout", "4"]
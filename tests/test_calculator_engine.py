@@ -0,0 +1,95 @@
+import pytest
+
+from calculator_engine import CalcState, CalculatorEngine, compute
+
+
+def test_arithmetic():
+    assert CalculatorEngine().feed(list("12+3=")) == "15"
+    assert CalculatorEngine().feed(list("2^10=")) == "1024"
+    assert CalculatorEngine(trig_mode="DEG").feed(list("30") + ['sin']) == "0.5"
+
+
+def test_huge_factorial_is_shown_by_magnitude():
+    engine = CalculatorEngine()
+    assert engine.feed(list("1000") + ['x!']) == "4.0239e+2567"
+
+
+def test_undo_and_redo_walk_the_key_history():
+    engine = CalculatorEngine()
+    engine.feed(list("12+3"))
+    assert engine.display == "3"
+    assert engine.undo()
+    assert engine.display == "12 +"
+    assert engine.undo()
+    assert engine.display == "12"
+    assert engine.redo()
+    assert engine.display == "12 +"
+    assert engine.redo()
+    assert engine.display == "3"
+    assert not engine.redo()
+    assert engine.press('=') == "15"
+
+
+def test_undo_skips_keys_that_changed_nothing():
+    engine = CalculatorEngine()
+    engine.feed(list("5"))
+    engine.press('⌫')
+    engine.press('⌫')
+    assert engine.undo()
+    assert engine.display == "5"
+
+
+def test_a_new_key_clears_redo():
+    engine = CalculatorEngine()
+    engine.feed(list("12"))
+    engine.undo()
+    engine.press('7')
+    assert not engine.redo()
+    assert engine.display == "17"
+
+
+def test_undo_depth_is_bounded():
+    engine = CalculatorEngine(undo_depth=3)
+    engine.feed(list("123456"))
+    undone = 0
+    while engine.undo():
+        undone += 1
+    assert undone == 3
+    assert engine.display == "123"
+
+
+def test_nothing_to_undo():
+    engine = CalculatorEngine()
+    assert not engine.undo()
+    assert engine.display == "0"
+
+
+def test_state_snapshots_are_immutable():
+    engine = CalculatorEngine(trig_mode="RAD")
+    engine.feed(list("42"))
+    snapshot = engine.state
+    assert snapshot.current_input == "42" and snapshot.trig_mode == "RAD"
+    engine.press('C')
+    assert snapshot.current_input == "42"
+    engine.restore(snapshot._replace(display="7", current_input="7"))
+    assert engine.feed(list("+1=")) == "8"
+    with pytest.raises(AttributeError):
+        snapshot.display = "1"
+    assert CalcState().display == "0"
+
+
+def test_heavy_jobs_and_what_a_worker_computes():
+    engine = CalculatorEngine()
+    engine.feed(list("12"))
+    assert not engine.prepare('sin').heavy
+    engine.feed(list("5"))
+    assert engine.prepare('x!').heavy
+
+    engine = CalculatorEngine(precise=True)
+    engine.feed(list("2"))
+    job = engine.prepare('√')
+    assert job.heavy
+    result = compute(job.function, job.args)
+    assert result.prec > 0
+    engine.complete(job, True, result)
+    assert engine.display == "1.4142135623731"
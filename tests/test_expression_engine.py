@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from expression_engine import (
+    BinOp, Compiler, ExpressionEngine, ExpressionError, Name, Number,
+    default_namespace, estimate_digits, evaluate, names_in, parse,
+)
+
+
+def compile_tree(source):
+    compiler = Compiler(default_namespace())
+    return compiler, compiler.compile(parse(source))
+
+
+@pytest.mark.parametrize('source, expected', [
+    ("1 + 2 * 3", 7),
+    ("(1 + 2) * 3", 9),
+    ("-2**2", -4),
+    ("2**-1", 0.5),
+    ("2**3**2", 512),
+    ("7 // 2", 3),
+    ("7 % 3", 1),
+    ("1e3 + .5", 1000.5),
+])
+def test_precedence_and_associativity(source, expected):
+    assert evaluate(source) == expected
+
+
+def test_parse_builds_the_tree():
+    tree = parse("a + 2 * b")
+    assert isinstance(tree, BinOp) and tree.op == '+'
+    assert isinstance(tree.left, Name) and tree.left.id == 'a'
+    assert isinstance(tree.right, BinOp) and tree.right.op == '*'
+    assert isinstance(tree.right.left, Number) and tree.right.left.value == 2
+
+
+@pytest.mark.parametrize('source', ["1 +", "(1", "1 2", "", ")", "2 ^ 3"])
+def test_malformed_input_is_an_expression_error(source):
+    with pytest.raises(ExpressionError):
+        evaluate(source)
+
+
+def test_variables():
+    assert evaluate("x * y + 1", x=2, y=3) == 7
+
+
+def test_names_in():
+    assert names_in(parse("f(a, b * c) + 2")) == {'f', 'a', 'b', 'c'}
+
+
+def test_constant_subtrees_are_folded():
+    _, (function, is_constant, value) = compile_tree("2 * 3 + sin(0)")
+    assert is_constant and value == 6
+    compiler, (function, is_constant, value) = compile_tree("2 * 3 * x")
+    assert not is_constant
+    assert compiler.variables == {'x'}
+    assert function({'x': 2}) == 12
+
+
+def test_huge_constants_are_not_folded():
+    # Folding 9**9**9 would take hours at compile time.
+    started = time.perf_counter()
+    _, (_, is_constant, _) = compile_tree("9**9**9")
+    assert not is_constant
+    _, (_, is_constant, _) = compile_tree("factorial(10**6)")
+    assert not is_constant
+    assert time.perf_counter() - started < 1
+
+
+def test_folding_keeps_errors_for_run_time():
+    _, (function, is_constant, _) = compile_tree("1 / 0")
+    assert not is_constant
+    with pytest.raises(ZeroDivisionError):
+        function({})
+
+
+def test_cache_shares_entries_between_spellings():
+    engine = ExpressionEngine()
+    first = engine.compile("1+1")
+    assert engine.compile("1 + 1") is first
+    assert (engine.hits, engine.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    engine = ExpressionEngine(cache_size=2)
+    engine.compile("1")
+    engine.compile("2")
+    engine.compile("1")
+    engine.compile("3")
+    assert list(engine.cache) == ["1", "3"]
+    engine.clear()
+    assert not engine.cache and engine.hits == engine.misses == 0
+
+
+@pytest.mark.parametrize('source, low, high', [
+    ("2 * 3", 0, 1),
+    ("10**400", 399, 401),
+    ("9**9**9", 3.6e8, 3.7e8),
+    ("factorial(1000)", 2000, 3000),
+])
+def test_estimate_digits(source, low, high):
+    assert low <= estimate_digits(parse(source)) <= high
+
+
+def test_estimate_digits_uses_known_values():
+    assert estimate_digits(parse("x**3")) < 1
+    assert estimate_digits(parse("x**3"), {'x': 10.0 ** 100}) == pytest.approx(300)
+    assert estimate_digits(parse("x**3"), {'x': 10 ** 500}) == pytest.approx(1500)
+    assert estimate_digits(parse("x"), {'x': float('inf')}) == 0
@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import struct
+
+from history import HEADER, History
+
+
+def open_history(tmp_path):
+    return History(str(tmp_path / 'history'))
+
+
+def test_record_format(tmp_path):
+    history = open_history(tmp_path)
+    assert history.add("2+2", "4", "DEG", timestamp=1.5) == 0
+    assert history.add("√9", "3", "RAD PREC", timestamp=2.5) == 1
+    history.close()
+
+    with open(tmp_path / 'history', 'rb') as handle:
+        data = handle.read()
+    assert HEADER.unpack_from(data, 0) == (1.5, 3, 3, 1)
+    assert data[HEADER.size:HEADER.size + 7] == b"DEG2+24"
+    second = HEADER.size + 7
+    assert HEADER.unpack_from(data, second) == (2.5, 8, len("√9".encode('utf-8')), 1)
+    with open(tmp_path / 'history.idx', 'rb') as handle:
+        assert struct.unpack('<2Q', handle.read()) == (0, second)
+
+
+def test_entries_survive_reopening(tmp_path):
+    history = open_history(tmp_path)
+    for number in range(10):
+        history.add(f"{number}*2", str(number * 2), 'DEG', timestamp=number)
+    history.close()
+
+    history = open_history(tmp_path)
+    assert len(history) == 10
+    assert history.entry(7) == (7.0, 'DEG', "7*2", "14")
+    history.close()
+
+
+def test_search_matches_expressions_only(tmp_path):
+    history = open_history(tmp_path)
+    history.add("sin(30)", "0.5", 'DEG')
+    history.add("1+1", "2", 'sin')
+    history.add("asin(1)", "90", 'DEG')
+    history.add("sin(90)", "1", 'DEG')
+    assert history.search("sin") == [3, 2, 0]
+    assert history.search("sin", prefix=True) == [3, 0]
+    assert history.search("") == [3, 2, 1, 0]
+    assert history.search("cos") == []
+    history.close()
+
+
+def test_recovery_cuts_a_torn_record(tmp_path):
+    history = open_history(tmp_path)
+    history.add("1+1", "2", 'DEG')
+    history.add("2+2", "4", 'DEG')
+    history.close()
+    size = os.path.getsize(tmp_path / 'history')
+    with open(tmp_path / 'history', 'ab') as handle:
+        handle.write(HEADER.pack(3.0, 3, 3, 1) + b"DEG3+")
+
+    history = open_history(tmp_path)
+    assert len(history) == 2
+    assert os.path.getsize(tmp_path / 'history') == size
+    assert history.add("3+3", "6", 'DEG') == 2
+    assert history.entry(2)[2:] == ("3+3", "6")
+    history.close()
+
+
+def test_a_bad_index_is_rebuilt(tmp_path):
+    history = open_history(tmp_path)
+    for number in range(5):
+        history.add(str(number), str(number))
+    history.close()
+    with open(tmp_path / 'history.idx', 'wb') as handle:
+        handle.write(struct.pack('<3Q', 0, 10 ** 9, 5))
+
+    history = open_history(tmp_path)
+    assert [history.entry(number)[2] for number in range(len(history))] == ["0", "1", "2", "3", "4"]
+    history.close()
+
+
+def test_two_histories_on_one_file(tmp_path):
+    first = open_history(tmp_path)
+    second = open_history(tmp_path)
+    first.add("1", "1")
+    second.add("2", "2")
+    first.add("3", "3")
+    assert first.search("") == [2, 1, 0]
+    assert [first.entry(number)[2] for number in range(3)] == ["1", "2", "3"]
+    second.refresh()
+    assert [second.entry(number)[2] for number in range(3)] == ["1", "2", "3"]
+    first.close()
+    second.close()
+
+    history = open_history(tmp_path)
+    assert [history.entry(number)[2] for number in range(len(history))] == ["1", "2", "3"]
+    history.close()
+
+
+def append_many(path, name, count):
+    history = History(path)
+    for number in range(count):
+        history.add(f"{name}{number}", str(number))
+    history.close()
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / 'history')
+    processes = [multiprocessing.Process(target=append_many, args=(path, name, 200)) for name in "ab"]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    history = History(path)
+    expressions = [history.entry(number)[2] for number in range(len(history))]
+    history.close()
+    assert sorted(expressions) == sorted(f"{name}{number}" for name in "ab" for number in range(200))
+    for name in "ab":
+        assert [text for text in expressions if text[0] == name] == [f"{name}{number}" for number in range(200)]
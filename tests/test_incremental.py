@@ -0,0 +1,38 @@
+from expression_engine import tokenize
+from incremental import IncrementalParser
+
+
+def test_retokenize_matches_a_full_tokenize():
+    parser = IncrementalParser()
+    edits = ["1", "12", "12+", "12+3", "12+3.5e", "12+3.5e+2", "12 + 3.5e+2",
+             "sin(12 + 3.5e+2)", "sin(1 + 3.5e+2)", "sin(1 + 3.5e+2)*x", ""]
+    for text in edits:
+        assert parser.retokenize(text) == tokenize(text)
+        parser.update(text)
+
+
+def test_an_edit_retokenizes_only_around_it():
+    parser = IncrementalParser()
+    text = "+".join(str(number) for number in range(200))
+    parser.update(text)
+    scanned = parser.retokenized
+    edited = text.replace("100", "101")
+    assert parser.update(edited) == sum(range(200)) + 1
+    assert parser.retokenized - scanned < 20
+
+
+def test_only_changed_subtrees_are_evaluated():
+    parser = IncrementalParser()
+    assert parser.update("sqrt(16) * (2 + 3)") == 20
+    evaluated = parser.evaluated
+    assert parser.update("sqrt(16) * (2 + 4)") == 24
+    # The new literal, the sum and the product; sqrt(16) is remembered.
+    assert parser.evaluated - evaluated == 3
+
+
+def test_invalid_text_has_no_preview():
+    parser = IncrementalParser()
+    assert parser.update("1 +") is None
+    assert parser.update("1 $ 2") is None
+    assert parser.update("9**9**9") is None
+    assert parser.update("1 + 2") == 3
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from expression_engine import ExpressionError
+from matrix import evaluate_matrix_text, parse_matrix
+
+
+@pytest.mark.parametrize('text', [
+    "[[1, 2], [3, 4]]",
+    "1 2\n3 4",
+    "1, 2\r\n3, 4\n",
+    "1 2; 3 4",
+    "1\t2\n3\t4",
+])
+def test_parse_matrix(text):
+    assert parse_matrix(text).tolist() == [[1, 2], [3, 4]]
+
+
+def test_tabs_take_commas_as_decimal_separators():
+    assert parse_matrix("1,5\t2\n3\t4,25").tolist() == [[1.5, 2], [3, 4.25]]
+
+
+@pytest.mark.parametrize('text', ["1 2\n3", "1 a\n3 4", ""])
+def test_bad_matrices(text):
+    with pytest.raises((ExpressionError, ValueError)):
+        parse_matrix(text)
+
+
+def test_degree_mode_for_matrices():
+    assert evaluate_matrix_text("cos([60, 90])", "DEG") == "[0.5, 0. ]"
+    assert np.isclose(float(evaluate_matrix_text("det([[1, 2], [3, 4]])")), -2)
@@ -0,0 +1,37 @@
+import math
+import pickle
+
+from number_format import EXACT_DIGITS, HugeInt, format_number, int_digits, to_text
+
+
+def test_integers_up_to_exact_digits_print_exactly():
+    value = 10 ** (EXACT_DIGITS - 1) + 7
+    assert int_digits(value) == EXACT_DIGITS
+    assert format_number(value) == str(value)
+    assert format_number(12345678901234567890) == "12345678901234567890"
+
+
+def test_longer_integers_print_their_magnitude():
+    assert format_number(10 ** EXACT_DIGITS) == "1.0000e+300"
+    assert format_number(-3 * 10 ** 400) == "-3.0000e+400"
+    assert format_number(2 ** 10000, max_digits=15) == "1.9951e+3010"
+
+
+def test_other_values_print_as_str():
+    assert format_number(0.1) == "0.1"
+    assert format_number(True) == "True"
+
+
+def test_huge_factorial_is_lazy():
+    value = HugeInt(factorial_of=100000)
+    assert value._value is None
+    assert value.display() == "2.8242e+456573"
+    assert float(value) == math.inf
+    assert pickle.loads(pickle.dumps(value)).display() == value.display()
+    assert value._value is None
+
+
+def test_full_text_has_every_digit():
+    value = HugeInt(factorial_of=1000)
+    assert to_text(value) == str(math.factorial(1000))
+    assert to_text(10 ** 5000) == "1" + "0" * 5000
@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+import pytest
+
+from expression_engine import evaluate
+from numeric import MAX_INTERVALS, brent, find_root, integrate
+
+
+def test_brent_converges_on_a_bracketed_root():
+    f = lambda x: x * x - 2
+    root = brent(f, 1.0, 2.0, f(1.0), f(2.0))
+    assert root == pytest.approx(math.sqrt(2), abs=1e-15)
+
+
+def test_brent_handles_flat_and_steep_functions():
+    f = lambda x: math.exp(x) - 1e6
+    root = brent(f, 0.0, 20.0, f(0.0), f(20.0))
+    assert root == pytest.approx(math.log(1e6), rel=1e-14)
+    f = lambda x: (x - 1) ** 3
+    assert brent(f, 0.0, 3.0, f(0.0), f(3.0)) == pytest.approx(1, abs=1e-5)
+
+
+def test_find_root_skips_poles():
+    # tan changes sign at pi/2 without a root; the root is at pi.
+    assert find_root(np.tan, 1.0, 4.0) == pytest.approx(math.pi)
+
+
+def test_find_root_without_a_root():
+    with pytest.raises(ValueError):
+        find_root(lambda x: x * x + 1, 0.0, 1.0)
+    with pytest.raises(ValueError):
+        find_root(np.sin, 1.0, math.inf)
+
+
+@pytest.mark.parametrize('f, a, b, expected', [
+    (np.sin, 0.0, math.pi, 2.0),
+    (lambda x: x ** 2, 0.0, 3.0, 9.0),
+    (np.sin, math.pi, 0.0, -2.0),
+    (lambda x: np.exp(-x * x), -math.inf, math.inf, math.sqrt(math.pi)),
+    (lambda x: np.exp(-x), 0.0, math.inf, 1.0),
+    (lambda x: 1 / (1 + x * x), -math.inf, 0.0, math.pi / 2),
+    (np.sqrt, 0.0, 1.0, 2 / 3),
+])
+def test_gauss_kronrod(f, a, b, expected):
+    assert integrate(f, a, b) == pytest.approx(expected, rel=1e-10)
+
+
+def test_integrate_reports_non_convergence():
+    with pytest.raises(ValueError, match=str(MAX_INTERVALS)):
+        integrate(lambda x: 1 / np.sqrt(np.abs(x - 0.3)), 0.0, 1.0)
+
+
+def test_integrate_refuses_non_finite_values():
+    with pytest.raises(ValueError), np.errstate(divide='ignore'):
+        integrate(lambda x: 1 / x, -1.0, 1.0)
+
+
+def test_solve_and_integrate_in_expressions():
+    assert evaluate("solve(x**2 - 2, 0, 2)") == pytest.approx(math.sqrt(2))
+    assert evaluate("integrate(x * k, 0, 2)", k=3) == pytest.approx(6)
+    assert evaluate("integrate(max(x, 0.5, 0), 0, 1)") == pytest.approx(0.625)
@@ -0,0 +1,18 @@
+import numpy as np
+
+from plotter import KEEP_VIEWS, Sampler
+
+
+def test_panning_keeps_a_bounded_window_of_samples():
+    sampler = Sampler("sin(x)")
+    for step in range(500):
+        lo = step * 0.5
+        xs, ys, _ = sampler.sample(lo, lo + 10, 400, 20, 400)
+        assert np.allclose(ys, np.sin(xs))
+    for cached in sampler.levels.values():
+        span = cached['xs'][-1] - cached['xs'][0]
+        assert span <= 10 * (2 * KEEP_VIEWS + 1) + 1
+        assert np.all(np.diff(cached['xs']) > 0)
+    xs, ys, _ = sampler.sample(0, 10, 400, 20, 400)
+    assert xs[0] <= 0 and xs[-1] >= 10
+    assert np.allclose(ys, np.sin(xs))
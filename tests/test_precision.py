@@ -0,0 +1,95 @@
+import pickle
+from decimal import Decimal, localcontext
+
+import pytest
+
+import precision
+from calculator_engine import CalculatorEngine, value_key
+from precision import COPY_DIGITS, MAX_DEPTH, LazyReal, format_decimal
+
+
+def literal(text):
+    return LazyReal.literal(text)
+
+
+def test_digits_of_a_tree():
+    value = precision.operation('/', literal("1"), literal("3"))
+    assert value.digits() == "0.333333333333333"
+    assert value.window(20) == "…" + "3" * 15
+
+
+def test_more_digits_agree_with_decimal():
+    value = precision.scientific('√', literal("2"), "RAD")
+    with localcontext() as context:
+        context.prec = 60
+        expected = Decimal(2).sqrt()
+    assert value.significand(50) == str(expected).replace(".", "")[:50]
+    assert value.digits() == "1.4142135623731"
+
+
+@pytest.mark.parametrize('text, value, trig_mode, expected', [
+    ('sin', "30", "DEG", "0.5"),
+    ('cos', "60", "DEG", "0.5"),
+    ('tan', "45", "DEG", "1"),
+    ('atan', "1", "DEG", "45"),
+    ('ln', "1", "RAD", "0"),
+    ('log', "1000", "RAD", "3"),
+    ('x!', "10", "RAD", "3628800"),
+    ('x!', "20", "RAD", "2.43290200817664e+18"),
+    ('10^x', "3", "RAD", "1000"),
+])
+def test_scientific_functions(text, value, trig_mode, expected):
+    assert precision.scientific(text, literal(value), trig_mode).digits() == expected
+
+
+def test_pi():
+    assert LazyReal('pi').significand(40) == "3141592653589793238462643383279502884197"
+
+
+def test_domain_errors():
+    with pytest.raises(ValueError):
+        precision.scientific('x!', literal("-1"), "RAD").digits()
+    with pytest.raises(ValueError):
+        precision.scientific('asin', literal("2"), "RAD").digits()
+
+
+def test_format_decimal():
+    assert format_decimal(Decimal("1.500")) == "1.5"
+    assert format_decimal(Decimal("0")) == "0"
+    assert format_decimal(Decimal("1e20")) == "1e+20"
+    with pytest.raises(ValueError):
+        format_decimal(Decimal("NaN"))
+
+
+def test_long_chains_of_results_stay_shallow():
+    # Every result is an operand of the next; before, about 490 of these
+    # ran out of stack.
+    engine = CalculatorEngine(precise=True)
+    engine.feed(['2', '√'])
+    for step in range(1000):
+        engine.feed(list("*3=" if step % 2 == 0 else "/3="))
+    assert engine.display == "1.4142135623731"
+    exact = engine.exact_value()
+    assert exact.depth <= MAX_DEPTH + 1
+    assert exact.full_text().startswith("1.41421356237309504880168872420969807856967187537694")
+    assert len(value_key(exact)) <= 64
+    restored = pickle.loads(pickle.dumps(exact))
+    assert restored.digits() == exact.digits() and restored.key == exact.key
+
+
+def test_scrolling_stops_where_a_collapsed_operand_ends():
+    value = literal("2")
+    for _ in range(MAX_DEPTH + 1):
+        value = precision.operation('+', value, literal("0"))
+    assert value.limit == COPY_DIGITS
+    engine = CalculatorEngine(precise=True)
+    engine.show_precise(value)
+    for _ in range(200):
+        engine.scroll(10)
+    assert engine.digit_offset == COPY_DIGITS - precision.DISPLAY_DIGITS
+
+
+def test_shared_operands_give_short_keys():
+    engine = CalculatorEngine(precise=True)
+    engine.feed(['3'] + ['x²'] * 30)
+    assert len(value_key(engine.exact_value())) <= 64
@@ -0,0 +1,71 @@
+import sqlite3
+
+from result_cache import HIT_BATCH, MISSING, ResultCache
+
+
+def open_cache(tmp_path, **options):
+    return ResultCache(str(tmp_path / 'cache.sqlite'), **options)
+
+
+def test_cheap_results_are_not_stored(tmp_path):
+    cache = open_cache(tmp_path)
+    assert not cache.put("1+1", "RAD", "float", 2, 0.001)
+    assert cache.get("1+1", "RAD", "float") is MISSING
+    assert cache.put("9**99", "RAD", "float", 9 ** 99, 1.0)
+    assert cache.get("9**99", "RAD", "float") == 9 ** 99
+    assert cache.get("9**99", "DEG", "float") is MISSING
+    cache.close()
+
+
+def test_misses_do_not_query_the_database(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("a", "", "", 1, 1.0)
+    cache.db.close()
+    # A closed connection raises on any query.
+    assert cache.get("b") is MISSING
+    assert cache.misses == 1
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("a", "", "", 1, 1.0)
+    for _ in range(HIT_BATCH - 1):
+        assert cache.get("a") == 1
+    other = sqlite3.connect(str(tmp_path / 'cache.sqlite'))
+    assert other.execute("SELECT hits FROM entries").fetchone()[0] == 0
+    cache.get("a")
+    assert other.execute("SELECT hits FROM entries").fetchone()[0] == HIT_BATCH
+    other.close()
+    cache.close()
+
+
+def test_values_survive_reopening(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("a", "", "", [1, 2], 1.0)
+    cache.get("a")
+    cache.close()
+    cache = open_cache(tmp_path)
+    assert cache.get("a") == [1, 2]
+    assert cache.db.execute("SELECT hits FROM entries").fetchone()[0] == 1
+    cache.close()
+
+
+def test_memory_is_bounded(tmp_path):
+    cache = open_cache(tmp_path, max_memory_bytes=1000)
+    for number in range(20):
+        cache.put(str(number), "", "", list(range(50)), 1.0)
+    assert cache.memory_bytes <= 1000
+    assert len(cache.memory) < 20
+    # Entries dropped from memory are read back from disk.
+    assert cache.get("0") == list(range(50))
+    cache.close()
+
+
+def test_eviction_keeps_the_newest_entries(tmp_path):
+    cache = open_cache(tmp_path, max_entries=3)
+    for number in range(5):
+        cache.put(str(number), "", "", number, 1.0)
+    assert cache.count == 3
+    assert cache.get("0") is MISSING
+    assert cache.get("4") == 4
+    cache.close()
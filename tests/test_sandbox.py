@@ -0,0 +1,41 @@
+import pytest
+
+from expression_engine import parse
+from sandbox import SandboxPool, TooExpensive, evaluate_full_text
+
+SLOW = "(3**2000000) // (7**500000) % 11"
+
+
+@pytest.fixture
+def sandbox():
+    pool = SandboxPool(size=1, timeout=0.5)
+    yield pool
+    pool.close()
+
+
+def test_evaluates_in_a_worker(sandbox):
+    assert sandbox.evaluate("2+2") == "4"
+    assert sandbox.evaluate("factorial(30)", evaluate_full_text) == "265252859812191058636308480000000"
+
+
+def test_check_refuses_huge_results(sandbox):
+    with pytest.raises(TooExpensive):
+        sandbox.check("9**9**9")
+    sandbox.check("9**9")
+    # Names and user functions are sized by what they stand for.
+    with pytest.raises(TooExpensive):
+        sandbox.check("n**n", values={'n': 10 ** 6})
+    with pytest.raises(TooExpensive):
+        sandbox.check("f(9)", functions={'f': (['x'], parse("x**x**x"))})
+
+
+def test_errors_come_back_from_the_worker(sandbox):
+    with pytest.raises(ZeroDivisionError):
+        sandbox.evaluate("1/0")
+    assert sandbox.evaluate("3*3") == "9"
+
+
+def test_a_stuck_worker_is_replaced(sandbox):
+    with pytest.raises(TooExpensive):
+        sandbox.evaluate(SLOW)
+    assert sandbox.evaluate("2+2") == "4"
@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from scientific import EXACT_DEGREES, MemoCache, exact_cos, exact_sin, exact_tan
+
+
+@pytest.mark.parametrize('degrees, sine', [
+    (0, 0.0),
+    (30, 0.5),
+    (150, 0.5),
+    (210, -0.5),
+    (-30, -0.5),
+    (390, 0.5),
+    (90, 1.0),
+    (180, 0.0),
+    (270, -1.0),
+    (18, (math.sqrt(5) - 1) / 4),
+])
+def test_exact_sin(degrees, sine):
+    assert exact_sin(degrees) == sine
+
+
+def test_angles_without_a_closed_form():
+    assert exact_sin(1) is None
+    assert exact_sin(30.5) is None
+    assert exact_cos(0.25) is None
+
+
+def test_cos_and_tan():
+    assert exact_cos(60) == 0.5
+    assert exact_cos(90) == 0.0
+    assert exact_tan(45) == 1.0
+    assert exact_tan(135) == -1.0
+    assert exact_tan(60) == pytest.approx(math.sqrt(3))
+    with pytest.raises(ValueError):
+        exact_tan(90)
+
+
+def test_inverse_tables():
+    assert EXACT_DEGREES['asin'](0.5) == 30
+    assert EXACT_DEGREES['asin'](-1.0) == -90
+    assert EXACT_DEGREES['acos'](-0.5) == 120
+    assert EXACT_DEGREES['atan'](1.0) == 45
+    assert EXACT_DEGREES['asin'](0.3) is None
+
+
+def test_memo_cache_is_lru():
+    cache = MemoCache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value * 2
+
+    assert cache.get('a', lambda: compute(1)) == 2
+    assert cache.get('b', lambda: compute(2)) == 4
+    assert cache.get('a', lambda: compute(1)) == 2
+    cache.get('c', lambda: compute(3))
+    cache.get('a', lambda: compute(1))
+    cache.get('b', lambda: compute(2))
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats() == {'hits': 2, 'misses': 4, 'size': 2}
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'size': 0}
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from advanced_engineering_calculator.server import CalculationServer, evaluate_batch, evaluate_item, split_keys
+from sandbox import TooExpensive
+
+
+@pytest.mark.parametrize('text, keys', [
+    ("30sin", ['3', '0', 'sin']),
+    ("2 + 2 =", ['2', '+', '2', '=']),
+    ("10^x", ['10^x']),
+    ("4 1/x", ['4', '1/x']),
+    ("1asin", ['1', 'asin']),
+])
+def test_split_keys(text, keys):
+    assert split_keys(text) == keys
+
+
+def test_unknown_keys():
+    with pytest.raises(ValueError):
+        split_keys("2?")
+
+
+def test_degree_expressions_agree_with_keys():
+    assert evaluate_item({'expr': "sin(30)", 'mode': "DEG"}) == "0.5"
+    assert evaluate_item({'keys': "30sin", 'mode': "DEG"}) == "0.5"
+    assert evaluate_item({'expr': "sin([30, 90])", 'mode': "DEG"}) == "[0.5, 1. ]"
+
+
+def test_bad_items():
+    with pytest.raises(TooExpensive):
+        evaluate_item({'expr': "9**9**9"})
+    with pytest.raises(ValueError):
+        evaluate_item({'expr': "1", 'mode': "GRAD"})
+    with pytest.raises(ValueError):
+        evaluate_item({'value': 1})
+    assert evaluate_batch([{'expr': "1+1"}, {'expr': "9**9**9"}, 3]) == [
+        {'result': "2"}, {'error': "too expensive"}, {'error': "Each request must be a JSON object"}]
+
+
+def test_a_timed_out_worker_is_replaced():
+    async def scenario():
+        server = CalculationServer(workers=1, timeout=0.5)
+        await server.start(port=0)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await server.evaluate([{'expr': "(3**2000000) // (7**500000) % 11"}])
+            server.timeout = 10.0
+            return await server.evaluate([{'expr': "2+2"}])
+        finally:
+            server.close()
+
+    assert asyncio.run(scenario()) == [{'result': "4"}]
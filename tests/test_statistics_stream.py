@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pytest
+
+from statistics_stream import detect_delimiter, parse_chunk, scan
+
+
+def final_stats(path, column=0, chunk_bytes=1 << 20):
+    for _, _, stats in scan(str(path), column, chunk_bytes):
+        pass
+    return stats
+
+
+@pytest.mark.parametrize('line, delimiter', [
+    (b"1,2,3\n", b","),
+    (b"1;2;3\n", b";"),
+    (b"1\t2\t3\n", b"\t"),
+    (b"1 2  3\n", None),
+])
+def test_detect_delimiter(line, delimiter):
+    assert detect_delimiter(line) == delimiter
+
+
+def test_parse_chunk_fast_path():
+    data = b"1,2,3\n4,5,6\n7,8,9"
+    assert parse_chunk(data, 1, 3, b",").tolist() == [2, 5, 8]
+
+
+def test_empty_cells_keep_their_column():
+    # Before, ",," merged into one separator and shifted the later cells.
+    data = b"1,,3\n,5,6\n7,8,"
+    assert parse_chunk(data, 0, 3, b",").tolist() == [1, 7]
+    assert parse_chunk(data, 1, 3, b",").tolist() == [5, 8]
+    assert parse_chunk(data, 2, 3, b",").tolist() == [3, 6]
+    assert parse_chunk(b"1\t\t3\n4\t5\t6", 2, 3, b"\t").tolist() == [3, 6]
+
+
+def test_text_cells_are_missing():
+    assert parse_chunk(b"1,a\n2,3", 1, 2, b",").tolist() == [3]
+
+
+def test_scan_with_header(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b"x;y\n1;10\n2;\n3;30\n")
+    stats = final_stats(path, 'y')
+    summary = stats.summary()
+    assert summary['count'] == 2
+    assert summary['mean'] == pytest.approx(20)
+
+
+def test_scan_when_the_first_row_has_an_empty_cell(tmp_path):
+    path = tmp_path / 'data.tsv'
+    path.write_bytes(b"\t1\n2\t3\n")
+    assert final_stats(path, 1).summary()['count'] == 2
+    assert final_stats(path, 0).summary()['count'] == 1
+
+
+def test_scan_in_small_chunks(tmp_path):
+    values = np.arange(1000, dtype=float)
+    path = tmp_path / 'data.txt'
+    path.write_bytes(b"".join(b"%d %d\n" % (value, 2 * value) for value in values))
+    summary = final_stats(path, 1, chunk_bytes=64).summary()
+    assert summary['count'] == 1000
+    assert summary['mean'] == pytest.approx(2 * values.mean())
+    assert math.isclose(summary['max'], 1998)
@@ -0,0 +1,37 @@
+import math
+
+import numpy as np
+import pytest
+
+from vectorized import evaluate_array, numpy_gamma, numpy_lgamma
+
+
+def test_min_and_max_take_any_number_of_arguments():
+    xs = np.array([1.0, 5.0])
+    assert evaluate_array("max(x, 2, 3)", x=xs).tolist() == [3, 5]
+    assert evaluate_array("min(x, 2, 0)", x=xs).tolist() == [0, 0]
+    assert evaluate_array("max(x, 2)", x=xs).tolist() == [2, 5]
+
+
+def test_numpy_gamma_matches_math():
+    xs = np.concatenate([np.linspace(-20.25, 171.5, 2001), [0.5, 1, 2, 10, 170]])
+    expected = np.array([math.gamma(x) for x in xs])
+    assert np.allclose(numpy_gamma(xs), expected, rtol=1e-11, atol=0)
+    assert np.allclose(numpy_lgamma(xs), [math.lgamma(x) for x in xs], rtol=1e-11, atol=1e-14)
+
+
+def test_gamma_poles_do_not_fail_the_array():
+    xs = np.array([-2.0, -1.0, 0.0, 0.5, 4.0, 200.0])
+    values = numpy_gamma(xs)
+    assert np.isnan(values[:3]).all()
+    assert values[3] == pytest.approx(math.sqrt(math.pi))
+    assert values[4] == pytest.approx(6)
+    assert values[5] == np.inf
+    assert np.isinf(numpy_lgamma(xs[:3])).all()
+
+
+def test_factorial_over_a_plot_range():
+    xs = np.linspace(-10, 10, 41)
+    values = evaluate_array("factorial(x)", x=xs)
+    assert np.isnan(values[xs == -3]).all()
+    assert values[-1] == pytest.approx(math.factorial(10))
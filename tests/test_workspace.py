@@ -0,0 +1,129 @@
+import time
+
+import pytest
+
+from expression_engine import ExpressionError, estimate_digits, parse
+from workspace import Workspace
+
+
+class TooExpensive(Exception):
+    pass
+
+
+def check(source, values=None, functions=None):
+    # The same test SandboxPool.check makes, without starting its workers.
+    if estimate_digits(parse(source), values, functions) > 1000000:
+        raise TooExpensive(source)
+
+
+def test_changing_a_definition_recomputes_only_its_dependents():
+    workspace = Workspace()
+    workspace.define("a = 2")
+    workspace.define("b = a * 3")
+    workspace.define("c = b + 1")
+    workspace.define("d = 10")
+    recomputed = workspace.recomputed
+    assert workspace.define("a = 5") == ['a', 'b', 'c']
+    assert workspace.recomputed - recomputed == 3
+    assert workspace.value('c') == 16
+    assert workspace.value('d') == 10
+
+
+def test_functions_follow_redefinitions():
+    workspace = Workspace()
+    workspace.define("k = 2")
+    workspace.define("f(x) = k * x")
+    workspace.define("y = f(3)")
+    assert workspace.value('y') == 6
+    workspace.define("f(x) = k + x")
+    assert workspace.value('y') == 5
+    workspace.define("k = 10")
+    assert workspace.value('y') == 13
+
+
+def test_circular_definitions_are_refused():
+    workspace = Workspace()
+    workspace.define("a = 1")
+    workspace.define("b = a + 1")
+    with pytest.raises(ExpressionError):
+        workspace.define("a = b")
+    with pytest.raises(ExpressionError):
+        workspace.define("c = c + 1")
+    assert workspace.value('b') == 2
+
+
+def test_errors_are_kept_per_definition():
+    workspace = Workspace()
+    workspace.define("a = 0")
+    workspace.define("b = 1 / a")
+    with pytest.raises(ZeroDivisionError):
+        workspace.value('b')
+    workspace.define("a = 4")
+    assert workspace.value('b') == 0.25
+
+
+def test_remove():
+    workspace = Workspace()
+    workspace.define("a = 1")
+    workspace.define("b = a + 1")
+    workspace.remove('a')
+    assert 'a' not in workspace.values
+    with pytest.raises(NameError):
+        workspace.value('b')
+    with pytest.raises(KeyError):
+        workspace.remove('a')
+
+
+def test_uses():
+    workspace = Workspace()
+    workspace.define("a = 1")
+    assert workspace.uses("a + 1")
+    assert not workspace.uses("2 + 1")
+
+
+def test_expensive_sources_are_refused_before_compiling():
+    workspace = Workspace(check=check)
+    started = time.perf_counter()
+    assert not workspace.uses("9**9**9")
+    with pytest.raises(TooExpensive):
+        workspace.define("a = 9**9**9")
+    with pytest.raises(TooExpensive):
+        workspace.evaluate("9**9**9")
+    assert time.perf_counter() - started < 1
+    assert 'a' not in workspace.sources
+
+
+def test_check_sees_the_values_of_names():
+    workspace = Workspace(check=check)
+    workspace.define("a = 10**500")
+    workspace.define("b = a * 2")
+    with pytest.raises(TooExpensive):
+        workspace.define("c = a**a")
+    with pytest.raises(TooExpensive):
+        workspace.evaluate("b**10000")
+
+
+def test_user_function_calls_are_sized_by_their_bodies():
+    workspace = Workspace(check=check)
+    workspace.define("f(x) = x**x**x")
+    workspace.define("g(x) = f(x) + 1")
+    assert workspace.evaluate("g(2)") == 17
+    started = time.perf_counter()
+    with pytest.raises(TooExpensive):
+        workspace.evaluate("f(9)")
+    with pytest.raises(TooExpensive):
+        workspace.define("y = g(9)")
+    workspace.define("a = 2")
+    workspace.define("y = f(a)")
+    # Growing what y reads makes y an error instead of a hang.
+    workspace.define("a = 9")
+    assert isinstance(workspace.errors['y'], TooExpensive)
+    assert time.perf_counter() - started < 1
+
+
+def test_call_trees_too_big_to_walk_are_refused():
+    workspace = Workspace(check=check)
+    workspace.define("h0(x) = x * 2")
+    with pytest.raises(TooExpensive):
+        for level in range(1, 40):
+            workspace.define(f"h{level}(x) = h{level - 1}(h{level - 1}(x)) + h{level - 1}(x)")
@@ -0,0 +1,213 @@
+import csv
+import math
+import tkinter as tk
+from tkinter import filedialog
+
+import numpy as np
+
+from number_format import format_number
+from vectorized import evaluate_array
+
+CHUNK_ROWS = 10000
+ROW_HEIGHT = 24
+FRAME_MS = 16
+
+
+def row_count(start, stop, step):
+    if step == 0:
+        raise ValueError("step must not be zero")
+    count = math.floor((stop - start) / step + 1e-9) + 1
+    return max(count, 0)
+
+
+def chunk(source, start, step, first, count):
+    # x is computed from the row index rather than accumulated, so row
+    # 10,000,000 has the same x whether or not the rows before it were seen.
+    xs = start + np.arange(first, first + count) * step
+    return xs, evaluate_array(source, x=xs)
+
+
+def export_csv(path, source, start, stop, step, chunk_rows=CHUNK_ROWS):
+    # Yields the number of rows written after each chunk, so a caller can
+    # spread the export over several event-loop turns.
+    total = row_count(start, stop, step)
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['x', source])
+        for offset in range(0, total, chunk_rows):
+            xs, ys = chunk(source, start, step, offset, min(chunk_rows, total - offset))
+            writer.writerows(zip(map(repr, xs.tolist()), map(repr, ys.tolist())))
+            yield offset + len(xs)
+
+
+class TableView:
+    def __init__(self, parent, source, start, stop, step, visible=20,
+                 bg='#000000', fg='#ffffff', alt_bg='#1c1c1c', font=None):
+        self.source = source
+        self.start = start
+        self.step = step
+        self.count = row_count(start, stop, step)
+        self.first = 0
+        self.refresh_id = None
+
+        self.frame = tk.Frame(parent, bg=bg)
+        self.scrollbar = tk.Scrollbar(self.frame, orient='vertical', command=self.on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        body = tk.Frame(self.frame, bg=bg)
+        body.pack(side='left', fill='both', expand=True)
+
+        # A fixed pool of labels is reused for whatever rows are in view.
+        self.cells = []
+        for index in range(visible):
+            row_bg = alt_bg if index % 2 else bg
+            labels = []
+            for column in range(3):
+                label = tk.Label(body, text='', font=font, bg=row_bg, fg=fg, anchor='e', padx=8)
+                label.grid(row=index, column=column, sticky='nsew')
+                labels.append(label)
+            self.cells.append(labels)
+            body.grid_rowconfigure(index, minsize=ROW_HEIGHT)
+        body.grid_columnconfigure(0, weight=1)
+        body.grid_columnconfigure(1, weight=2)
+        body.grid_columnconfigure(2, weight=3)
+
+        for widget in [body] + [label for labels in self.cells for label in labels]:
+            widget.bind('<MouseWheel>', self.on_wheel)
+            widget.bind('<Button-4>', lambda event: self.scroll_to(self.first - 3))
+            widget.bind('<Button-5>', lambda event: self.scroll_to(self.first + 3))
+        self.refresh()
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def grid(self, **options):
+        self.frame.grid(**options)
+
+    @property
+    def visible(self):
+        return len(self.cells)
+
+    def scroll_to(self, first):
+        first = max(0, min(int(first), self.count - self.visible))
+        if first != self.first:
+            self.first = first
+            self.schedule()
+
+    def on_scroll(self, action, value, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(value) * self.count)
+        elif action == 'scroll':
+            size = self.visible if unit == 'pages' else 1
+            self.scroll_to(self.first + int(value) * size)
+
+    def on_wheel(self, event):
+        self.scroll_to(self.first + (-3 if event.delta > 0 else 3))
+
+    def schedule(self):
+        if self.refresh_id is None:
+            self.refresh_id = self.frame.after(FRAME_MS, self.refresh)
+
+    def refresh(self):
+        self.refresh_id = None
+        shown = max(0, min(self.visible, self.count - self.first))
+        xs, ys = chunk(self.source, self.start, self.step, self.first, shown)
+        for index, labels in enumerate(self.cells):
+            if index < shown:
+                texts = (str(self.first + index), f"{xs[index]:.12g}", format_number(ys[index].item()))
+            else:
+                texts = ('', '', '')
+            for label, text in zip(labels, texts):
+                label.config(text=text)
+        if self.count:
+            self.scrollbar.set(self.first / self.count, (self.first + shown) / self.count)
+
+
+class TableWindow:
+    def __init__(self, parent, source='sin(x)', start=0.0, stop=10.0, step=0.1, colors=None, font=None):
+        colors = colors or {}
+        self.bg = colors.get('bg', '#000000')
+        self.fg = colors.get('fg', '#ffffff')
+        self.alt_bg = colors.get('alt_bg', '#1c1c1c')
+        self.font = font
+        self.view = None
+        self.export_job = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Table")
+        self.window.configure(bg=self.bg)
+
+        form = tk.Frame(self.window, bg=self.bg)
+        form.pack(fill='x', padx=10, pady=10)
+        self.fields = {}
+        for column, (name, value) in enumerate((('y(x) =', source), ('start', start),
+                                                ('stop', stop), ('step', step))):
+            tk.Label(form, text=name, bg=self.bg, fg=self.fg, font=font).grid(row=0, column=2 * column)
+            field = tk.Entry(form, width=14 if column == 0 else 8, font=font)
+            field.insert(0, str(value))
+            field.grid(row=0, column=2 * column + 1, padx=(2, 8))
+            field.bind('<Return>', lambda event: self.show())
+            self.fields[name] = field
+
+        buttons = tk.Frame(self.window, bg=self.bg)
+        buttons.pack(fill='x', padx=10)
+        tk.Button(buttons, text="Show", command=self.show, font=font).pack(side='left')
+        tk.Button(buttons, text="Export CSV", command=self.export, font=font).pack(side='left', padx=5)
+        self.status = tk.Label(buttons, text='', bg=self.bg, fg=self.fg, font=font, anchor='e')
+        self.status.pack(side='right', fill='x', expand=True)
+
+        self.body = tk.Frame(self.window, bg=self.bg)
+        self.body.pack(fill='both', expand=True, padx=10, pady=10)
+        self.show()
+
+    def values(self):
+        return (self.fields['y(x) ='].get(),
+                float(self.fields['start'].get()),
+                float(self.fields['stop'].get()),
+                float(self.fields['step'].get()))
+
+    def show(self):
+        try:
+            source, start, stop, step = self.values()
+            chunk(source, start, step, 0, 1)
+            view = TableView(self.body, source, start, stop, step,
+                             bg=self.bg, fg=self.fg, alt_bg=self.alt_bg, font=self.font)
+        except Exception:
+            self.status.config(text="Error")
+            return
+        if self.view is not None:
+            self.view.frame.destroy()
+        self.view = view
+        self.view.pack(fill='both', expand=True)
+        self.status.config(text=f"{view.count:,} rows")
+
+    def export(self):
+        if self.export_job is not None:
+            return
+        try:
+            source, start, stop, step = self.values()
+            total = row_count(start, stop, step)
+        except Exception:
+            self.status.config(text="Error")
+            return
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension='.csv',
+                                            filetypes=[('CSV', '*.csv')])
+        if not path:
+            return
+        progress = export_csv(path, source, start, stop, step)
+        self.export_job = self.window.after(1, self.export_step, progress, total)
+
+    # One chunk per event-loop turn keeps the window responsive while a
+    # long table is written.
+    def export_step(self, progress, total):
+        try:
+            written = next(progress)
+        except StopIteration:
+            self.export_job = None
+            self.status.config(text=f"Exported {total:,} rows")
+            return
+        except Exception:
+            self.export_job = None
+            self.status.config(text="Export failed")
+            return
+        self.status.config(text=f"Exporting... {written * 100 // max(total, 1)}%")
+        self.export_job = self.window.after(1, self.export_step, progress, total)
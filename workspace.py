@@ -0,0 +1,239 @@
+import re
+
+from expression_engine import ExpressionEngine, ExpressionError, default_namespace, names_in, parse
+
+DEFINITION_RE = re.compile(r"""
+    \s*(?P<name>[A-Za-z_][A-Za-z_0-9]*)
+    \s*(?:\((?P<params>[^)]*)\))?
+    \s*=(?!=)(?P<body>.*)$
+""", re.VERBOSE | re.DOTALL)
+PARAM_RE = re.compile(r"[A-Za-z_][A-Za-z_0-9]*$")
+
+
+class UserFunction:
+    # Callers compile against this object, so redefining the function only
+    # swaps its body and never invalidates them.
+    __slots__ = ('name', 'params', 'body', 'tree', 'workspace')
+    pure = False
+
+    def __init__(self, name, params, body, workspace):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.tree = body.tree
+        self.workspace = workspace
+
+    def __call__(self, *args):
+        if self.body is None:
+            raise NameError(f"{self.name}() refers to something no longer defined")
+        if len(args) != len(self.params):
+            raise TypeError(f"{self.name}() takes {len(self.params)} arguments ({len(args)} given)")
+        env = dict(self.workspace.values)
+        env.update(zip(self.params, args))
+        return self.body.evaluate(env)
+
+
+class Workspace:
+    # check(source, values, functions) is called before any source is
+    # compiled or run here, so the caller can refuse sources too expensive
+    # to work on in its own process. functions maps each user function to
+    # its (params, body tree), since a call costs what its body does.
+    def __init__(self, namespace=None, check=None):
+        self.builtins = namespace if namespace is not None else default_namespace()
+        self.check = check
+        self.namespace = dict(self.builtins)
+        self.engine = ExpressionEngine(self.namespace)
+        self.sources = {}
+        self.bodies = {}
+        self.compiled = {}
+        self.constants = {}
+        self.functions = {}
+        self.values = {}
+        self.errors = {}
+        # depends_on[name] are the names a definition reads; dependents is
+        # the same graph with the edges reversed.
+        self.depends_on = {}
+        self.dependents = {}
+        self.recomputed = 0
+
+    @staticmethod
+    def is_definition(text):
+        return DEFINITION_RE.match(text) is not None
+
+    def define(self, text):
+        match = DEFINITION_RE.match(text)
+        if match is None:
+            raise ExpressionError("Expected 'name = expression' or 'name(x) = expression'")
+        name = match.group('name')
+        if name in self.builtins:
+            raise ExpressionError(f"{name!r} is a built-in name")
+        params = None
+        if match.group('params') is not None:
+            params = tuple(param.strip() for param in match.group('params').split(',') if param.strip())
+            if not all(PARAM_RE.match(param) for param in params) or len(set(params)) != len(params):
+                raise ExpressionError(f"Bad parameter list for {name!r}")
+
+        source = match.group('body').strip()
+        if self.check is not None:
+            self.check(source, self.values, self.function_trees(name, params, source))
+        compiled = self.engine.compile(source)
+        reads = names_in(compiled.tree) - set(params or ()) - set(self.builtins)
+        if name in reads or any(name in self.ancestors(dependency) for dependency in reads):
+            raise ExpressionError(f"Circular definition of {name!r}")
+
+        was_function = name in self.functions
+        if params is None:
+            self.functions.pop(name, None)
+            self.namespace.pop(name, None)
+        elif was_function:
+            function = self.functions[name]
+            function.params = params
+            function.body = compiled
+            function.tree = compiled.tree
+        else:
+            function = UserFunction(name, params, compiled, self)
+            self.functions[name] = function
+            self.namespace[name] = function
+            self.values.pop(name, None)
+        if was_function != (params is not None):
+            self.invalidate(name)
+
+        for dependency in self.depends_on.get(name, ()):
+            self.dependents[dependency].discard(name)
+        self.depends_on[name] = reads
+        for dependency in reads:
+            self.dependents.setdefault(dependency, set()).add(name)
+        self.constants.pop(name, None)
+        self.sources[name] = text.strip()
+        self.bodies[name] = source
+        self.compiled[name] = compiled
+        return self.recompute(name)
+
+    # Binds a name to a value that has no source, such as a pasted matrix.
+    def assign(self, name, value, description=None):
+        if name in self.builtins:
+            raise ExpressionError(f"{name!r} is a built-in name")
+        if name in self.functions:
+            del self.functions[name]
+            del self.namespace[name]
+            self.invalidate(name)
+        for dependency in self.depends_on.get(name, ()):
+            self.dependents[dependency].discard(name)
+        self.depends_on[name] = set()
+        self.constants[name] = value
+        self.sources[name] = f"{name} = {description if description is not None else value!r}"
+        self.bodies[name] = None
+        self.compiled[name] = None
+        return self.recompute(name)
+
+    def invalidate(self, name):
+        # A name changed between variable and function, or went away, which
+        # changes how the definitions that mention it compile; recompute()
+        # compiles them again.
+        self.engine.clear()
+        for other in self.dependents.get(name, ()):
+            self.compiled[other] = None
+            if other in self.functions:
+                self.functions[other].body = None
+
+    def ancestors(self, name):
+        seen = set()
+        stack = [name]
+        while stack:
+            for dependency in self.depends_on.get(stack.pop(), ()):
+                if dependency not in seen:
+                    seen.add(dependency)
+                    stack.append(dependency)
+        return seen
+
+    def affected(self, name):
+        # Everything downstream of name, ordered so each definition comes
+        # after the ones it reads.
+        order = []
+        seen = set()
+
+        def visit(node):
+            seen.add(node)
+            for dependent in self.dependents.get(node, ()):
+                if dependent not in seen:
+                    visit(dependent)
+            order.append(node)
+
+        visit(name)
+        order.reverse()
+        return order
+
+    def recompute(self, name):
+        order = self.affected(name)
+        for node in order:
+            if node not in self.sources:
+                continue
+            if node in self.constants:
+                self.values[node] = self.constants[node]
+                self.errors.pop(node, None)
+                continue
+            if self.compiled[node] is None:
+                try:
+                    self.compiled[node] = self.engine.compile(self.bodies[node])
+                except ExpressionError as exception:
+                    self.values.pop(node, None)
+                    self.errors[node] = exception
+                    continue
+                if node in self.functions:
+                    self.functions[node].body = self.compiled[node]
+            self.errors.pop(node, None)
+            if node in self.functions:
+                continue
+            # What a definition reads may have grown since it was checked.
+            if self.check is not None:
+                try:
+                    self.check(self.bodies[node], self.values, self.function_trees())
+                except Exception as exception:
+                    self.values.pop(node, None)
+                    self.errors[node] = exception
+                    continue
+            self.recomputed += 1
+            try:
+                self.values[node] = self.compiled[node].evaluate(self.values)
+            except Exception as exception:
+                self.values.pop(node, None)
+                self.errors[node] = exception
+        return order
+
+    def remove(self, name):
+        if name not in self.sources:
+            raise KeyError(name)
+        for dependency in self.depends_on.pop(name, ()):
+            self.dependents[dependency].discard(name)
+        self.constants.pop(name, None)
+        del self.sources[name]
+        del self.bodies[name]
+        del self.compiled[name]
+        self.values.pop(name, None)
+        self.errors.pop(name, None)
+        if self.functions.pop(name, None) is not None:
+            del self.namespace[name]
+            self.invalidate(name)
+        self.recompute(name)
+
+    def function_trees(self, name=None, params=None, source=None):
+        # With name, params and source: as if that definition were in place.
+        trees = {other: (function.params, function.tree) for other, function in self.functions.items()}
+        if params is not None:
+            trees[name] = (params, parse(source))
+        elif name is not None:
+            trees.pop(name, None)
+        return trees
+
+    def uses(self, source):
+        return bool(names_in(parse(source)) & set(self.sources))
+
+    def evaluate(self, source):
+        if self.check is not None:
+            self.check(source, self.values, self.function_trees())
+        return self.engine.compile(source).evaluate(self.values)
+
+    def value(self, name):
+        if name in self.errors:
+            raise self.errors[name]
+        return self.values[name]